@@ -1,13 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, Query, WebSocket, WebSocketDisconnect, status
 from typing import List, Optional
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 
 from app.core.models import CryptoCurrency, MarketIndicator, ChartData
-from app.services.binance_service import get_crypto_data, get_market_indicators, get_chart_data
+from app.services.binance_service import get_crypto_data, get_chart_data
+from app.services.binance_service import get_market_indicators as fetch_market_indicators
 from app.core.auth import get_current_user
+from app.utils.cache_keys import INTERVAL_SECONDS, align_time_range, floor_to_interval
+from app.db.database import get_db
+from app.services.market_history import get_candles, get_ticks
+from app.services.indicators import compute_indicators, parse_indicator_spec
+from app.services.indicator_stream import indicator_hub
+from app.services.streaming_indicators import IndicatorSet
 
 router = APIRouter()
 
+# The Binance service and its cache decorator are synchronous (blocking HTTP
+# and Redis calls), so routes run them in a worker thread
+
 @router.get("/cryptocurrencies", response_model=List[CryptoCurrency])
 async def get_cryptocurrencies(
     limit: int = Query(20, ge=1, le=100),
@@ -17,7 +28,7 @@ async def get_cryptocurrencies(
     Get list of cryptocurrencies with current prices and 24h change
     """
     try:
-        return get_crypto_data(limit)
+        return await asyncio.to_thread(get_crypto_data, limit)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -27,7 +38,7 @@ async def get_market_indicators(current_user: dict = Depends(get_current_user)):
     Get market indicators like total market cap, trading volume, Bitcoin dominance
     """
     try:
-        return get_market_indicators()
+        return await asyncio.to_thread(fetch_market_indicators)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -43,12 +54,127 @@ async def get_crypto_chart(
     """
     Get chart data for a specific cryptocurrency
     """
-    if not start_time:
-        start_time = datetime.now() - timedelta(days=30)
-    if not end_time:
-        end_time = datetime.now()
+    # Snap the range to candle boundaries so equivalent requests share a cache entry
+    start_time, end_time = align_time_range(interval, start_time, end_time)
         
     try:
-        return get_chart_data(symbol, interval, limit, start_time, end_time)
+        return await asyncio.to_thread(get_chart_data, symbol, interval, limit, start_time, end_time)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/indicators/{symbol}")
+async def get_crypto_indicators(
+    symbol: str,
+    interval: str = Query("1d", regex="^(1m|5m|15m|30m|1h|2h|4h|6h|8h|12h|1d|3d|1w|1M)$"),
+    limit: int = Query(500, ge=1, le=1000),
+    indicators: str = Query("sma:20,ema:20,rsi:14,macd:12:26:9,bollinger:20:2"),
+    start_time: Optional[datetime] = None,
+    end_time: Optional[datetime] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Get technical indicators computed over a symbol's candles
+    
+    indicators is a comma-separated list of name[:param...] among sma, ema,
+    wma, rsi, macd, bollinger, atr and vwap. Values align with the returned
+    timestamps; warm-up points are null.
+    """
+    try:
+        parse_indicator_spec(indicators)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if not start_time:
+        # The latest `limit` candles up to the open one, not the chart's
+        # fixed 30-day lookback, so long periods warm up and values are current
+        step = timedelta(seconds=INTERVAL_SECONDS[interval])
+        start_time = floor_to_interval(end_time or datetime.now(timezone.utc), interval) - step * (limit - 1)
+    start_time, end_time = align_time_range(interval, start_time, end_time)
+    
+    try:
+        chart = await asyncio.to_thread(get_chart_data, symbol, interval, limit, start_time, end_time)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    candles = chart["candles"]
+    return {
+        "symbol": symbol,
+        "interval": interval,
+        "timestamps": [candle["timestamp"] for candle in candles],
+        "indicators": compute_indicators(candles, indicators)
+    }
+
+@router.websocket("/ws/indicators/{symbol}")
+async def live_indicator_stream(
+    websocket: WebSocket,
+    symbol: str,
+    token: str = Query(...),
+    interval: str = Query("1h", regex="^(1m|5m|15m|30m|1h|2h|4h|6h|8h|12h|1d|3d|1w|1M)$"),
+    indicators: str = Query("sma:20,ema:20,rsi:14,macd:12:26:9,bollinger:20:2")
+):
+    """
+    Push indicator values for the open candle on every price tick
+    
+    indicators accepts the streaming subset of /indicators: sma, ema, rsi,
+    macd and bollinger. Values use the same keys as /indicators and are
+    updated incrementally instead of recomputed over the whole series.
+    """
+    try:
+        await get_current_user(token)
+        IndicatorSet(indicators)
+    except (HTTPException, ValueError):
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    
+    await websocket.accept()
+    queue = None
+    try:
+        key, queue = await indicator_hub.subscribe(symbol, interval, indicators)
+        while True:
+            values = await queue.get()
+            await websocket.send_json({
+                "type": "indicators",
+                "data": values
+            })
+    except WebSocketDisconnect:
+        pass
+    finally:
+        # The client can disconnect while the stream is still seeding
+        if queue is not None:
+            indicator_hub.unsubscribe(key, queue)
+
+@router.get("/history/{symbol}/candles")
+async def get_candle_history(
+    symbol: str,
+    interval: str = Query("1d", regex="^(1m|5m|15m|30m|1h|2h|4h|6h|8h|12h|1d|3d|1w|1M)$"),
+    limit: int = Query(1000, ge=1, le=10000),
+    start_time: Optional[datetime] = None,
+    end_time: Optional[datetime] = None,
+    current_user: dict = Depends(get_current_user),
+    db=Depends(get_db)
+):
+    """
+    Get closed candles persisted by the market history writer
+    
+    Served from MongoDB only; nothing is fetched from Binance.
+    """
+    start_time, end_time = align_time_range(interval, start_time, end_time)
+    return await get_candles(db, symbol, interval, start_time, end_time, limit)
+
+@router.get("/history/{symbol}/ticks")
+async def get_tick_history(
+    symbol: str,
+    limit: int = Query(1000, ge=1, le=10000),
+    start_time: Optional[datetime] = None,
+    end_time: Optional[datetime] = None,
+    current_user: dict = Depends(get_current_user),
+    db=Depends(get_db)
+):
+    """
+    Get price ticks persisted by the market history writer, defaulting to the last hour
+    """
+    if not end_time:
+        end_time = datetime.utcnow()
+    if not start_time:
+        start_time = end_time - timedelta(hours=1)
+    return await get_ticks(db, symbol, start_time, end_time, limit)
@@ -1,43 +1,40 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect, status
+from typing import List, Optional
+from datetime import datetime, timedelta
+from bson import ObjectId
+from bson.errors import InvalidId
 
-from app.core.models import UserPreferences, Portfolio, PortfolioCreate, PortfolioSummary
+from app.core.models import UserPreferences, PortfolioEntry, PortfolioEntryCreate, PortfolioSummary, TransactionCreate
 from app.core.auth import get_current_user
-from app.db.database import get_database
+from app.db.database import get_db
+from app.services.portfolio_service import entry_delta, get_portfolio_page, PortfolioImporter, import_csv_lines, import_ndjson_lines, iter_lines
+from app.services.portfolio_summary import apply_holdings_delta, get_summary_holdings
+from app.services.portfolio_history import get_portfolio_history
+from app.services.price_book import price_book
+from app.services.valuation import value_holdings
+from app.services.portfolio_stream import portfolio_hub
+from app.services.cost_basis import COST_BASIS_METHODS, InsufficientQuantityError
+from app.services.preferences_service import get_preferences, update_preferences
+from app.services.ledger_service import DEFAULT_COST_BASIS_METHOD, PositionBusyError, record_transaction, get_transactions, get_positions
 
 router = APIRouter()
 
 @router.get("/preferences", response_model=UserPreferences)
-async def get_user_preferences(current_user: dict = Depends(get_current_user)):
+async def get_user_preferences(current_user: dict = Depends(get_current_user), db=Depends(get_db)):
     """
     Get user preferences like favorite coins, dashboard layout, display settings
     """
-    db = get_database()
-    prefs = db.user_preferences.find_one({"username": current_user["username"]})
-    
-    if not prefs:
-        # Create default preferences if none exist
-        default_prefs = {
-            "username": current_user["username"],
-            "favorite_coins": ["BTC", "ETH", "SOL", "BNB", "ADA"],
-            "dashboard_layout": "default",
-            "theme": "dark",
-            "default_currency": "USD"
-        }
-        db.user_preferences.insert_one(default_prefs)
-        return default_prefs
-    
-    return prefs
+    return await get_preferences(db, current_user["username"])
 
 @router.put("/preferences", response_model=UserPreferences)
 async def update_user_preferences(
     preferences: UserPreferences, 
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    db=Depends(get_db)
 ):
     """
     Update user preferences
     """
-    db = get_database()
     
     # Ensure the username matches the authenticated user
     if preferences.username != current_user["username"]:
@@ -46,34 +43,44 @@ async def update_user_preferences(
             detail="Cannot modify another user's preferences"
         )
     
-    # Update preferences in the database
-    result = db.user_preferences.update_one(
-        {"username": current_user["username"]},
-        {"$set": preferences.dict()},
-        upsert=True
-    )
+    # Update preferences in the database and drop the cached copy
+    await update_preferences(db, current_user["username"], preferences.dict())
     
     return preferences
 
-@router.get("/portfolio", response_model=List[Portfolio])
-async def get_user_portfolio(current_user: dict = Depends(get_current_user)):
+@router.get("/portfolio", response_model=List[PortfolioEntry])
+async def get_user_portfolio(
+    response: Response,
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
+    current_user: dict = Depends(get_current_user),
+    db=Depends(get_db)
+):
     """
-    Get user's cryptocurrency portfolio
+    Get one page of the user's cryptocurrency portfolio, newest purchase first
+    
+    The cursor for the next page is returned in the X-Next-Cursor header,
+    which is absent on the last page.
     """
-    db = get_database()
-    portfolio = list(db.portfolios.find({"username": current_user["username"]}))
+    try:
+        entries, next_cursor = await get_portfolio_page(db, current_user["username"], limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     
-    return portfolio or []
+    return entries
 
-@router.post("/portfolio", response_model=Portfolio, status_code=status.HTTP_201_CREATED)
+@router.post("/portfolio", response_model=PortfolioEntry, status_code=status.HTTP_201_CREATED)
 async def add_portfolio_entry(
-    entry: PortfolioCreate,
-    current_user: dict = Depends(get_current_user)
+    entry: PortfolioEntryCreate,
+    current_user: dict = Depends(get_current_user),
+    db=Depends(get_db)
 ):
     """
     Add a new entry to the portfolio
     """
-    db = get_database()
     
     # Create portfolio entry with the authenticated username
     portfolio_entry = {
@@ -85,57 +92,197 @@ async def add_portfolio_entry(
         "notes": entry.notes
     }
     
-    result = db.portfolios.insert_one(portfolio_entry)
-    portfolio_entry["_id"] = str(result.inserted_id)
+    result = await db.portfolios.insert_one(portfolio_entry)
+    portfolio_entry.pop("_id", None)
+    portfolio_entry["id"] = str(result.inserted_id)
+    await apply_holdings_delta(db, current_user["username"], entry_delta([portfolio_entry]))
+    await portfolio_hub.refresh_holdings(current_user["username"], db)
     
     return portfolio_entry
 
+@router.post("/portfolio/import")
+async def import_portfolio_entries(
+    request: Request,
+    current_user: dict = Depends(get_current_user),
+    db=Depends(get_db)
+):
+    """
+    Bulk import portfolio entries from a CSV (text/csv) or NDJSON
+    (application/x-ndjson) body
+    
+    Rows are validated as they stream in and written in unordered batches.
+    Returns counts and a per-row error report.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    importer = PortfolioImporter(db, current_user["username"])
+    
+    if content_type == "text/csv":
+        await import_csv_lines(importer, iter_lines(request.stream()))
+    elif content_type in ("application/x-ndjson", "application/jsonl"):
+        await import_ndjson_lines(importer, iter_lines(request.stream()))
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Expected text/csv or application/x-ndjson"
+        )
+    
+    await importer.flush()
+    await apply_holdings_delta(db, current_user["username"], importer.delta)
+    await portfolio_hub.refresh_holdings(current_user["username"], db)
+    
+    return importer.report()
+
 @router.delete("/portfolio/{entry_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_portfolio_entry(
     entry_id: str,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    db=Depends(get_db)
 ):
     """
     Delete a portfolio entry
     """
-    db = get_database()
     
-    # Ensure the entry belongs to the authenticated user
-    entry = db.portfolios.find_one({"_id": entry_id, "username": current_user["username"]})
-    if not entry:
+    try:
+        object_id = ObjectId(entry_id)
+    except InvalidId:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Portfolio entry not found"
         )
     
-    db.portfolios.delete_one({"_id": entry_id})
+    # Only delete the entry if it belongs to the authenticated user
+    deleted = await db.portfolios.find_one_and_delete(
+        {"_id": object_id, "username": current_user["username"]},
+        projection={"symbol": 1, "amount": 1, "purchase_price": 1}
+    )
+    if deleted is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Portfolio entry not found"
+        )
+    
+    await apply_holdings_delta(db, current_user["username"], entry_delta([deleted], sign=-1))
+    await portfolio_hub.refresh_holdings(current_user["username"], db)
     
     return None
 
 @router.get("/portfolio/summary", response_model=PortfolioSummary)
-async def get_portfolio_summary(current_user: dict = Depends(get_current_user)):
+async def get_portfolio_summary(current_user: dict = Depends(get_current_user), db=Depends(get_db)):
     """
     Get summary of user's portfolio with current values
     """
-    db = get_database()
-    portfolio = list(db.portfolios.find({"username": current_user["username"]}))
-    
-    if not portfolio:
-        return {
-            "total_value": 0,
-            "total_investment": 0,
-            "profit_loss": 0,
-            "profit_loss_percentage": 0
-        }
-    
-    # In a real implementation, we'd get current prices from the API
-    # For now, we'll use the purchase price as current price (no profit/loss)
-    total_investment = sum(entry["amount"] * entry["purchase_price"] for entry in portfolio)
-    total_value = total_investment  # In a real implementation, this would use current prices
-    
-    return {
-        "total_value": total_value,
-        "total_investment": total_investment,
-        "profit_loss": 0,
-        "profit_loss_percentage": 0
-    }
+    holdings = await get_summary_holdings(db, current_user["username"])
+    valuation = value_holdings(holdings, price_book)
+    valuation["assets_count"] = len(valuation.pop("assets"))
+    valuation["prices_updated_at"] = price_book.updated_at
+    
+    return valuation
+
+@router.get("/portfolio/valuation")
+async def get_portfolio_valuation(current_user: dict = Depends(get_current_user), db=Depends(get_db)):
+    """
+    Get the portfolio marked to market with per-asset value, PnL and weight
+    """
+    holdings = await get_summary_holdings(db, current_user["username"])
+    return value_holdings(holdings, price_book)
+
+@router.get("/portfolio/history")
+async def get_user_portfolio_history(
+    start_time: Optional[datetime] = None,
+    end_time: Optional[datetime] = None,
+    current_user: dict = Depends(get_current_user),
+    db=Depends(get_db)
+):
+    """
+    Get the portfolio value over time, one point per snapshot interval
+    
+    Intervals without a point kept the value of the previous point.
+    Defaults to the last 90 days.
+    """
+    if not end_time:
+        end_time = datetime.utcnow()
+    if not start_time:
+        start_time = end_time - timedelta(days=90)
+    
+    return await get_portfolio_history(db, current_user["username"], start_time, end_time)
+
+@router.post("/transactions", status_code=status.HTTP_201_CREATED)
+async def add_transaction(
+    transaction: TransactionCreate,
+    current_user: dict = Depends(get_current_user),
+    db=Depends(get_db)
+):
+    """
+    Record a buy, sell or transfer in the user's transaction ledger
+    
+    Returns the stored transaction with its realized PnL under each cost
+    basis method.
+    """
+    document = transaction.dict()
+    document["side"] = transaction.side.value
+    
+    try:
+        return await record_transaction(db, current_user["username"], document)
+    except InsufficientQuantityError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except PositionBusyError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+
+@router.get("/transactions")
+async def list_transactions(
+    symbol: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=500),
+    current_user: dict = Depends(get_current_user),
+    db=Depends(get_db)
+):
+    """
+    Get the user's most recent ledger transactions
+    """
+    return await get_transactions(db, current_user["username"], symbol, limit)
+
+@router.get("/positions")
+async def get_user_positions(
+    method: str = Query(DEFAULT_COST_BASIS_METHOD),
+    current_user: dict = Depends(get_current_user),
+    db=Depends(get_db)
+):
+    """
+    Get open positions with realized and unrealized PnL under a cost basis
+    method (fifo, lifo or average)
+    """
+    if method not in COST_BASIS_METHODS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"method must be one of {', '.join(COST_BASIS_METHODS)}"
+        )
+    
+    return await get_positions(db, current_user["username"], method)
+
+@router.websocket("/ws/portfolio")
+async def portfolio_valuation_stream(websocket: WebSocket, token: str = Query(...), db=Depends(get_db)):
+    """
+    Push the user's portfolio valuation whenever the price of a held asset changes
+    
+    Browsers cannot set an Authorization header on WebSockets, so the access
+    token is passed as a query parameter.
+    """
+    try:
+        current_user = await get_current_user(token)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    
+    await websocket.accept()
+    username = current_user["username"]
+    queue = await portfolio_hub.subscribe(username, db)
+    try:
+        while True:
+            valuation = await queue.get()
+            await websocket.send_json({
+                "type": "portfolio_valuation",
+                "data": valuation
+            })
+    except WebSocketDisconnect:
+        pass
+    finally:
+        portfolio_hub.unsubscribe(username, queue)
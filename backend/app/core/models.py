@@ -1,6 +1,7 @@
 from pydantic import BaseModel, Field, EmailStr
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Union
 from datetime import datetime
+from enum import Enum
 import uuid
 
 # User models
@@ -43,6 +44,45 @@ class PortfolioCreate(BaseModel):
     assets: List[PortfolioAsset]
     name: str = "My Portfolio"
 
+class PortfolioEntryCreate(BaseModel):
+    symbol: str
+    amount: float = Field(gt=0)
+    purchase_price: float = Field(ge=0)
+    purchase_date: Optional[datetime] = None
+    notes: Optional[str] = None
+
+class PortfolioImportRow(BaseModel):
+    symbol: str
+    amount: float = Field(gt=0)
+    purchase_price: float = Field(ge=0)
+    purchase_date: Optional[datetime] = None
+    notes: Optional[str] = None
+
+class PortfolioEntry(BaseModel):
+    id: str
+    symbol: str
+    amount: float
+    purchase_price: float
+    purchase_date: Optional[datetime] = None
+    notes: Optional[str] = None
+
+# Transaction ledger models
+class TransactionSide(str, Enum):
+    buy = "buy"
+    sell = "sell"
+    transfer_in = "transfer_in"
+    transfer_out = "transfer_out"
+
+class TransactionCreate(BaseModel):
+    symbol: str
+    side: TransactionSide
+    amount: float = Field(gt=0)
+    # Trade price, or the carried-over unit cost basis for transfers in
+    price: float = Field(0, ge=0)
+    fee: float = Field(0, ge=0)
+    timestamp: Optional[datetime] = None
+    notes: Optional[str] = None
+
 class Portfolio(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     user_id: str
@@ -52,24 +92,21 @@ class Portfolio(BaseModel):
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
 class PortfolioSummary(BaseModel):
-    id: str
-    name: str
     total_value: float
-    total_profit_loss: float
+    total_investment: float
+    profit_loss: float
     profit_loss_percentage: float
     assets_count: int
-    updated_at: datetime
+    # When the price book was last refreshed, None before the first tick
+    prices_updated_at: Optional[datetime] = None
 
 # User preferences models
 class UserPreferences(BaseModel):
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
-    user_id: str
+    username: str
+    favorite_coins: List[str] = Field(default_factory=lambda: ["BTC", "ETH", "SOL", "BNB", "ADA"])
+    dashboard_layout: Union[str, Dict[str, Any]] = "default"
+    theme: str = "dark"
     default_currency: str = "USD"
-    dark_mode: bool = True
-    favorite_coins: List[str] = []
-    dashboard_layout: Dict[str, Any] = Field(default_factory=dict)
-    created_at: datetime = Field(default_factory=datetime.utcnow)
-    updated_at: datetime = Field(default_factory=datetime.utcnow)
 
 # Market indicator models
 class MarketIndicator(BaseModel):
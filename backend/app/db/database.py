@@ -1,22 +1,65 @@
 import os
+from typing import Optional
 from pymongo import MongoClient
-from motor.motor_asyncio import AsyncIOMotorClient
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+
+# MongoDB connection settings
+MONGO_URL = os.environ.get("MONGO_URL", "mongodb://localhost:27017")
+DATABASE_NAME = os.environ.get("MONGO_DB_NAME", "crypto_dashboard")
+MONGO_MAX_POOL_SIZE = int(os.environ.get("MONGO_MAX_POOL_SIZE", "100"))
+MONGO_MIN_POOL_SIZE = int(os.environ.get("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.environ.get("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+MONGO_CONNECT_TIMEOUT_MS = int(os.environ.get("MONGO_CONNECT_TIMEOUT_MS", "5000"))
+MONGO_SOCKET_TIMEOUT_MS = int(os.environ.get("MONGO_SOCKET_TIMEOUT_MS", "10000"))
+
+def _client_options() -> dict:
+    return {
+        "maxPoolSize": MONGO_MAX_POOL_SIZE,
+        "minPoolSize": MONGO_MIN_POOL_SIZE,
+        "serverSelectionTimeoutMS": MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "connectTimeoutMS": MONGO_CONNECT_TIMEOUT_MS,
+        "socketTimeoutMS": MONGO_SOCKET_TIMEOUT_MS,
+    }
+
+# App-lifetime clients; each owns a connection pool that is reused by every request
+mongo_client: Optional[AsyncIOMotorClient] = None
+_sync_mongo_client: Optional[MongoClient] = None
+
+def connect_to_mongo() -> AsyncIOMotorClient:
+    """Create the shared Motor client, called once from the app lifespan"""
+    global mongo_client
+    if mongo_client is None:
+        mongo_client = AsyncIOMotorClient(MONGO_URL, **_client_options())
+    return mongo_client
+
+def close_mongo_connection():
+    """Close the shared clients and their pools, called on app shutdown"""
+    global mongo_client, _sync_mongo_client
+    if mongo_client is not None:
+        mongo_client.close()
+        mongo_client = None
+    if _sync_mongo_client is not None:
+        _sync_mongo_client.close()
+        _sync_mongo_client = None
+
+async def get_db() -> AsyncIOMotorDatabase:
+    """FastAPI dependency returning the database on the shared Motor client"""
+    return connect_to_mongo()[DATABASE_NAME]
 
 # MongoDB connection
 def get_mongo_client():
-    mongo_url = os.environ.get("MONGO_URL", "mongodb://localhost:27017")
-    client = MongoClient(mongo_url)
-    return client
+    global _sync_mongo_client
+    if _sync_mongo_client is None:
+        _sync_mongo_client = MongoClient(MONGO_URL, **_client_options())
+    return _sync_mongo_client
 
 def get_async_mongo_client():
-    mongo_url = os.environ.get("MONGO_URL", "mongodb://localhost:27017")
-    client = AsyncIOMotorClient(mongo_url)
-    return client
+    return connect_to_mongo()
 
 def get_database():
     client = get_mongo_client()
-    return client.crypto_dashboard
+    return client[DATABASE_NAME]
 
 def get_async_database():
     client = get_async_mongo_client()
-    return client.crypto_dashboard
+    return client[DATABASE_NAME]
@@ -0,0 +1,146 @@
+import os
+import logging
+from typing import Any, Dict, Iterable, List, Optional
+from pymongo import ASCENDING, DESCENDING, IndexModel
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Indexes backing the hot queries in app/api/endpoints/user.py
+INDEXES: Dict[str, List[IndexModel]] = {
+    "portfolios": [
+        # Per-user listings and per-symbol lookups
+        IndexModel([("username", ASCENDING), ("symbol", ASCENDING)], name="username_symbol"),
+        # Per-user history ordered by purchase date, with _id as the keyset tiebreaker
+        IndexModel(
+            [("username", ASCENDING), ("purchase_date", DESCENDING), ("_id", DESCENDING)],
+            name="username_purchase_date_id"
+        ),
+    ],
+    "transactions": [
+        # Per-symbol ledger replay in trade order
+        IndexModel(
+            [("username", ASCENDING), ("symbol", ASCENDING), ("timestamp", ASCENDING), ("_id", ASCENDING)],
+            name="username_symbol_timestamp"
+        ),
+        # Most recent transactions first
+        IndexModel(
+            [("username", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)],
+            name="username_timestamp_id"
+        ),
+    ],
+    "positions": [
+        IndexModel([("username", ASCENDING), ("symbol", ASCENDING)], name="username_symbol_unique", unique=True),
+    ],
+    "position_locks": [
+        # One lease per position; a second writer's insert fails until it is released
+        IndexModel([("username", ASCENDING), ("symbol", ASCENDING)], name="username_symbol_unique", unique=True),
+    ],
+    "position_lots": [
+        # Open lots in close order; scanned backwards for LIFO
+        IndexModel(
+            [("username", ASCENDING), ("symbol", ASCENDING), ("method", ASCENDING),
+             ("timestamp", ASCENDING), ("sequence", ASCENDING)],
+            name="username_symbol_method_timestamp_sequence"
+        ),
+    ],
+    "portfolio_summaries": [
+        # Summary reads are a point lookup on username
+        IndexModel([("username", ASCENDING)], name="username_unique", unique=True),
+        # Reconciler picks the least recently checked summaries
+        IndexModel([("reconciled_at", ASCENDING)], name="reconciled_at"),
+    ],
+    "portfolio_history": [
+        # History charts are a range scan per user
+        IndexModel([("username", ASCENDING), ("timestamp", ASCENDING)], name="username_timestamp"),
+    ],
+    "market_ticks": [
+        IndexModel([("symbol", ASCENDING), ("timestamp", ASCENDING)], name="symbol_timestamp"),
+    ],
+    "market_candles": [
+        IndexModel(
+            [("meta.symbol", ASCENDING), ("meta.interval", ASCENDING), ("open_time", ASCENDING)],
+            name="symbol_interval_open_time"
+        ),
+    ],
+    "user_preferences": [
+        IndexModel([("username", ASCENDING)], name="username_unique", unique=True),
+    ],
+}
+
+MARKET_TICKS_RETENTION_SECONDS = int(os.environ.get("MARKET_TICKS_RETENTION_SECONDS", str(30 * 86400)))
+
+# Collections created as MongoDB time-series collections (5.0+), with their
+# create_collection options
+TIME_SERIES_COLLECTIONS: Dict[str, Dict[str, Any]] = {
+    "portfolio_history": {
+        "timeseries": {"timeField": "timestamp", "metaField": "username", "granularity": "hours"},
+    },
+    "market_ticks": {
+        "timeseries": {"timeField": "timestamp", "metaField": "symbol", "granularity": "seconds"},
+        "expireAfterSeconds": MARKET_TICKS_RETENTION_SECONDS,
+    },
+    "market_candles": {
+        "timeseries": {"timeField": "open_time", "metaField": "meta", "granularity": "hours"},
+    },
+}
+
+async def ensure_indexes(db, collections: Optional[Iterable[str]] = None) -> Dict[str, List[str]]:
+    """
+    Create the time-series collections and application indexes if they do
+    not exist yet
+
+    create_indexes is a no-op for indexes that already exist with the same
+    specification, so this is safe to run on every startup.
+
+    Args:
+        db: Motor database
+        collections: Only provision these collections, defaults to all
+
+    Returns:
+        Dictionary of collection name to index names
+    """
+    selected = set(INDEXES) | set(TIME_SERIES_COLLECTIONS) if collections is None else set(collections)
+    
+    existing_collections = await db.list_collection_names()
+    for collection, options in TIME_SERIES_COLLECTIONS.items():
+        if collection in selected and collection not in existing_collections:
+            await db.create_collection(collection, **options)
+            logger.info(f"Created time-series collection {collection}")
+    
+    created = {}
+    for collection, indexes in INDEXES.items():
+        if collection not in selected:
+            continue
+        created[collection] = await db[collection].create_indexes(indexes)
+        logger.info(f"Ensured indexes on {collection}: {', '.join(created[collection])}")
+    return created
+
+def plan_stages(explain: Dict[str, Any]) -> List[str]:
+    """
+    List every stage of the winning plan in an explain() result
+
+    Args:
+        explain: Output of cursor.explain()
+
+    Returns:
+        Stage names, e.g. ["FETCH", "IXSCAN"]
+    """
+    stages = []
+    pending = [explain.get("queryPlanner", {}).get("winningPlan", {})]
+    while pending:
+        plan = pending.pop()
+        # Slot-based engine wraps the classic plan in queryPlan
+        if "queryPlan" in plan:
+            plan = plan["queryPlan"]
+        if "stage" in plan:
+            stages.append(plan["stage"])
+        if "inputStage" in plan:
+            pending.append(plan["inputStage"])
+        pending.extend(plan.get("inputStages", []))
+    return stages
+
+def is_index_covered(explain: Dict[str, Any]) -> bool:
+    """True if the winning plan reads through an index instead of scanning the collection"""
+    stages = plan_stages(explain)
+    return "COLLSCAN" not in stages and any(stage in ("IXSCAN", "EXPRESS_IXSCAN", "IDHACK") for stage in stages)
@@ -7,6 +7,10 @@ import pandas as pd
 from binance.client import Client
 
 from app.core.models import CryptoCurrency, MarketIndicator, ChartData
+from app.utils.redis_cache import Uncached, cache_data, get_upstream_failure, record_upstream_failure
+from app.utils.cache_keys import chart_cache_key, market_cache_key, normalize_symbol
+from app.services.market_history import market_history
+from app.services.indicators import sma, to_list
 
 # Set up logging
 logger = logging.getLogger(__name__)
@@ -136,8 +140,8 @@ def generate_mock_chart_data(symbol: str, interval: str, limit: int,
     close_prices = [candle["close"] for candle in candles]
     
     # Simple Moving Averages
-    sma_7 = calculate_sma(close_prices, 7)
-    sma_25 = calculate_sma(close_prices, 25)
+    sma_7 = to_list(sma(close_prices, 7))
+    sma_25 = to_list(sma(close_prices, 25))
     
     return {
         "symbol": symbol,
@@ -146,23 +150,21 @@ def generate_mock_chart_data(symbol: str, interval: str, limit: int,
         "indicators": {
             "sma_7": sma_7,
             "sma_25": sma_25
-        }
+        },
+        # Random walk, not market data (see is_mock_market_data)
+        "mock": True
     }
 
-def calculate_sma(prices, window):
-    """Calculate Simple Moving Average"""
-    if len(prices) < window:
-        return [None] * len(prices)
+def fetch_crypto_data(limit: int = 20) -> List[Dict[str, Any]]:
+    """
+    Get the top USDT pairs from Binance, bypassing the cache
     
-    result = [None] * (window - 1)
-    for i in range(len(prices) - window + 1):
-        result.append(sum(prices[i:i+window]) / window)
-    
-    return result
-
-def get_crypto_data(limit: int = 20) -> List[CryptoCurrency]:
-    """Get cryptocurrency data from Binance API or mock data"""
-    if binance_client:
+    The price feed polls this directly so every tick sees current prices.
+    Falls back to copies of the mock data, each flagged with "mock": True.
+    """
+    if binance_client and get_upstream_failure("binance", "ticker"):
+        logger.info("Skipping Binance ticker request after a recent failure, using mock data")
+    elif binance_client:
         try:
             # Get all tickers
             tickers = binance_client.get_ticker()
@@ -197,15 +199,32 @@ def get_crypto_data(limit: int = 20) -> List[CryptoCurrency]:
                     "volume_24h": volume_24h,
                     "market_cap": market_cap
                 })
+            
+            # Live prices only; mock data is never persisted
+            market_history.record_ticks(result)
                 
             return result
             
         except Exception as e:
             logger.warning(f"Error fetching crypto data from Binance: {e}")
             logger.warning("Using mock data instead")
+            record_upstream_failure("binance", "ticker", str(e))
     
     # Return mock data if Binance API is not available or fails
-    return MOCK_CRYPTOCURRENCIES[:limit]
+    return [dict(crypto, mock=True) for crypto in MOCK_CRYPTOCURRENCIES[:limit]]
+
+def is_mock_market_data(tickers: List[Dict[str, Any]]) -> bool:
+    """Whether tickers are the mock fallback rather than live Binance data"""
+    return bool(tickers) and all(ticker.get("mock") for ticker in tickers)
+
+@cache_data("market", ttl_seconds=30, key_builder=market_cache_key)
+def get_crypto_data(limit: int = 20) -> List[CryptoCurrency]:
+    """Get cryptocurrency data from Binance API or mock data"""
+    tickers = fetch_crypto_data(limit)
+    if is_mock_market_data(tickers):
+        # Not cached, so live data is served as soon as Binance recovers
+        return Uncached(tickers)
+    return tickers
 
 def get_market_indicators() -> List[MarketIndicator]:
     """Get market indicators like total market cap, trading volume, Bitcoin dominance"""
@@ -213,6 +232,7 @@ def get_market_indicators() -> List[MarketIndicator]:
     # For this demo, we'll use mock data
     return MOCK_MARKET_INDICATORS
 
+@cache_data("chart", ttl_seconds=60, key_builder=chart_cache_key)
 def get_chart_data(
     symbol: str, 
     interval: str = "1d", 
@@ -225,8 +245,15 @@ def get_chart_data(
         start_time = datetime.now() - timedelta(days=30)
     if not end_time:
         end_time = datetime.now()
+    
+    # Request errors (e.g. an invalid symbol) hold for any range, so they are
+    # keyed by symbol and interval; an empty result only holds for its range
+    klines_key = f"klines:{normalize_symbol(symbol)}:{interval}"
+    range_key = f"klines:{chart_cache_key(symbol, interval, limit, start_time, end_time)}"
         
-    if binance_client:
+    if binance_client and (get_upstream_failure("binance", klines_key) or get_upstream_failure("binance", range_key)):
+        logger.info(f"Skipping Binance klines request for {symbol} after a recent failure, using mock data")
+    elif binance_client:
         try:
             # Convert interval from our API format to Binance format
             # Binance uses the same format as our API, so no conversion needed
@@ -243,6 +270,7 @@ def get_chart_data(
                 endTime=end_ms,
                 limit=limit
             )
+            market_history.record_klines(symbol, interval, klines)
             
             # Convert to our format
             candles = []
@@ -260,8 +288,8 @@ def get_chart_data(
             # Calculate technical indicators
             if candles:
                 closes = [c["close"] for c in candles]
-                sma_7 = calculate_sma(closes, 7)
-                sma_25 = calculate_sma(closes, 25)
+                sma_7 = to_list(sma(closes, 7))
+                sma_25 = to_list(sma(closes, 25))
                 
                 return {
                     "symbol": symbol,
@@ -275,11 +303,13 @@ def get_chart_data(
             else:
                 # If no data returned, use mock data
                 logger.warning(f"No chart data returned from Binance for {symbol}, using mock data")
-                return generate_mock_chart_data(symbol, interval, limit, start_time, end_time)
+                record_upstream_failure("binance", range_key, "no klines returned", empty=True)
+                return Uncached(generate_mock_chart_data(symbol, interval, limit, start_time, end_time))
                 
         except Exception as e:
             logger.warning(f"Error fetching chart data from Binance: {e}")
             logger.warning("Using mock data instead")
+            record_upstream_failure("binance", klines_key, str(e))
     
     # Return mock data if Binance API is not available or fails
-    return generate_mock_chart_data(symbol, interval, limit, start_time, end_time)
+    return Uncached(generate_mock_chart_data(symbol, interval, limit, start_time, end_time))
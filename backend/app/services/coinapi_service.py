@@ -1,9 +1,13 @@
 import os
 import logging
 import requests
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from typing import List, Dict, Any, Optional
 
+from app.utils.redis_cache import get_upstream_failure, record_upstream_failure
+from app.utils.cache_keys import chart_cache_key, normalize_symbol
+from app.services.indicators import sma, ema, wma, rsi, to_list
+
 # Set up logging
 logger = logging.getLogger(__name__)
 
@@ -13,6 +17,25 @@ COINAPI_BASE_URL = "https://rest.coinapi.io/v1"
 # API key from environment variables
 COINAPI_KEY = os.environ.get("COINAPI_KEY", "52d3f36d-bdb3-4653-86c3-08284eeeed63")
 
+# Length of each CoinAPI period id, used to derive time_start from a limit
+COINAPI_PERIOD_LENGTHS = {
+    "1MIN": timedelta(minutes=1),
+    "5MIN": timedelta(minutes=5),
+    "15MIN": timedelta(minutes=15),
+    "30MIN": timedelta(minutes=30),
+    "1HRS": timedelta(hours=1),
+    "4HRS": timedelta(hours=4),
+    "1DAY": timedelta(days=1),
+    "7DAY": timedelta(days=7),
+    "1MTH": timedelta(days=31),
+}
+
+def coinapi_time(value: datetime) -> str:
+    """Format a datetime the way CoinAPI expects (ISO 8601, UTC)"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.strftime("%Y-%m-%dT%H:%M:%S")
+
 def get_historical_data(
     symbol: str, 
     period_id: str = "1DAY",
@@ -27,8 +50,8 @@ def get_historical_data(
         symbol: Symbol in format like "BTC" or "ETH"
         period_id: Time period (e.g., "1HRS", "1DAY", "1MTH")
         limit: Maximum number of data points to return
-        start_time: Start time for data (ISO format)
-        end_time: End time for data (ISO format)
+        start_time: Start time for data; defaults to limit periods before end_time (or now)
+        end_time: End time for data
         
     Returns:
         List of OHLCV data points
@@ -38,13 +61,23 @@ def get_historical_data(
         logger.warning("CoinAPI key not found, using mock data")
         return []
     
-    # Prepare query parameters
-    params = {"limit": limit}
+    if not start_time:
+        period_length = COINAPI_PERIOD_LENGTHS.get(period_id, timedelta(days=1))
+        start_time = (end_time or datetime.now(timezone.utc)) - period_length * limit
+    
+    # Skip queries that recently failed or came back empty. Request errors
+    # hold for any range; an empty result only holds for its own range.
+    query_key = f"ohlcv:{normalize_symbol(symbol)}:{period_id}"
+    interval = COINAPI_INTERVALS.get(period_id, period_id)
+    range_key = f"ohlcv:{chart_cache_key(symbol, interval, limit, start_time, end_time)}"
+    if get_upstream_failure("coinapi", query_key) or get_upstream_failure("coinapi", range_key):
+        logger.info(f"Skipping CoinAPI history request for {symbol} after a recent failure")
+        return []
     
-    if start_time:
-        params["time_start"] = start_time.isoformat()
+    # Prepare query parameters; period_id and time_start are required by CoinAPI
+    params = {"period_id": period_id, "time_start": coinapi_time(start_time), "limit": limit}
     if end_time:
-        params["time_end"] = end_time.isoformat()
+        params["time_end"] = coinapi_time(end_time)
     
     # Prepare headers with API key
     headers = {"X-CoinAPI-Key": COINAPI_KEY}
@@ -59,13 +92,18 @@ def get_historical_data(
         
         # Check response status
         if response.status_code == 200:
-            return response.json()
+            data = response.json()
+            if not data:
+                record_upstream_failure("coinapi", range_key, "no history returned", empty=True)
+            return data
         else:
             logger.error(f"CoinAPI error: {response.status_code} - {response.text}")
+            record_upstream_failure("coinapi", query_key, f"HTTP {response.status_code}")
             return []
             
     except Exception as e:
         logger.error(f"Error calling CoinAPI: {e}")
+        record_upstream_failure("coinapi", query_key, str(e))
         return []
 
 def get_exchange_rates(base_currency: str = "USD", symbols: List[str] = None) -> Dict[str, float]:
@@ -95,6 +133,11 @@ def get_exchange_rates(base_currency: str = "USD", symbols: List[str] = None) ->
         # Make the API call for each symbol
         rates = {}
         for symbol in symbols:
+            query_key = f"rate:{symbol.upper()}:{base_currency.upper()}"
+            if get_upstream_failure("coinapi", query_key):
+                rates[symbol] = 0.0
+                continue
+            
             response = requests.get(
                 f"{COINAPI_BASE_URL}/exchangerate/{symbol}/{base_currency}",
                 headers=headers
@@ -106,6 +149,7 @@ def get_exchange_rates(base_currency: str = "USD", symbols: List[str] = None) ->
                 rates[symbol] = data.get("rate", 0.0)
             else:
                 logger.error(f"CoinAPI error for {symbol}: {response.status_code} - {response.text}")
+                record_upstream_failure("coinapi", query_key, f"HTTP {response.status_code}")
                 rates[symbol] = 0.0
                 
         return rates
@@ -114,49 +158,65 @@ def get_exchange_rates(base_currency: str = "USD", symbols: List[str] = None) ->
         logger.error(f"Error calling CoinAPI: {e}")
         return {symbol: 0.0 for symbol in symbols}
 
+# Chart intervals mapped to CoinAPI period ids
+COINAPI_PERIODS = {
+    "1m": "1MIN",
+    "5m": "5MIN",
+    "15m": "15MIN",
+    "30m": "30MIN",
+    "1h": "1HRS",
+    "4h": "4HRS",
+    "1d": "1DAY",
+    "1w": "7DAY",
+    "1M": "1MTH",
+}
+COINAPI_INTERVALS = {period_id: interval for interval, period_id in COINAPI_PERIODS.items()}
+
+# Periods reported per moving-average style indicator
+INDICATOR_PERIODS = {
+    "sma": [7, 25, 99],
+    "ema": [7, 25, 99],
+    "wma": [7, 25, 99],
+    "rsi": [14],
+}
+
 def get_technical_indicators(symbol: str, period: str = "1d", indicator: str = "sma") -> Dict[str, Any]:
     """
     Get technical indicators for a symbol
     
-    This is a mock implementation since CoinAPI doesn't directly provide technical indicators.
-    In a real implementation, you'd either:
-    1. Get the OHLCV data and calculate indicators yourself
-    2. Use another API that provides technical indicators
+    CoinAPI does not provide indicators, so they are computed locally from
+    its OHLCV history with the vectorized indicator engine.
     
     Args:
         symbol: Cryptocurrency symbol
-        period: Time period
-        indicator: Indicator type (sma, ema, etc.)
+        period: Time period (chart interval such as "1h" or "1d")
+        indicator: Indicator type (sma, ema, wma or rsi)
         
     Returns:
         Dictionary with indicator values
     """
-    # Mock implementation
-    if indicator == "sma":
+    if indicator not in INDICATOR_PERIODS:
         return {
             "symbol": symbol,
-            "indicator": "sma",
-            "periods": [7, 25, 99],
-            "values": {
-                "7": [100.0, 101.5, 102.3, 101.8, 103.2],
-                "25": [98.5, 99.2, 100.1, 101.0, 101.8],
-                "99": [95.0, 96.2, 97.5, 98.3, 99.7]
-            }
-        }
-    elif indicator == "ema":
-        return {
-            "symbol": symbol,
-            "indicator": "ema",
-            "periods": [7, 25, 99],
-            "values": {
-                "7": [100.2, 101.7, 102.5, 102.0, 103.4],
-                "25": [98.7, 99.4, 100.3, 101.2, 102.0],
-                "99": [95.2, 96.4, 97.7, 98.5, 99.9]
-            }
+            "indicator": indicator,
+            "error": "Indicator not supported"
         }
-    else:
+    
+    periods = INDICATOR_PERIODS[indicator]
+    # Enough history for the longest period to warm up plus a visible tail
+    history = get_historical_data(symbol, COINAPI_PERIODS.get(period, period), limit=max(periods) + 100)
+    if not history:
         return {
             "symbol": symbol,
             "indicator": indicator,
-            "error": "Indicator not supported"
+            "error": "No price history available"
         }
+    
+    closes = [point["price_close"] for point in history]
+    compute = {"sma": sma, "ema": ema, "wma": wma, "rsi": rsi}[indicator]
+    return {
+        "symbol": symbol,
+        "indicator": indicator,
+        "periods": periods,
+        "values": {str(window): to_list(compute(closes, window)) for window in periods}
+    }
@@ -0,0 +1,210 @@
+import heapq
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+# Supported cost basis methods
+FIFO = "fifo"
+LIFO = "lifo"
+AVERAGE = "average"
+COST_BASIS_METHODS = (FIFO, LIFO, AVERAGE)
+
+# Quantities below this are treated as fully closed (float dust)
+QUANTITY_EPSILON = 1e-12
+
+def to_epoch(value: Optional[datetime]) -> float:
+    """Epoch seconds of a datetime; naive datetimes are UTC, as stored by MongoDB"""
+    if value is None:
+        return 0.0
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+class InsufficientQuantityError(ValueError):
+    """Raised when a sell or transfer out exceeds the open quantity"""
+
+class PositionBook:
+    """
+    Open lots and realized PnL of one symbol under one cost basis method
+
+    FIFO and LIFO keep the open lots in a binary heap ordered by trade time
+    (oldest or newest first), so adding a lot is O(log n) and closing one is
+    O(log n). A sell that spans k lots costs O(k log n), which amortizes to
+    O(log n) per trade since every lot is closed at most once. The average
+    method needs no lots at all. Running totals of quantity, cost and
+    realized PnL make every read O(1).
+
+    The totals and the lots are serialized separately (to_dict, open_lots),
+    so a stored book can be restored with only the lots a trade will touch:
+    closes are exact as long as the loaded lots are a prefix of the close
+    order that covers the closed quantity.
+    """
+
+    def __init__(self, method: str = FIFO):
+        if method not in COST_BASIS_METHODS:
+            raise ValueError(f"Unknown cost basis method: {method}")
+        self.method = method
+        # Heap entries: [sort key, sequence, quantity, unit cost]
+        self.lots: List[List[float]] = []
+        # Number of open lots, including any that were not loaded
+        self.lot_count = 0
+        self.quantity = 0.0
+        self.cost = 0.0
+        self.realized_pnl = 0.0
+        self.last_timestamp = 0.0
+        self.sequence = 0
+
+    def _sort_key(self, timestamp: float, sequence: int) -> List[float]:
+        if self.method == LIFO:
+            return [-timestamp, -sequence]
+        return [timestamp, sequence]
+
+    def open(self, quantity: float, unit_cost: float, timestamp: float):
+        """Add a lot, e.g. a buy or a transfer in"""
+        self.sequence += 1
+        self.last_timestamp = max(self.last_timestamp, timestamp)
+        self.quantity += quantity
+        self.cost += quantity * unit_cost
+        if self.method != AVERAGE:
+            heapq.heappush(self.lots, self._sort_key(timestamp, self.sequence) + [quantity, unit_cost])
+            self.lot_count += 1
+
+    def close(self, quantity: float, timestamp: float) -> float:
+        """
+        Remove quantity from the open lots in method order
+
+        Returns:
+            Cost basis of the removed quantity
+        """
+        if quantity > self.quantity + QUANTITY_EPSILON:
+            raise InsufficientQuantityError(
+                f"Cannot close {quantity} with only {self.quantity} open"
+            )
+        self.sequence += 1
+        self.last_timestamp = max(self.last_timestamp, timestamp)
+
+        if self.method == AVERAGE:
+            removed = self.cost * min(quantity / self.quantity, 1.0) if self.quantity else 0.0
+        else:
+            removed = 0.0
+            remaining = quantity
+            while remaining > QUANTITY_EPSILON and self.lots:
+                lot = self.lots[0]
+                taken = min(remaining, lot[2])
+                removed += taken * lot[3]
+                remaining -= taken
+                lot[2] -= taken
+                if lot[2] <= QUANTITY_EPSILON:
+                    heapq.heappop(self.lots)
+                    self.lot_count -= 1
+
+        self.quantity -= quantity
+        self.cost -= removed
+        if self.quantity <= QUANTITY_EPSILON:
+            self.quantity = 0.0
+            self.cost = 0.0
+            self.lots = []
+            self.lot_count = 0
+        return removed
+
+    def buy(self, quantity: float, price: float, fee: float = 0.0, timestamp: float = 0.0):
+        # Fees on a buy are part of the cost basis
+        self.open(quantity, (quantity * price + fee) / quantity, timestamp)
+
+    def sell(self, quantity: float, price: float, fee: float = 0.0, timestamp: float = 0.0) -> float:
+        """
+        Close quantity at price
+
+        Returns:
+            Realized PnL of this sale, net of fees
+        """
+        removed = self.close(quantity, timestamp)
+        realized = quantity * price - fee - removed
+        self.realized_pnl += realized
+        return realized
+
+    @property
+    def average_cost(self) -> float:
+        return self.cost / self.quantity if self.quantity else 0.0
+
+    def unrealized_pnl(self, price: float) -> float:
+        return self.quantity * price - self.cost
+
+    def open_lots(self) -> List[Dict[str, Any]]:
+        """Loaded open lots in the order they will be closed"""
+        lots = []
+        for key_time, key_sequence, quantity, unit_cost in sorted(self.lots):
+            if self.method == LIFO:
+                key_time, key_sequence = -key_time, -key_sequence
+            lots.append({
+                "sequence": int(key_sequence),
+                "timestamp": key_time,
+                "quantity": quantity,
+                "unit_cost": unit_cost,
+            })
+        return lots
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serializable running totals; the lots are stored separately (see open_lots)"""
+        return {
+            "method": self.method,
+            "open_lots": self.lot_count,
+            "quantity": self.quantity,
+            "cost": self.cost,
+            "realized_pnl": self.realized_pnl,
+            "last_timestamp": self.last_timestamp,
+            "sequence": self.sequence,
+        }
+
+    @classmethod
+    def from_dict(cls, state: Dict[str, Any], lots: Iterable[Dict[str, Any]] = ()) -> "PositionBook":
+        """
+        Restore a book from its totals and some or all of its open lots
+
+        Args:
+            state: Output of to_dict
+            lots: Lots as returned by open_lots, in any order
+        """
+        book = cls(state["method"])
+        book.lots = [
+            book._sort_key(lot["timestamp"], lot["sequence"]) + [lot["quantity"], lot["unit_cost"]]
+            for lot in lots
+        ]
+        heapq.heapify(book.lots)
+        book.lot_count = state.get("open_lots", len(book.lots))
+        book.quantity = state.get("quantity", 0.0)
+        book.cost = state.get("cost", 0.0)
+        book.realized_pnl = state.get("realized_pnl", 0.0)
+        book.last_timestamp = state.get("last_timestamp", 0.0)
+        book.sequence = state.get("sequence", 0)
+        return book
+
+def apply_transaction(book: PositionBook, transaction: Dict[str, Any]) -> float:
+    """
+    Apply one ledger transaction to a position book
+
+    Args:
+        book: Position book of the transaction's symbol
+        transaction: Ledger document with "side", "amount", "price", "fee"
+            and "timestamp"
+
+    Returns:
+        Realized PnL of the transaction (0 for everything but sells)
+    """
+    side = transaction["side"]
+    amount = transaction["amount"]
+    price = transaction.get("price", 0.0)
+    fee = transaction.get("fee", 0.0)
+    timestamp = to_epoch(transaction.get("timestamp"))
+
+    if side == "buy":
+        book.buy(amount, price, fee, timestamp)
+    elif side == "sell":
+        return book.sell(amount, price, fee, timestamp)
+    elif side == "transfer_in":
+        # Transferred coins carry their original cost basis in "price"
+        book.open(amount, price, timestamp)
+    elif side == "transfer_out":
+        book.close(amount, timestamp)
+    else:
+        raise ValueError(f"Unknown transaction side: {side}")
+    return 0.0
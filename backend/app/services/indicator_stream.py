@@ -0,0 +1,200 @@
+import os
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from app.services.binance_service import get_chart_data
+from app.services.price_book import price_book, price_listeners, normalize_asset_symbol
+from app.services.streaming_indicators import IndicatorSet
+from app.utils.cache_keys import INTERVAL_SECONDS, floor_to_interval
+from app.utils.queues import put_latest
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Closed candles replayed into a new stream to warm its indicators up
+INDICATOR_STREAM_SEED_CANDLES = int(os.environ.get("INDICATOR_STREAM_SEED_CANDLES", "500"))
+
+class IndicatorStream:
+    """
+    Streaming indicators of one symbol, interval and spec
+
+    Every price tick previews the still-open candle at that price; when a
+    tick falls into the next interval, the open candle is committed with its
+    last price. A gap of more than one interval means candles were missed,
+    so the stream asks to be reseeded from the exchange instead.
+    """
+
+    def __init__(self, symbol: str, interval: str, spec: str):
+        self.symbol = symbol
+        self.interval = interval
+        self.indicators = IndicatorSet(spec)
+        self.open_time: Optional[datetime] = None
+        self.last_price: Optional[float] = None
+        self.latest: Optional[Dict[str, Any]] = None
+
+    def seed(self, candles: List[Dict[str, Any]], now: Optional[datetime] = None):
+        """
+        Rebuild the indicator state from chart candles, oldest first
+
+        A last candle inside the current interval is the open candle and
+        is previewed rather than committed.
+        """
+        now = now or datetime.now(timezone.utc)
+        current = floor_to_interval(now, self.interval)
+        self.indicators = IndicatorSet(self.indicators.spec)
+        self.open_time, self.last_price = current, None
+
+        closes = [candle["close"] for candle in candles]
+        if candles and floor_to_interval(datetime.fromisoformat(candles[-1]["timestamp"]), self.interval) == current:
+            self.last_price = closes.pop()
+        self.indicators.extend(closes)
+        if self.last_price is not None:
+            self._publish()
+
+    def needs_seed(self, now: datetime) -> bool:
+        """Whether the interval before now's is neither open nor committed"""
+        if self.open_time is None:
+            return True
+        previous = floor_to_interval(floor_to_interval(now, self.interval) - timedelta(seconds=1), self.interval)
+        return previous > self.open_time
+
+    def tick(self, price: float, now: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        Apply the latest price in O(1) per indicator
+
+        Callers check needs_seed first; a tick after a gap is applied as if
+        the missing intervals did not exist.
+        """
+        now = now or datetime.now(timezone.utc)
+        current = floor_to_interval(now, self.interval)
+        if self.open_time is not None and current > self.open_time and self.last_price is not None:
+            self.indicators.update(self.last_price)
+        self.open_time, self.last_price = current, price
+        return self._publish()
+
+    def _publish(self) -> Dict[str, Any]:
+        self.latest = {
+            "symbol": self.symbol,
+            "interval": self.interval,
+            "timestamp": self.open_time.isoformat(),
+            "price": self.last_price,
+            "indicators": self.indicators.peek(self.last_price),
+        }
+        return self.latest
+
+StreamKey = Tuple[str, str, str]
+
+class LiveIndicatorHub:
+    """
+    Pushes live indicator values to chart subscribers on every price tick
+
+    Streams are shared by all connections watching the same symbol,
+    interval and spec, so each tick costs one O(1) update per stream.
+    """
+
+    def __init__(self, queue_size: int = 5, seed_candles: int = INDICATOR_STREAM_SEED_CANDLES):
+        self.queue_size = queue_size
+        self.seed_candles = seed_candles
+        self.streams: Dict[StreamKey, IndicatorStream] = {}
+        self.subscribers: Dict[StreamKey, Set[asyncio.Queue]] = {}
+        self.symbol_index: Dict[str, Set[StreamKey]] = {}
+        # Streams being reseeded in the background; their ticks are skipped
+        self.reseeding: Dict[StreamKey, asyncio.Task] = {}
+
+    async def _seed(self, stream: IndicatorStream) -> bool:
+        """
+        Seed a stream from the latest closed candles plus the open one
+
+        Returns:
+            False if only mock candles were available; the stream is left
+            unseeded, since random candles would not match /indicators
+        """
+        now = datetime.now(timezone.utc)
+        step = timedelta(seconds=INTERVAL_SECONDS[stream.interval])
+        start = floor_to_interval(now, stream.interval) - step * (self.seed_candles - 1)
+        # get_chart_data uses the blocking Binance client
+        chart = await asyncio.to_thread(get_chart_data, stream.symbol, stream.interval, self.seed_candles, start, now)
+        if chart.get("mock"):
+            return False
+        stream.seed(chart["candles"], now)
+        return True
+
+    async def _reseed(self, key: StreamKey, stream: IndicatorStream):
+        try:
+            seeded = await self._seed(stream)
+        except Exception as e:
+            logger.error(f"Error reseeding indicators for {stream.symbol} {stream.interval}: {e}")
+            return
+        finally:
+            self.reseeding.pop(key, None)
+        # Everyone may have unsubscribed, or a new stream replaced this one, meanwhile
+        if seeded and self.streams.get(key) is stream:
+            self._push(key)
+
+    def _push(self, key: StreamKey):
+        stream = self.streams.get(key)
+        if stream is None or stream.latest is None:
+            return
+        latest = stream.latest
+        for queue in self.subscribers.get(key, ()):
+            put_latest(queue, latest)
+
+    async def subscribe(self, symbol: str, interval: str, spec: str) -> Tuple[StreamKey, asyncio.Queue]:
+        """
+        Register a connection and queue the current values
+
+        Raises:
+            ValueError: For specs that cannot stream
+        """
+        symbol = normalize_asset_symbol(symbol)
+        key = (symbol, interval, spec)
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        if key not in self.streams:
+            stream = IndicatorStream(symbol, interval, spec)
+            await self._seed(stream)
+            # Another connection may have created the stream while we were seeding
+            self.streams.setdefault(key, stream)
+            self.symbol_index.setdefault(symbol, set()).add(key)
+        self.subscribers.setdefault(key, set()).add(queue)
+        self._push(key)
+        return key, queue
+
+    def unsubscribe(self, key: StreamKey, queue: asyncio.Queue):
+        queues = self.subscribers.get(key)
+        if queues is None:
+            return
+        queues.discard(queue)
+        if not queues:
+            del self.subscribers[key]
+            del self.streams[key]
+            keys = self.symbol_index.get(key[0])
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.symbol_index[key[0]]
+
+    async def on_prices_changed(self, changed: Set[str]):
+        """
+        Price feed listener: advance only the streams of a changed symbol
+
+        Streams that missed candles are reseeded in a background task, so a
+        slow exchange request does not hold up the other price listeners;
+        they skip ticks until the reseed finishes.
+        """
+        now = datetime.now(timezone.utc)
+        for symbol in changed:
+            price = price_book.get(symbol)
+            for key in self.symbol_index.get(symbol, ()):
+                stream = self.streams[key]
+                if key in self.reseeding:
+                    continue
+                if stream.needs_seed(now):
+                    self.reseeding[key] = asyncio.create_task(self._reseed(key, stream))
+                    continue
+                stream.tick(price, now)
+                self._push(key)
+
+indicator_hub = LiveIndicatorHub()
+price_listeners.append(indicator_hub.on_prices_changed)
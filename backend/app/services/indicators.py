@@ -0,0 +1,285 @@
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+
+# Largest exponent used by the blocked recursive filter; e**300 is far from
+# float64 overflow (about e**709)
+_FILTER_EXPONENT_LIMIT = 300.0
+
+def _as_array(values: Sequence[float]) -> np.ndarray:
+    return np.asarray(values, dtype=float)
+
+def _nan_array(length: int) -> np.ndarray:
+    return np.full(length, np.nan)
+
+def _window_sums(values: np.ndarray, window: int) -> np.ndarray:
+    """Sum of every full window, via one cumulative sum: O(n) for any window"""
+    cumulative = np.concatenate(([0.0], np.cumsum(values)))
+    return cumulative[window:] - cumulative[:-window]
+
+def linear_recurrence(inputs: np.ndarray, decay: float, initial: float = 0.0) -> np.ndarray:
+    """
+    Evaluate y[t] = decay * y[t-1] + inputs[t] with y[-1] = initial
+
+    This first-order recursive filter underlies EMA and Wilder smoothing.
+    Each block of the series is solved in closed form,
+        y[k] = decay**(k+1) * (y_prev + cumsum(inputs * decay**-(j+1))),
+    with blocks short enough that decay**-k cannot overflow. The whole pass
+    is O(n) vectorized NumPy with no Python loop per element.
+
+    Args:
+        inputs: Input series
+        decay: Feedback coefficient in [0, 1)
+        initial: Filter state before the first input
+
+    Returns:
+        Filtered series, same length as inputs
+    """
+    inputs = _as_array(inputs)
+    output = np.empty_like(inputs)
+    if decay == 0:
+        output[:] = inputs
+        return output
+
+    block = max(1, int(_FILTER_EXPONENT_LIMIT / -np.log(decay)))
+    powers = decay ** np.arange(1, min(block, len(inputs)) + 1)
+    previous = initial
+    for start in range(0, len(inputs), block):
+        chunk = inputs[start:start + block]
+        scale = powers[:len(chunk)]
+        output[start:start + len(chunk)] = scale * (previous + np.cumsum(chunk / scale))
+        previous = output[start + len(chunk) - 1]
+    return output
+
+def sma(values: Sequence[float], period: int) -> np.ndarray:
+    """Simple moving average; NaN until the first full window"""
+    values = _as_array(values)
+    result = _nan_array(len(values))
+    if len(values) >= period:
+        result[period - 1:] = _window_sums(values, period) / period
+    return result
+
+def wma(values: Sequence[float], period: int) -> np.ndarray:
+    """
+    Linearly weighted moving average (weights 1..period, newest heaviest)
+
+    Uses two cumulative sums: sum(k * x[k]) minus the window offset times
+    sum(x[k]) gives the weighted window sum in O(1) per point.
+    """
+    values = _as_array(values)
+    result = _nan_array(len(values))
+    if len(values) < period:
+        return result
+
+    index = np.arange(len(values), dtype=float)
+    plain = _window_sums(values, period)
+    weighted = _window_sums(index * values, period)
+    # Window ending at t starts at t - period + 1, so weight = k - (t - period)
+    offsets = index[period - 1:] - period
+    result[period - 1:] = (weighted - offsets * plain) / (period * (period + 1) / 2)
+    return result
+
+def _smoothed(values: np.ndarray, period: int, alpha: float) -> np.ndarray:
+    """Exponential smoothing seeded with the SMA of the first period values, skipping leading NaNs"""
+    result = _nan_array(len(values))
+    valid = np.flatnonzero(~np.isnan(values))
+    if len(valid) == 0:
+        return result
+    first = valid[0]
+    if len(values) - first < period:
+        return result
+
+    seed_index = first + period - 1
+    seed = values[first:seed_index + 1].mean()
+    result[seed_index] = seed
+    result[seed_index + 1:] = linear_recurrence(alpha * values[seed_index + 1:], 1 - alpha, seed)
+    return result
+
+def ema(values: Sequence[float], period: int) -> np.ndarray:
+    """Exponential moving average with alpha = 2 / (period + 1), seeded with an SMA"""
+    return _smoothed(_as_array(values), period, 2.0 / (period + 1))
+
+def wilder(values: Sequence[float], period: int) -> np.ndarray:
+    """Wilder's smoothing (alpha = 1 / period), as used by RSI and ATR"""
+    return _smoothed(_as_array(values), period, 1.0 / period)
+
+def rsi(closes: Sequence[float], period: int = 14) -> np.ndarray:
+    """Wilder's Relative Strength Index; NaN for the first period closes"""
+    closes = _as_array(closes)
+    result = _nan_array(len(closes))
+    if len(closes) <= period:
+        return result
+
+    changes = np.diff(closes)
+    average_gain = wilder(np.clip(changes, 0, None), period)
+    average_loss = wilder(np.clip(-changes, 0, None), period)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        strength = 100 - 100 / (1 + average_gain / average_loss)
+    # No losses in the window: 100, or 50 for a flat window
+    strength = np.where(average_loss == 0, np.where(average_gain == 0, 50.0, 100.0), strength)
+    result[1:] = strength
+    return result
+
+def macd(closes: Sequence[float], fast: int = 12, slow: int = 26, signal: int = 9) -> Dict[str, np.ndarray]:
+    """MACD line (fast EMA - slow EMA), its signal EMA and the histogram"""
+    closes = _as_array(closes)
+    line = ema(closes, fast) - ema(closes, slow)
+    signal_line = ema(line, signal)
+    return {"macd": line, "signal": signal_line, "histogram": line - signal_line}
+
+def rolling_std(values: Sequence[float], period: int) -> np.ndarray:
+    """
+    Population standard deviation over a rolling window, from cumulative sums
+    of x and x**2
+
+    Values are centred on their mean first to limit cancellation in
+    E[x**2] - E[x]**2 at high price levels.
+    """
+    values = _as_array(values)
+    result = _nan_array(len(values))
+    if len(values) < period:
+        return result
+
+    centred = values - values.mean()
+    mean = _window_sums(centred, period) / period
+    mean_square = _window_sums(centred * centred, period) / period
+    result[period - 1:] = np.sqrt(np.clip(mean_square - mean * mean, 0, None))
+    return result
+
+def bollinger(closes: Sequence[float], period: int = 20, width: float = 2.0) -> Dict[str, np.ndarray]:
+    """Bollinger Bands: SMA middle band plus and minus width standard deviations"""
+    middle = sma(closes, period)
+    deviation = rolling_std(closes, period)
+    return {"upper": middle + width * deviation, "middle": middle, "lower": middle - width * deviation}
+
+def true_range(highs: Sequence[float], lows: Sequence[float], closes: Sequence[float]) -> np.ndarray:
+    highs, lows, closes = _as_array(highs), _as_array(lows), _as_array(closes)
+    ranges = highs - lows
+    if len(closes) > 1:
+        previous = closes[:-1]
+        ranges[1:] = np.maximum.reduce([ranges[1:], np.abs(highs[1:] - previous), np.abs(lows[1:] - previous)])
+    return ranges
+
+def atr(highs: Sequence[float], lows: Sequence[float], closes: Sequence[float], period: int = 14) -> np.ndarray:
+    """Average True Range with Wilder's smoothing"""
+    return wilder(true_range(highs, lows, closes), period)
+
+def vwap(
+    highs: Sequence[float],
+    lows: Sequence[float],
+    closes: Sequence[float],
+    volumes: Sequence[float],
+    period: Optional[int] = None
+) -> np.ndarray:
+    """
+    Volume-weighted average of the typical price (high + low + close) / 3
+
+    Anchored at the first candle, or over a rolling window of period candles.
+    """
+    typical = (_as_array(highs) + _as_array(lows) + _as_array(closes)) / 3
+    volumes = _as_array(volumes)
+    result = _nan_array(len(typical))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if period is None:
+            result[:] = np.cumsum(typical * volumes) / np.cumsum(volumes)
+        elif len(typical) >= period:
+            result[period - 1:] = _window_sums(typical * volumes, period) / _window_sums(volumes, period)
+    return result
+
+def to_list(values: np.ndarray) -> List[Optional[float]]:
+    """JSON-friendly list with None for NaN (warm-up) points"""
+    converted = values.astype(object)
+    converted[np.isnan(values)] = None
+    return converted.tolist()
+
+# name -> (default parameters, number of parameters)
+INDICATOR_DEFAULTS: Dict[str, Tuple[float, ...]] = {
+    "sma": (20,),
+    "ema": (20,),
+    "wma": (20,),
+    "rsi": (14,),
+    "macd": (12, 26, 9),
+    "bollinger": (20, 2.0),
+    "atr": (14,),
+    "vwap": (),
+}
+
+def parse_indicator_spec(spec: str) -> List[Tuple[str, Tuple[float, ...]]]:
+    """
+    Parse a comma-separated indicator list such as "sma:50,rsi,macd:12:26:9"
+
+    Missing parameters take their defaults; vwap accepts an optional window.
+
+    Raises:
+        ValueError: For unknown indicators or malformed parameters
+    """
+    parsed = []
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, *raw = item.lower().split(":")
+        if name not in INDICATOR_DEFAULTS:
+            raise ValueError(f"Unknown indicator: {name}")
+        defaults = INDICATOR_DEFAULTS[name]
+        limit = 1 if name == "vwap" else len(defaults)
+        if len(raw) > limit:
+            raise ValueError(f"Too many parameters for {name}")
+        try:
+            params = tuple(float(value) for value in raw)
+        except ValueError:
+            raise ValueError(f"Invalid parameters for {name}: {item}")
+        if any(value <= 0 for value in params):
+            raise ValueError(f"Parameters for {name} must be positive")
+        # Everything but the Bollinger band width is a candle count
+        periods = params[:1] if name == "bollinger" else params
+        if any(not value.is_integer() for value in periods):
+            raise ValueError(f"Periods for {name} must be whole numbers")
+        parsed.append((name, params + defaults[len(params):]))
+    return parsed
+
+def indicator_key(name: str, params: Tuple[float, ...]) -> str:
+    """Result key such as "sma_50" or "macd_12_26_9" """
+    return "_".join([name] + [f"{value:g}" for value in params])
+
+def compute_indicators(candles: List[Dict[str, Any]], spec: str) -> Dict[str, Any]:
+    """
+    Compute the indicators in spec over OHLCV candles
+
+    Args:
+        candles: Dictionaries with "open", "high", "low", "close" and "volume"
+        spec: Indicator list, see parse_indicator_spec
+
+    Returns:
+        Indicator key -> list of values, or dict of lists for multi-line
+        indicators (macd, bollinger); warm-up points are None
+    """
+    indicators = parse_indicator_spec(spec)
+    count = len(candles)
+    highs = np.fromiter((candle["high"] for candle in candles), dtype=float, count=count)
+    lows = np.fromiter((candle["low"] for candle in candles), dtype=float, count=count)
+    closes = np.fromiter((candle["close"] for candle in candles), dtype=float, count=count)
+    volumes = np.fromiter((candle["volume"] for candle in candles), dtype=float, count=count)
+
+    results: Dict[str, Any] = {}
+    for name, params in indicators:
+        periods = [int(value) for value in params]
+        if name == "sma":
+            values = sma(closes, periods[0])
+        elif name == "ema":
+            values = ema(closes, periods[0])
+        elif name == "wma":
+            values = wma(closes, periods[0])
+        elif name == "rsi":
+            values = rsi(closes, periods[0])
+        elif name == "macd":
+            values = macd(closes, *periods)
+        elif name == "bollinger":
+            values = bollinger(closes, periods[0], params[1])
+        elif name == "atr":
+            values = atr(highs, lows, closes, periods[0])
+        else:
+            values = vwap(highs, lows, closes, volumes, periods[0] if periods else None)
+
+        key = indicator_key(name, params)
+        if isinstance(values, dict):
+            results[key] = {line: to_list(series) for line, series in values.items()}
+        else:
+            results[key] = to_list(values)
+    return results
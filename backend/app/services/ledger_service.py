@@ -0,0 +1,387 @@
+import os
+import time
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from pymongo import ASCENDING, DESCENDING, DeleteMany, DeleteOne, InsertOne, UpdateOne
+from pymongo.errors import DuplicateKeyError
+from bson import ObjectId
+
+from app.services.cost_basis import (
+    AVERAGE, COST_BASIS_METHODS, FIFO, LIFO, QUANTITY_EPSILON, PositionBook, apply_transaction, to_epoch
+)
+from app.services.price_book import PriceBook, normalize_asset_symbol, price_book
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+DEFAULT_COST_BASIS_METHOD = os.environ.get("COST_BASIS_METHOD", FIFO)
+
+# Writes to one position are serialized by a lease in position_locks; a
+# holder that dies loses it after LEDGER_LOCK_TIMEOUT_SECONDS
+LEDGER_LOCK_TIMEOUT_SECONDS = float(os.environ.get("LEDGER_LOCK_TIMEOUT_SECONDS", "30"))
+LEDGER_LOCK_WAIT_SECONDS = float(os.environ.get("LEDGER_LOCK_WAIT_SECONDS", "10"))
+LEDGER_LOCK_POLL_SECONDS = 0.05
+LEDGER_REBUILD_ATTEMPTS = 3
+
+Books = Dict[str, PositionBook]
+
+# Sides that close lots, and therefore need the stored lots loaded
+CLOSING_SIDES = ("sell", "transfer_out")
+
+class PositionBusyError(Exception):
+    """Raised when another writer holds a position for too long"""
+
+def new_books() -> Books:
+    """One empty position book per cost basis method"""
+    return {method: PositionBook(method) for method in COST_BASIS_METHODS}
+
+def load_books(position: Optional[Dict[str, Any]], lots: Optional[Dict[str, List[Dict[str, Any]]]] = None) -> Books:
+    """Restore the position books from a positions document and the lots loaded for it"""
+    if not position:
+        return new_books()
+    lots = lots or {}
+    return {method: PositionBook.from_dict(state, lots.get(method, ())) for method, state in position["books"].items()}
+
+def has_embedded_lots(position: Optional[Dict[str, Any]]) -> bool:
+    """Positions written before lots moved to position_lots keep them inline"""
+    return bool(position) and any("lots" in state for state in position["books"].values())
+
+def needs_replay(position: Optional[Dict[str, Any]]) -> bool:
+    """
+    True if a position's stored lots cannot be trusted
+
+    Either they are still inline, or a writer stored the totals and died
+    before its lot writes finished.
+    """
+    return has_embedded_lots(position) or bool(position and position.get("lots_pending"))
+
+async def _acquire_position_lock(db, username: str, symbol: str, token: ObjectId) -> bool:
+    now = datetime.utcnow()
+    lease = {"token": token, "expires_at": now + timedelta(seconds=LEDGER_LOCK_TIMEOUT_SECONDS)}
+    try:
+        await db.position_locks.insert_one({"username": username, "symbol": symbol, **lease})
+        return True
+    except DuplicateKeyError:
+        pass
+    # Take over a lease whose holder never released it
+    result = await db.position_locks.update_one(
+        {"username": username, "symbol": symbol, "expires_at": {"$lt": now}},
+        {"$set": lease}
+    )
+    return result.modified_count == 1
+
+@asynccontextmanager
+async def position_lock(db, username: str, symbol: str):
+    """
+    Hold the lease that serializes ledger writes to one position
+
+    Concurrent requests for the same position, in this worker or another,
+    wait their turn, so no replay ever sees a transaction another request
+    has yet to validate.
+
+    Raises:
+        PositionBusyError: If the lease is not free within LEDGER_LOCK_WAIT_SECONDS
+    """
+    token = ObjectId()
+    deadline = time.monotonic() + LEDGER_LOCK_WAIT_SECONDS
+    while not await _acquire_position_lock(db, username, symbol, token):
+        if time.monotonic() >= deadline:
+            raise PositionBusyError(f"The {symbol} position is being updated, try again")
+        await asyncio.sleep(LEDGER_LOCK_POLL_SECONDS)
+    try:
+        yield
+    finally:
+        await db.position_locks.delete_one({"username": username, "symbol": symbol, "token": token})
+
+def _lot_filter(username: str, symbol: str, method: str) -> Dict[str, Any]:
+    return {"username": username, "symbol": symbol, "method": method}
+
+async def load_closing_lots(db, username: str, symbol: str, method: str, quantity: float) -> List[Dict[str, Any]]:
+    """
+    Load the open lots a close of quantity consumes, in close order
+
+    Reads through the username/symbol/method/timestamp/sequence index and
+    stops once the quantity is covered, so a sell costs O(lots it closes).
+    """
+    direction = DESCENDING if method == LIFO else ASCENDING
+    cursor = db.position_lots.find(_lot_filter(username, symbol, method)).sort(
+        [("timestamp", direction), ("sequence", direction)]
+    )
+    lots = []
+    covered = 0.0
+    async for lot in cursor:
+        lots.append(lot)
+        covered += lot["quantity"]
+        if covered >= quantity - QUANTITY_EPSILON:
+            break
+    return lots
+
+def _lot_requests(username: str, symbol: str, books: Books, loaded: Dict[str, Dict[int, float]]) -> List[Any]:
+    """Bulk write requests turning the loaded lots into the books' current lots"""
+    requests: List[Any] = []
+    for method, book in books.items():
+        if method == AVERAGE:
+            continue
+        lot_filter = _lot_filter(username, symbol, method)
+        if book.lot_count == 0:
+            requests.append(DeleteMany(lot_filter))
+            continue
+
+        before = loaded.get(method, {})
+        current = {lot["sequence"]: lot for lot in book.open_lots()}
+        for sequence, quantity in before.items():
+            lot = current.get(sequence)
+            if lot is None:
+                requests.append(DeleteOne({**lot_filter, "sequence": sequence}))
+            elif lot["quantity"] != quantity:
+                requests.append(UpdateOne({**lot_filter, "sequence": sequence}, {"$set": {"quantity": lot["quantity"]}}))
+        for sequence, lot in current.items():
+            if sequence not in before:
+                requests.append(InsertOne({**lot_filter, **lot}))
+    return requests
+
+async def _store_totals(db, username: str, symbol: str, books: Books, version: Optional[int]) -> Optional[int]:
+    """
+    Store the position totals, guarded by the version they were loaded at
+
+    The position is flagged lots_pending until the caller has written the
+    matching lots, so a writer that dies in between leaves a position the
+    next trade replays instead of trusting.
+
+    Returns:
+        The new version, or None if another writer updated the position
+        in the meantime
+    """
+    state = {method: book.to_dict() for method, book in books.items()}
+    if version is None:
+        try:
+            await db.positions.insert_one({
+                "username": username,
+                "symbol": symbol,
+                "books": state,
+                "version": 1,
+                "lots_pending": True,
+                "updated_at": datetime.utcnow()
+            })
+            return 1
+        except DuplicateKeyError:
+            return None
+
+    result = await db.positions.update_one(
+        {"username": username, "symbol": symbol, "version": version},
+        {"$set": {"books": state, "lots_pending": True, "updated_at": datetime.utcnow()}, "$inc": {"version": 1}}
+    )
+    return version + 1 if result.modified_count == 1 else None
+
+async def _lots_stored(db, username: str, symbol: str, version: int):
+    await db.positions.update_one(
+        {"username": username, "symbol": symbol, "version": version},
+        {"$unset": {"lots_pending": ""}}
+    )
+
+async def _save_position(db, username: str, symbol: str, books: Books,
+                         loaded: Dict[str, Dict[int, float]], version: Optional[int]) -> bool:
+    """
+    Store the position totals guarded by the version they were loaded at,
+    then the lots the trade changed
+
+    Lots are only written once the version check has passed, so a writer
+    that lost it never touches them; it replays the ledger instead.
+
+    Returns:
+        False if another writer updated the position in the meantime
+    """
+    stored = await _store_totals(db, username, symbol, books, version)
+    if stored is None:
+        return False
+
+    requests = _lot_requests(username, symbol, books, loaded)
+    if requests:
+        await db.position_lots.bulk_write(requests)
+    await _lots_stored(db, username, symbol, stored)
+    return True
+
+async def rebuild_position(db, username: str, symbol: str, transaction_id: Optional[ObjectId] = None) -> Tuple[Books, Dict[str, float]]:
+    """
+    Replay a symbol's ledger from the start and store the resulting position
+
+    Only needed when the stored position cannot be updated incrementally:
+    backdated trades, concurrent writers and positions whose lots are inline
+    or were left half written. The result is stored guarded by the version
+    read before the replay, which is retried if the position moved.
+
+    Args:
+        db: Motor database
+        username: Owner of the ledger
+        symbol: Normalized asset symbol
+        transaction_id: Transaction whose realized PnL should be reported
+
+    Returns:
+        (books, realized PnL of transaction_id per method)
+
+    Raises:
+        InsufficientQuantityError: If the ledger sells more than it holds
+        PositionBusyError: If the position kept changing during the replays
+    """
+    for _ in range(LEDGER_REBUILD_ATTEMPTS):
+        position = await db.positions.find_one({"username": username, "symbol": symbol}, {"version": 1})
+        books = new_books()
+        realized = {method: 0.0 for method in books}
+        cursor = db.transactions.find(
+            {"username": username, "symbol": symbol}
+        ).sort([("timestamp", ASCENDING), ("_id", ASCENDING)])
+
+        async for transaction in cursor:
+            for method, book in books.items():
+                pnl = apply_transaction(book, transaction)
+                if transaction["_id"] == transaction_id:
+                    realized[method] = pnl
+
+        stored = await _store_totals(db, username, symbol, books, position and position["version"])
+        if stored is not None:
+            break
+        logger.info(f"{username}/{symbol} position changed during replay, replaying again")
+    else:
+        raise PositionBusyError(f"The {symbol} position is being updated, try again")
+
+    await db.position_lots.delete_many({"username": username, "symbol": symbol})
+    lots = [
+        {**_lot_filter(username, symbol, method), **lot}
+        for method, book in books.items()
+        for lot in book.open_lots()
+    ]
+    if lots:
+        await db.position_lots.insert_many(lots)
+    await _lots_stored(db, username, symbol, stored)
+    return books, realized
+
+async def record_transaction(db, username: str, transaction: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Append a transaction to the ledger and update the stored position
+
+    In-order trades load only the open lots they close and write only the
+    lots they change. A backdated trade changes which lots later sells
+    consumed, so it triggers a replay of that symbol instead, as does a
+    position still stored with its lots inline or left half written.
+    Writes to the same position run one at a time (see position_lock).
+
+    Args:
+        db: Motor database
+        username: Owner of the ledger
+        transaction: Validated TransactionCreate fields
+
+    Returns:
+        The stored transaction with its realized PnL per method
+
+    Raises:
+        InsufficientQuantityError: If a sell or transfer out exceeds the
+            open quantity
+        PositionBusyError: If another writer holds the position for too long
+    """
+    symbol = normalize_asset_symbol(transaction["symbol"])
+    document = {
+        **transaction,
+        "username": username,
+        "symbol": symbol,
+        "timestamp": transaction.get("timestamp") or datetime.utcnow(),
+    }
+
+    async with position_lock(db, username, symbol):
+        position = await db.positions.find_one({"username": username, "symbol": symbol})
+        timestamp = to_epoch(document["timestamp"])
+        in_order = not needs_replay(position) and all(
+            timestamp >= state["last_timestamp"] for state in (position["books"].values() if position else ())
+        )
+
+        lots = {}
+        if in_order and position and document["side"] in CLOSING_SIDES:
+            for method in COST_BASIS_METHODS:
+                if method != AVERAGE:
+                    lots[method] = await load_closing_lots(db, username, symbol, method, document["amount"])
+        books = load_books(position, lots)
+        loaded = {method: {lot["sequence"]: lot["quantity"] for lot in book.open_lots()} for method, book in books.items()}
+
+        realized = {}
+        if in_order:
+            # Validates the quantity before anything is written
+            for method, book in books.items():
+                realized[method] = apply_transaction(book, document)
+
+        result = await db.transactions.insert_one(document)
+        document["_id"] = result.inserted_id
+
+        if not in_order or not await _save_position(db, username, symbol, books, loaded, position and position["version"]):
+            if in_order:
+                logger.info(f"Concurrent update of {username}/{symbol} position, replaying ledger")
+            try:
+                books, realized = await rebuild_position(db, username, symbol, document["_id"])
+            except ValueError:
+                await db.transactions.delete_one({"_id": document["_id"]})
+                raise
+
+    document["id"] = str(document.pop("_id"))
+    document["realized_pnl"] = realized
+    return document
+
+async def get_transactions(db, username: str, symbol: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
+    """Most recent ledger transactions of a user, optionally for one symbol"""
+    query: Dict[str, Any] = {"username": username}
+    if symbol:
+        query["symbol"] = normalize_asset_symbol(symbol)
+    transactions = await db.transactions.find(query).sort(
+        [("timestamp", DESCENDING), ("_id", DESCENDING)]
+    ).limit(limit).to_list(length=limit)
+    for transaction in transactions:
+        transaction["id"] = str(transaction.pop("_id"))
+    return transactions
+
+def summarize_positions(positions: List[Dict[str, Any]], prices: PriceBook, method: str = DEFAULT_COST_BASIS_METHOD) -> Dict[str, Any]:
+    """
+    Realized and unrealized PnL per symbol from the stored positions
+
+    Reads only the running totals of each position, never the ledger.
+
+    Args:
+        positions: Documents from the positions collection
+        prices: Price book to mark open quantities to market
+        method: Cost basis method to report
+
+    Returns:
+        Totals and per-symbol quantity, cost basis and PnL
+    """
+    book_prices = prices.snapshot()
+    assets = []
+    for position in positions:
+        totals = position["books"][method]
+        quantity, cost = totals["quantity"], totals["cost"]
+        price = book_prices.get(position["symbol"])
+        assets.append({
+            "symbol": position["symbol"],
+            "quantity": quantity,
+            "cost_basis": cost,
+            "average_cost": cost / quantity if quantity else 0.0,
+            "open_lots": totals.get("open_lots", len(totals.get("lots", ()))),
+            "price": price,
+            "market_value": quantity * price if price is not None else None,
+            "realized_pnl": totals["realized_pnl"],
+            "unrealized_pnl": quantity * price - cost if price is not None else None,
+        })
+
+    return {
+        "method": method,
+        "total_cost_basis": sum(asset["cost_basis"] for asset in assets),
+        "total_realized_pnl": sum(asset["realized_pnl"] for asset in assets),
+        "total_unrealized_pnl": sum(asset["unrealized_pnl"] or 0 for asset in assets),
+        "assets": assets
+    }
+
+async def get_positions(db, username: str, method: str = DEFAULT_COST_BASIS_METHOD, prices: Optional[PriceBook] = None) -> Dict[str, Any]:
+    """Load a user's stored positions and summarize them (see summarize_positions)"""
+    positions = await db.positions.find(
+        {"username": username},
+        {"symbol": 1, f"books.{method}": 1}
+    ).sort("symbol", ASCENDING).to_list(length=None)
+    return summarize_positions(positions, prices or price_book, method)
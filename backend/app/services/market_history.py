@@ -0,0 +1,329 @@
+import os
+import asyncio
+import logging
+import threading
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, Iterable, List, Optional, Set, Tuple
+from bson import json_util
+from pymongo import ASCENDING
+from pymongo.errors import BulkWriteError
+from prometheus_client import Counter
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Persistence is opt-in; when disabled every record_* call is a no-op
+MARKET_HISTORY_ENABLED = os.environ.get("MARKET_HISTORY_ENABLED", "false").lower() == "true"
+MARKET_HISTORY_BATCH_SIZE = int(os.environ.get("MARKET_HISTORY_BATCH_SIZE", "1000"))
+MARKET_HISTORY_FLUSH_SECONDS = float(os.environ.get("MARKET_HISTORY_FLUSH_SECONDS", "2"))
+MARKET_HISTORY_MAX_BUFFER = int(os.environ.get("MARKET_HISTORY_MAX_BUFFER", "10000"))
+# Documents that do not fit in the buffer are appended here, or dropped if unset
+MARKET_HISTORY_SPILL_PATH = os.environ.get("MARKET_HISTORY_SPILL_PATH")
+# Candle open times remembered per pair and interval to skip repeats in memory
+MARKET_HISTORY_SEEN_CANDLES = int(os.environ.get("MARKET_HISTORY_SEEN_CANDLES", "2000"))
+
+# Per-document write errors worth retrying (failover, shutdown, timeouts);
+# anything else, e.g. a validation failure, fails the same way every time
+TRANSIENT_WRITE_ERROR_CODES = {6, 7, 50, 89, 91, 112, 189, 262, 9001, 10107, 11600, 11602, 13435, 13436}
+
+TICKS = "ticks"
+CANDLES = "candles"
+COLLECTIONS = {TICKS: "market_ticks", CANDLES: "market_candles"}
+
+MARKET_HISTORY_DOCUMENTS = Counter(
+    "market_history_documents_total",
+    "Ticks and candles handled by the market history writer",
+    ["kind", "outcome"],
+)
+
+def pair_symbol(symbol: str) -> str:
+    """Binance USDT pair for "BTC", "btc" or "BTCUSDT" alike"""
+    symbol = symbol.strip().upper()
+    return symbol if symbol.endswith("USDT") else f"{symbol}USDT"
+
+def _from_ms(value: int) -> datetime:
+    return datetime.fromtimestamp(value / 1000, tz=timezone.utc)
+
+def kline_document(symbol: str, interval: str, kline: List[Any]) -> Dict[str, Any]:
+    """Time-series document for one raw Binance kline"""
+    return {
+        "open_time": _from_ms(kline[0]),
+        "meta": {"symbol": pair_symbol(symbol), "interval": interval},
+        "close_time": _from_ms(kline[6]),
+        "open": float(kline[1]),
+        "high": float(kline[2]),
+        "low": float(kline[3]),
+        "close": float(kline[4]),
+        "volume": float(kline[5]),
+        "quote_volume": float(kline[7]),
+        "trades": int(kline[8]),
+    }
+
+class MarketHistoryWriter:
+    """
+    Buffers ticks and closed candles in memory and writes them in batches
+
+    record_* calls never touch MongoDB and are safe to call from any thread.
+    A background task flushes the buffer every MARKET_HISTORY_FLUSH_SECONDS
+    with unordered insert_many calls. The buffer holds at most max_buffer
+    documents; on backpressure (MongoDB slow or down) the excess is spilled
+    to an NDJSON file and replayed once the buffer drains, or shed if no
+    spill path is configured.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = MARKET_HISTORY_BATCH_SIZE,
+        max_buffer: int = MARKET_HISTORY_MAX_BUFFER,
+        spill_path: Optional[str] = MARKET_HISTORY_SPILL_PATH
+    ):
+        self.batch_size = batch_size
+        self.max_buffer = max_buffer
+        self.spill_path = spill_path
+        self.running = False
+        self._buffers: Dict[str, Deque[Dict[str, Any]]] = {TICKS: deque(), CANDLES: deque()}
+        self._lock = threading.Lock()
+        self._spill_lock = threading.Lock()
+        # Recently queued candle open times per (symbol, interval), oldest first
+        self._seen_candles: Dict[Tuple[str, str], "OrderedDict[datetime, None]"] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._db = None
+
+    def _buffered(self) -> int:
+        return sum(len(buffer) for buffer in self._buffers.values())
+
+    def _overflow(self, kind: str, documents: List[Dict[str, Any]]):
+        if not documents:
+            return
+        if not self.spill_path:
+            MARKET_HISTORY_DOCUMENTS.labels(kind, "dropped").inc(len(documents))
+            return
+        try:
+            with self._spill_lock, open(self.spill_path, "a", encoding="utf-8") as spill:
+                for document in documents:
+                    spill.write(json_util.dumps({"kind": kind, "document": document}) + "\n")
+            MARKET_HISTORY_DOCUMENTS.labels(kind, "spilled").inc(len(documents))
+        except OSError as e:
+            logger.error(f"Error spilling market history: {e}")
+            MARKET_HISTORY_DOCUMENTS.labels(kind, "dropped").inc(len(documents))
+
+    def _enqueue(self, kind: str, documents: List[Dict[str, Any]], front: bool = False):
+        with self._lock:
+            room = max(self.max_buffer - self._buffered(), 0)
+            accepted, rejected = documents[:room], documents[room:]
+            if front:
+                self._buffers[kind].extendleft(reversed(accepted))
+            else:
+                self._buffers[kind].extend(accepted)
+        self._overflow(kind, rejected)
+
+    def record_ticks(self, tickers: Iterable[Dict[str, Any]], timestamp: Optional[datetime] = None):
+        """
+        Queue the latest price of each ticker
+
+        Args:
+            tickers: Dictionaries with "symbol" and "price"
+            timestamp: Observation time, defaults to now
+        """
+        if not self.running:
+            return
+        timestamp = timestamp or datetime.now(timezone.utc)
+        documents = [
+            {"timestamp": timestamp, "symbol": pair_symbol(ticker["symbol"]), "price": float(ticker["price"])}
+            for ticker in tickers
+        ]
+        self._enqueue(TICKS, documents)
+
+    def record_klines(self, symbol: str, interval: str, klines: List[List[Any]]):
+        """
+        Queue the closed candles among raw Binance klines
+
+        The still-open candle and candles recently queued for the same
+        (symbol, interval, open_time) are skipped, so overlapping chart
+        requests do not store duplicates while backfilled ranges are still
+        recorded. Candles already in MongoDB are dropped at flush time.
+        """
+        if not self.running:
+            return
+        now_ms = datetime.now(timezone.utc).timestamp() * 1000
+        key = (pair_symbol(symbol), interval)
+        documents = []
+        with self._lock:
+            seen = self._seen_candles.setdefault(key, OrderedDict())
+            for kline in klines:
+                if kline[6] >= now_ms:
+                    continue
+                document = kline_document(symbol, interval, kline)
+                if document["open_time"] in seen:
+                    continue
+                seen[document["open_time"]] = None
+                if len(seen) > MARKET_HISTORY_SEEN_CANDLES:
+                    seen.popitem(last=False)
+                documents.append(document)
+        self._enqueue(CANDLES, documents)
+
+    def _take(self, kind: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            buffer = self._buffers[kind]
+            return [buffer.popleft() for _ in range(min(self.batch_size, len(buffer)))]
+
+    def _take_all(self, kind: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            documents = list(self._buffers[kind])
+            self._buffers[kind].clear()
+            return documents
+
+    async def _stored_candles(self, batch: List[Dict[str, Any]]) -> Set[Tuple[str, str, datetime]]:
+        """(symbol, interval, open_time) of the candles in batch that MongoDB already holds"""
+        open_times: Dict[Tuple[str, str], List[datetime]] = {}
+        for document in batch:
+            key = (document["meta"]["symbol"], document["meta"]["interval"])
+            open_times.setdefault(key, []).append(document["open_time"])
+
+        stored = set()
+        for (symbol, interval), times in open_times.items():
+            cursor = self._db[COLLECTIONS[CANDLES]].find(
+                {"meta.symbol": symbol, "meta.interval": interval, "open_time": {"$in": times}},
+                {"_id": 0, "open_time": 1}
+            )
+            async for row in cursor:
+                # MongoDB returns naive UTC datetimes
+                stored.add((symbol, interval, row["open_time"].replace(tzinfo=timezone.utc)))
+        return stored
+
+    async def _write(self, kind: str, batch: List[Dict[str, Any]]) -> Tuple[int, List[Dict[str, Any]]]:
+        """
+        Insert one batch
+
+        Returns:
+            (documents written, documents to retry)
+        """
+        if kind == CANDLES:
+            stored = await self._stored_candles(batch)
+            batch = [
+                document for document in batch
+                if (document["meta"]["symbol"], document["meta"]["interval"], document["open_time"]) not in stored
+            ]
+            if not batch:
+                return 0, []
+
+        try:
+            await self._db[COLLECTIONS[kind]].insert_many(batch, ordered=False)
+        except BulkWriteError as e:
+            # Unordered: everything without a write error was inserted
+            retry = []
+            for error in e.details.get("writeErrors", []):
+                if error.get("code") in TRANSIENT_WRITE_ERROR_CODES:
+                    retry.append(batch[error["index"]])
+                else:
+                    logger.error(f"Dropping invalid {kind} document: {error.get('errmsg')}")
+                    MARKET_HISTORY_DOCUMENTS.labels(kind, "rejected").inc()
+            return e.details.get("nInserted", 0), retry
+        except Exception as e:
+            # Nothing was acknowledged (e.g. MongoDB unreachable); keep the whole batch
+            logger.error(f"Error writing {kind} history: {e}")
+            return 0, batch
+        return len(batch), []
+
+    async def flush(self) -> int:
+        """
+        Write everything buffered so far
+
+        Documents that failed with a transient error are kept for the next
+        flush; documents MongoDB rejected as invalid are dropped.
+
+        Returns:
+            Number of documents written
+        """
+        written = 0
+        for kind in COLLECTIONS:
+            while True:
+                batch = self._take(kind)
+                if not batch:
+                    break
+                inserted, retry = await self._write(kind, batch)
+                written += inserted
+                MARKET_HISTORY_DOCUMENTS.labels(kind, "written").inc(inserted)
+                if retry:
+                    # Keep them for the next flush, spilling what no longer fits
+                    self._enqueue(kind, retry, front=True)
+                    break
+        return written
+
+    async def replay_spill(self) -> int:
+        """
+        Write spilled documents back once the buffer has drained
+
+        Returns:
+            Number of documents replayed
+        """
+        if not self.spill_path or self._buffered() > self.max_buffer // 2:
+            return 0
+
+        # A leftover replay file means the previous replay was interrupted
+        replay_path = f"{self.spill_path}.replay"
+        if not os.path.exists(replay_path):
+            with self._spill_lock:
+                if not os.path.exists(self.spill_path):
+                    return 0
+                os.replace(self.spill_path, replay_path)
+
+        # Write as we go so the replay itself never overflows the buffer
+        threshold = min(self.batch_size, max(self.max_buffer // 2, 1))
+        replayed = 0
+        with open(replay_path, encoding="utf-8") as spill:
+            for line in spill:
+                entry = json_util.loads(line)
+                self._enqueue(entry["kind"], [entry["document"]])
+                replayed += 1
+                if self._buffered() >= threshold:
+                    await self.flush()
+        await self.flush()
+        os.remove(replay_path)
+        return replayed
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(MARKET_HISTORY_FLUSH_SECONDS)
+            try:
+                await self.flush()
+                await self.replay_spill()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error flushing market history: {e}")
+
+    async def start(self, db):
+        """Start accepting documents and flushing them to db"""
+        self._db = db
+        self.running = True
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the flush task and write what is still buffered"""
+        self.running = False
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._db is not None:
+            await self.flush()
+            # Anything MongoDB did not take goes to the spill file for the next run
+            for kind in COLLECTIONS:
+                self._overflow(kind, self._take_all(kind))
+
+market_history = MarketHistoryWriter()
+
+async def get_candles(db, symbol: str, interval: str, start: datetime, end: datetime, limit: int = 1000) -> List[Dict[str, Any]]:
+    """Stored candles of a pair in [start, end], oldest first"""
+    return await db[COLLECTIONS[CANDLES]].find(
+        {"meta.symbol": pair_symbol(symbol), "meta.interval": interval, "open_time": {"$gte": start, "$lte": end}},
+        {"_id": 0, "meta": 0}
+    ).sort("open_time", ASCENDING).limit(limit).to_list(length=limit)
+
+async def get_ticks(db, symbol: str, start: datetime, end: datetime, limit: int = 1000) -> List[Dict[str, Any]]:
+    """Stored ticks of a pair in [start, end], oldest first"""
+    return await db[COLLECTIONS[TICKS]].find(
+        {"symbol": pair_symbol(symbol), "timestamp": {"$gte": start, "$lte": end}},
+        {"_id": 0, "symbol": 0}
+    ).sort("timestamp", ASCENDING).limit(limit).to_list(length=limit)
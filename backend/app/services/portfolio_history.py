@@ -0,0 +1,161 @@
+import os
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Set
+from pymongo import ASCENDING
+
+from app.services.portfolio_summary import holding_key, summary_holdings
+from app.services.price_book import PriceBook, normalize_asset_symbol, price_book
+from app.services.valuation import value_holdings
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+PORTFOLIO_SNAPSHOT_INTERVAL_SECONDS = int(os.environ.get("PORTFOLIO_SNAPSHOT_INTERVAL_SECONDS", "86400"))
+PORTFOLIO_SNAPSHOT_BATCH_SIZE = int(os.environ.get("PORTFOLIO_SNAPSHOT_BATCH_SIZE", "500"))
+# How long the first run waits for live prices; without them (e.g. a mock
+# feed in development) holdings are snapshotted at cost
+PORTFOLIO_SNAPSHOT_PRICE_WAIT_SECONDS = float(os.environ.get("PORTFOLIO_SNAPSHOT_PRICE_WAIT_SECONDS", "60"))
+
+# Prices the previous run valued portfolios at; empty until the first run,
+# so every portfolio is snapshotted once after a restart
+_last_snapshot_prices: Dict[str, float] = {}
+
+def snapshot_bucket(now: datetime, interval_seconds: int = PORTFOLIO_SNAPSHOT_INTERVAL_SECONDS) -> datetime:
+    """Start of the snapshot interval containing now (UTC)"""
+    epoch = datetime(1970, 1, 1)
+    seconds = int((now - epoch).total_seconds())
+    return epoch + timedelta(seconds=seconds // interval_seconds * interval_seconds)
+
+def changed_symbols(previous: Dict[str, float], current: Dict[str, float]) -> Set[str]:
+    """Symbols whose price differs between two price book snapshots"""
+    return {symbol for symbol, price in current.items() if previous.get(symbol) != price} | (previous.keys() - current.keys())
+
+def needs_snapshot(summary: Dict[str, Any], changed: Set[str]) -> bool:
+    """
+    True if a user's value or composition may differ from their last snapshot
+
+    Either the holdings changed (the summary version moved) or the price of
+    a held symbol did.
+    """
+    if summary.get("version", 0) != summary.get("snapshot_version"):
+        return True
+    return any(normalize_asset_symbol(holding["symbol"]) in changed for holding in summary_holdings(summary))
+
+def snapshot_document(username: str, bucket: datetime, holdings: List[Dict[str, Any]], prices: PriceBook) -> Dict[str, Any]:
+    """Compact time-series point: totals plus amount per symbol"""
+    valuation = value_holdings(holdings, prices)
+    return {
+        "timestamp": bucket,
+        "username": username,
+        "value": valuation["total_value"],
+        "invested": valuation["total_investment"],
+        "profit_loss": valuation["profit_loss"],
+        "composition": {holding_key(asset["symbol"]): asset["amount"] for asset in valuation["assets"]},
+    }
+
+def _unsnapshotted(bucket: datetime) -> Dict[str, Any]:
+    return {"$or": [{"snapshot_at": {"$lt": bucket}}, {"snapshot_at": {"$exists": False}}]}
+
+async def _claim_snapshot(db, summary: Dict[str, Any], bucket: datetime) -> bool:
+    """
+    Atomically claim a user's point for an interval
+
+    The claim only matches while snapshot_at is before the bucket, so when
+    several workers run the same interval exactly one of them writes the point.
+    """
+    result = await db.portfolio_summaries.update_one(
+        {"_id": summary["_id"], **_unsnapshotted(bucket)},
+        {"$set": {"snapshot_at": bucket, "snapshot_version": summary.get("version", 0)}}
+    )
+    return result.modified_count == 1
+
+async def _snapshot_batch(db, summaries: List[Dict[str, Any]], bucket: datetime, prices: PriceBook) -> int:
+    claimed = await asyncio.gather(*(_claim_snapshot(db, summary, bucket) for summary in summaries))
+    documents = [
+        snapshot_document(summary["username"], bucket, summary_holdings(summary), prices)
+        for summary, won in zip(summaries, claimed) if won
+    ]
+    if documents:
+        await db.portfolio_history.insert_many(documents, ordered=False)
+    return len(documents)
+
+async def snapshot_portfolios(db, now: Optional[datetime] = None, prices: PriceBook = price_book) -> int:
+    """
+    Write one history point for every user whose portfolio changed since their last one
+
+    Each user's point is claimed on their summary before it is written, so
+    concurrent workers and reruns after a restart never duplicate a point;
+    a worker that dies between claim and insert loses that user's point for
+    the interval. A user with no point in an interval kept the value of
+    their previous point.
+
+    Args:
+        db: Motor database
+        now: Current time (UTC)
+        prices: Price book to value portfolios against
+
+    Returns:
+        Number of snapshots written by this call
+    """
+    global _last_snapshot_prices
+    bucket = snapshot_bucket(now or datetime.utcnow())
+    current = dict(prices.snapshot())
+    changed = changed_symbols(_last_snapshot_prices, current)
+
+    cursor = db.portfolio_summaries.find(
+        _unsnapshotted(bucket),
+        {"username": 1, "holdings": 1, "version": 1, "snapshot_version": 1}
+    )
+
+    written = 0
+    batch: List[Dict[str, Any]] = []
+    async for summary in cursor:
+        if not needs_snapshot(summary, changed):
+            continue
+        # The claim records the version read here, so a write that lands
+        # meanwhile is picked up next interval
+        batch.append(summary)
+        if len(batch) >= PORTFOLIO_SNAPSHOT_BATCH_SIZE:
+            written += await _snapshot_batch(db, batch, bucket, prices)
+            batch = []
+
+    written += await _snapshot_batch(db, batch, bucket, prices)
+    _last_snapshot_prices = current
+    logger.info(f"Wrote {written} portfolio snapshots for {bucket.isoformat()}")
+    return written
+
+async def get_portfolio_history(db, username: str, start: datetime, end: datetime) -> List[Dict[str, Any]]:
+    """
+    Get a user's portfolio value points in [start, end], oldest first
+
+    A range scan on the (username, timestamp) index of the time-series collection.
+    """
+    return await db.portfolio_history.find(
+        {"username": username, "timestamp": {"$gte": start, "$lte": end}},
+        {"_id": 0, "username": 0}
+    ).sort("timestamp", ASCENDING).to_list(length=None)
+
+async def run_portfolio_snapshots(db):
+    """Snapshot portfolio values once per interval until cancelled"""
+    # Prefer live prices to an empty book, but do not wait on a feed that
+    # only has mock data
+    waited = 0.0
+    while price_book.updated_at is None and waited < PORTFOLIO_SNAPSHOT_PRICE_WAIT_SECONDS:
+        await asyncio.sleep(1)
+        waited += 1
+    if price_book.updated_at is None:
+        logger.warning("No live prices yet, snapshotting portfolios at cost")
+
+    while True:
+        try:
+            await snapshot_portfolios(db, prices=price_book)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error snapshotting portfolios: {e}")
+
+        now = datetime.utcnow()
+        next_bucket = snapshot_bucket(now) + timedelta(seconds=PORTFOLIO_SNAPSHOT_INTERVAL_SECONDS)
+        await asyncio.sleep((next_bucket - now).total_seconds())
@@ -0,0 +1,350 @@
+import os
+import csv
+import json
+import base64
+import logging
+from datetime import datetime
+from typing import AsyncIterator, List, Dict, Any, Optional, Tuple, Union
+from pydantic import ValidationError
+from pymongo import DESCENDING
+from pymongo.errors import BulkWriteError
+from bson import ObjectId
+
+from app.core.models import PortfolioImportRow
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+def holdings_pipeline(username: str) -> List[Dict[str, Any]]:
+    """
+    Aggregation pipeline totalling a user's portfolio entries per symbol
+
+    Args:
+        username: Owner of the portfolio entries
+
+    Returns:
+        Pipeline stages for db.portfolios.aggregate
+    """
+    return [
+        {"$match": {"username": username}},
+        {"$group": {
+            "_id": "$symbol",
+            "amount": {"$sum": "$amount"},
+            "invested": {"$sum": {"$multiply": ["$amount", "$purchase_price"]}},
+            "entries": {"$sum": 1},
+        }},
+        {"$project": {
+            "_id": 0,
+            "symbol": "$_id",
+            "amount": 1,
+            "invested": 1,
+            "entries": 1,
+        }},
+        {"$sort": {"symbol": 1}},
+    ]
+
+# symbol -> {"amount", "invested", "entries"} change
+Delta = Dict[str, Dict[str, Any]]
+
+def entry_delta(entries: List[Dict[str, Any]], sign: int = 1, delta: Optional[Delta] = None) -> Delta:
+    """
+    Per-symbol change in holdings from adding (sign=1) or removing (sign=-1)
+    portfolio entries
+
+    Args:
+        entries: Portfolio entries with "symbol", "amount" and "purchase_price"
+        sign: 1 for added entries, -1 for removed entries
+        delta: Existing delta to accumulate into
+
+    Returns:
+        The accumulated delta
+    """
+    delta = {} if delta is None else delta
+    for entry in entries:
+        holding = delta.setdefault(entry["symbol"], {"amount": 0.0, "invested": 0.0, "entries": 0})
+        holding["amount"] += sign * entry["amount"]
+        holding["invested"] += sign * entry["amount"] * entry["purchase_price"]
+        holding["entries"] += sign
+    return delta
+
+async def get_holdings(db, username: str) -> List[Dict[str, Any]]:
+    """
+    Get a user's per-symbol holdings, computed server-side by MongoDB
+
+    Only one document per symbol crosses the wire, regardless of how many
+    portfolio entries the user has.
+
+    Args:
+        db: Motor database
+        username: Owner of the portfolio entries
+
+    Returns:
+        List of {"symbol", "amount", "invested", "entries"}
+    """
+    return await db.portfolios.aggregate(holdings_pipeline(username)).to_list(length=None)
+
+# Fields rendered by the portfolio listing
+PORTFOLIO_LIST_PROJECTION = {
+    "symbol": 1,
+    "amount": 1,
+    "purchase_price": 1,
+    "purchase_date": 1,
+    "notes": 1,
+}
+
+def encode_cursor(entry: Dict[str, Any]) -> str:
+    """Opaque pagination cursor pointing just after an entry"""
+    purchase_date = entry.get("purchase_date")
+    payload = {
+        "d": purchase_date.isoformat() if purchase_date else None,
+        "i": str(entry["_id"]),
+    }
+    return base64.urlsafe_b64encode(json.dumps(payload).encode("utf-8")).decode("ascii")
+
+def decode_cursor(cursor: str) -> Tuple[Optional[datetime], ObjectId]:
+    """
+    Parse a cursor produced by encode_cursor
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        purchase_date = datetime.fromisoformat(payload["d"]) if payload["d"] else None
+        return purchase_date, ObjectId(payload["i"])
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {e}")
+
+def keyset_filter(username: str, cursor: Optional[str]) -> Dict[str, Any]:
+    """
+    Filter selecting the entries after a cursor in (purchase_date desc, _id desc) order
+
+    Entries without a purchase_date sort last in descending order.
+    """
+    query: Dict[str, Any] = {"username": username}
+    if not cursor:
+        return query
+
+    purchase_date, entry_id = decode_cursor(cursor)
+    if purchase_date is None:
+        query["purchase_date"] = None
+        query["_id"] = {"$lt": entry_id}
+    else:
+        query["$or"] = [
+            {"purchase_date": {"$lt": purchase_date}},
+            {"purchase_date": purchase_date, "_id": {"$lt": entry_id}},
+            {"purchase_date": None},
+        ]
+    return query
+
+async def get_portfolio_page(db, username: str, limit: int, cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Get one page of a user's portfolio entries, newest purchase first
+
+    Uses keyset pagination on (purchase_date, _id), so every page costs one
+    bounded index range scan however deep into the ledger it is.
+
+    Args:
+        db: Motor database
+        username: Owner of the portfolio entries
+        limit: Page size
+        cursor: Cursor returned with the previous page
+
+    Returns:
+        (entries, cursor for the next page or None on the last page)
+    """
+    documents = await db.portfolios.find(
+        keyset_filter(username, cursor),
+        PORTFOLIO_LIST_PROJECTION
+    ).sort([("purchase_date", DESCENDING), ("_id", DESCENDING)]).limit(limit + 1).to_list(length=limit + 1)
+
+    next_cursor = encode_cursor(documents[limit - 1]) if len(documents) > limit else None
+    entries = []
+    for document in documents[:limit]:
+        document["id"] = str(document.pop("_id"))
+        entries.append(document)
+    return entries, next_cursor
+
+IMPORT_BATCH_SIZE = 1000
+IMPORT_MAX_REPORTED_ERRORS = 1000
+# Longer lines are reported as a failed row instead of being buffered
+IMPORT_MAX_LINE_BYTES = int(os.environ.get("IMPORT_MAX_LINE_BYTES", "65536"))
+
+class InvalidLine:
+    """A line of an import body that could not be read, reported as a failed row"""
+    __slots__ = ("reason",)
+
+    def __init__(self, reason: str):
+        self.reason = reason
+
+def _decode_line(line: bytes, first: bool) -> Union[str, InvalidLine]:
+    try:
+        text = line.rstrip(b"\r").decode("utf-8")
+    except UnicodeDecodeError as e:
+        return InvalidLine(f"invalid UTF-8 at byte {e.start}")
+    return text.lstrip("\ufeff") if first else text
+
+async def iter_lines(chunks: AsyncIterator[bytes], max_line_bytes: int = IMPORT_MAX_LINE_BYTES) -> AsyncIterator[Union[str, InvalidLine]]:
+    """
+    Split a streamed body into decoded lines
+
+    At most max_line_bytes of a line are buffered; the rest of an overlong
+    line is skipped. Overlong and non UTF-8 lines are yielded as InvalidLine.
+
+    Args:
+        chunks: Body chunks as they arrive
+        max_line_bytes: Longest accepted line, excluding the line break
+
+    Returns:
+        Async iterator of lines or InvalidLine markers
+    """
+    too_long = f"line is longer than {max_line_bytes} bytes"
+    buffer = bytearray()
+    overlong = False
+    first = True
+    async for chunk in chunks:
+        start = 0
+        while True:
+            end = chunk.find(b"\n", start)
+            piece = chunk[start:] if end == -1 else chunk[start:end]
+            if not overlong and len(buffer) + len(piece) > max_line_bytes:
+                overlong = True
+                buffer.clear()
+            if not overlong:
+                buffer += piece
+            if end == -1:
+                break
+
+            yield InvalidLine(too_long) if overlong else _decode_line(bytes(buffer), first)
+            first = False
+            overlong = False
+            buffer.clear()
+            start = end + 1
+
+    if overlong:
+        yield InvalidLine(too_long)
+    elif buffer:
+        yield _decode_line(bytes(buffer), first)
+
+class PortfolioImporter:
+    """
+    Validates imported portfolio rows one at a time and writes them in batches
+
+    Rows are buffered until IMPORT_BATCH_SIZE is reached and then written
+    with a single unordered insert_many, so one bad document does not stop
+    the rest of its batch. Validation and write failures are collected into
+    a per-row error report.
+    """
+
+    def __init__(self, db, username: str, batch_size: int = IMPORT_BATCH_SIZE):
+        self.db = db
+        self.username = username
+        self.batch_size = batch_size
+        self.inserted = 0
+        self.failed = 0
+        self.errors: List[Dict[str, Any]] = []
+        # Holdings change of the rows written so far, for the portfolio summary
+        self.delta: Delta = {}
+        self._batch: List[Dict[str, Any]] = []
+        self._batch_rows: List[int] = []
+
+    def record_error(self, row: int, error: str):
+        self.failed += 1
+        if len(self.errors) < IMPORT_MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row, "error": error})
+
+    async def add(self, row: int, data: Dict[str, Any]):
+        """Validate one row and queue it for insertion"""
+        try:
+            entry = PortfolioImportRow(**data)
+        except ValidationError as e:
+            messages = "; ".join(
+                f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in e.errors()
+            )
+            self.record_error(row, messages)
+            return
+
+        document = entry.dict()
+        document["username"] = self.username
+        self._batch.append(document)
+        self._batch_rows.append(row)
+        if len(self._batch) >= self.batch_size:
+            await self.flush()
+
+    async def flush(self):
+        """Write the buffered rows"""
+        if not self._batch:
+            return
+
+        batch, rows = self._batch, self._batch_rows
+        self._batch, self._batch_rows = [], []
+        try:
+            result = await self.db.portfolios.insert_many(batch, ordered=False)
+            self.inserted += len(result.inserted_ids)
+            entry_delta(batch, delta=self.delta)
+        except BulkWriteError as e:
+            write_errors = e.details.get("writeErrors", [])
+            self.inserted += e.details.get("nInserted", len(batch) - len(write_errors))
+            for error in write_errors:
+                self.record_error(rows[error["index"]], error.get("errmsg", "write failed"))
+            failed = {error["index"] for error in write_errors}
+            entry_delta([document for i, document in enumerate(batch) if i not in failed], delta=self.delta)
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "inserted": self.inserted,
+            "failed": self.failed,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors),
+        }
+
+async def import_csv_lines(importer: PortfolioImporter, lines: AsyncIterator[Union[str, InvalidLine]]):
+    """
+    Feed CSV rows to an importer; the first non-empty line is the header
+
+    Quoted fields spanning several lines are not supported.
+    """
+    header = None
+    row = 0
+    async for line in lines:
+        if isinstance(line, InvalidLine):
+            if header is None:
+                importer.record_error(0, f"invalid header: {line.reason}")
+                return
+            row += 1
+            importer.record_error(row, line.reason)
+            continue
+        if not line.strip():
+            continue
+        values = next(csv.reader([line]))
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+
+        row += 1
+        if len(values) != len(header):
+            importer.record_error(row, f"expected {len(header)} columns, got {len(values)}")
+            continue
+        await importer.add(row, {name: (value if value != "" else None) for name, value in zip(header, values)})
+
+async def import_ndjson_lines(importer: PortfolioImporter, lines: AsyncIterator[Union[str, InvalidLine]]):
+    """Feed newline-delimited JSON objects to an importer"""
+    row = 0
+    async for line in lines:
+        if isinstance(line, InvalidLine):
+            row += 1
+            importer.record_error(row, line.reason)
+            continue
+        if not line.strip():
+            continue
+
+        row += 1
+        try:
+            data = json.loads(line)
+        except ValueError as e:
+            importer.record_error(row, f"invalid JSON: {e}")
+            continue
+        if not isinstance(data, dict):
+            importer.record_error(row, "expected a JSON object")
+            continue
+        await importer.add(row, data)
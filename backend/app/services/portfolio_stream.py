@@ -0,0 +1,149 @@
+import os
+import json
+import uuid
+import asyncio
+import logging
+from typing import Any, Dict, List, Set
+
+from app.services.portfolio_summary import get_summary_holdings
+from app.services.price_book import price_book, price_listeners, normalize_asset_symbol
+from app.services.valuation import value_holdings
+from app.utils import redis_cache
+from app.utils.queues import put_latest
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Holdings changes are announced here so every worker reloads its connections
+PORTFOLIO_HOLDINGS_CHANNEL = os.environ.get("PORTFOLIO_HOLDINGS_CHANNEL", "portfolio:holdings")
+HOLDINGS_LISTENER_RETRY_SECONDS = float(os.environ.get("HOLDINGS_LISTENER_RETRY_SECONDS", "5"))
+
+class PortfolioValuationHub:
+    """
+    Pushes live portfolio valuations to subscribed users
+
+    Keeps a symbol -> usernames index over the holdings of connected users,
+    so a price tick only revalues the portfolios that hold a changed symbol.
+    Holdings changes are published over Redis so a user connected to another
+    worker sees them too.
+    """
+
+    def __init__(self, queue_size: int = 5):
+        self.queue_size = queue_size
+        # Identifies this hub so it can ignore its own holdings messages
+        self.instance_id = uuid.uuid4().hex
+        self.subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self.holdings: Dict[str, List[Dict[str, Any]]] = {}
+        self.symbol_index: Dict[str, Set[str]] = {}
+
+    def _index(self, username: str, holdings: List[Dict[str, Any]]):
+        self._unindex(username)
+        self.holdings[username] = holdings
+        for holding in holdings:
+            symbol = normalize_asset_symbol(holding["symbol"])
+            self.symbol_index.setdefault(symbol, set()).add(username)
+
+    def _unindex(self, username: str):
+        for holding in self.holdings.pop(username, []):
+            symbol = normalize_asset_symbol(holding["symbol"])
+            usernames = self.symbol_index.get(symbol)
+            if usernames is not None:
+                usernames.discard(username)
+                if not usernames:
+                    del self.symbol_index[symbol]
+
+    def _push(self, username: str):
+        valuation = value_holdings(self.holdings.get(username, []), price_book)
+        for queue in self.subscribers.get(username, ()):
+            put_latest(queue, valuation)
+
+    async def subscribe(self, username: str, db) -> asyncio.Queue:
+        """Register a connection for a user and queue its current valuation"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        first_connection = username not in self.subscribers
+        self.subscribers.setdefault(username, set()).add(queue)
+        if first_connection:
+            try:
+                self._index(username, await get_summary_holdings(db, username))
+            except Exception:
+                self.unsubscribe(username, queue)
+                raise
+        self._push(username)
+        return queue
+
+    def unsubscribe(self, username: str, queue: asyncio.Queue):
+        queues = self.subscribers.get(username)
+        if queues is None:
+            return
+        queues.discard(queue)
+        if not queues:
+            del self.subscribers[username]
+            self._unindex(username)
+
+    async def _reload(self, username: str, db):
+        if username not in self.subscribers:
+            return
+        self._index(username, await get_summary_holdings(db, username))
+        self._push(username)
+
+    async def refresh_holdings(self, username: str, db):
+        """Reload a user's holdings after their portfolio changed, here and in every other worker"""
+        await self._reload(username, db)
+        await self._publish_holdings_changed(username)
+
+    async def _publish_holdings_changed(self, username: str):
+        if not redis_cache.REDIS_AVAILABLE:
+            return
+        message = json.dumps({"origin": self.instance_id, "username": username})
+        try:
+            await redis_cache.async_redis_client.publish(PORTFOLIO_HOLDINGS_CHANNEL, message)
+        except Exception as e:
+            logger.error(f"Error publishing holdings change: {e}")
+
+    async def handle_holdings_message(self, message: dict, db):
+        """Reload holdings another worker reported as changed"""
+        try:
+            payload = json.loads(message["data"])
+        except Exception as e:
+            logger.error(f"Error decoding holdings change: {e}")
+            return
+
+        if payload.get("origin") == self.instance_id:
+            return
+        try:
+            await self._reload(payload["username"], db)
+        except Exception as e:
+            logger.error(f"Error reloading holdings: {e}")
+
+    async def run_holdings_listener(self, db):
+        """Subscribe to holdings changes from other workers until cancelled"""
+        while True:
+            if not redis_cache.REDIS_AVAILABLE:
+                await asyncio.sleep(HOLDINGS_LISTENER_RETRY_SECONDS)
+                continue
+
+            pubsub = redis_cache.async_redis_client.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(PORTFOLIO_HOLDINGS_CHANNEL)
+                while True:
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    if message is not None:
+                        await self.handle_holdings_message(message, db)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error in holdings listener: {e}")
+            finally:
+                await pubsub.reset()
+            await asyncio.sleep(HOLDINGS_LISTENER_RETRY_SECONDS)
+
+    async def on_prices_changed(self, changed: Set[str]):
+        """Price feed listener: revalue only the portfolios holding a changed symbol"""
+        affected = set()
+        for symbol in changed:
+            affected.update(self.symbol_index.get(symbol, ()))
+        for username in affected:
+            self._push(username)
+
+portfolio_hub = PortfolioValuationHub()
+price_listeners.append(portfolio_hub.on_prices_changed)
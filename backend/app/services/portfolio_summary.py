@@ -0,0 +1,186 @@
+import os
+import math
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from pymongo import ASCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from app.services.portfolio_service import Delta, get_holdings
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+SUMMARY_RECONCILE_INTERVAL_SECONDS = float(os.environ.get("SUMMARY_RECONCILE_INTERVAL_SECONDS", "300"))
+SUMMARY_RECONCILE_BATCH_SIZE = int(os.environ.get("SUMMARY_RECONCILE_BATCH_SIZE", "100"))
+
+def holding_key(symbol: str) -> str:
+    """Field name of a symbol inside summary.holdings; dots and "$" are not allowed in field names"""
+    if not symbol or "." in symbol or symbol.startswith("$"):
+        return "_" + symbol.encode("utf-8").hex()
+    return symbol
+
+async def apply_holdings_delta(db, username: str, delta: Delta):
+    """
+    Apply a holdings delta to a user's materialized summary
+
+    All symbols change in one atomic $inc, so concurrent writers never lose
+    each other's updates. Holdings whose last entry was removed are dropped.
+    A user without a summary yet gets one built from the entries, which
+    already include this write; if another writer creates it first, the
+    delta is applied to theirs instead.
+    """
+    if not delta:
+        return
+
+    increments: Dict[str, Any] = {"version": 1}
+    symbols: Dict[str, Any] = {"updated_at": datetime.utcnow()}
+    for symbol, change in delta.items():
+        key = holding_key(symbol)
+        symbols[f"holdings.{key}.symbol"] = symbol
+        for field, value in change.items():
+            increments[f"holdings.{key}.{field}"] = value
+
+    async def increment():
+        return await db.portfolio_summaries.find_one_and_update(
+            {"username": username},
+            {"$inc": increments, "$set": symbols},
+            projection={"holdings": 1},
+            return_document=ReturnDocument.AFTER
+        )
+
+    summary = await increment()
+    if summary is None:
+        if await _create_summary(db, username, await get_holdings(db, username)):
+            return
+        summary = await increment()
+        if summary is None:
+            return
+
+    for key, holding in summary.get("holdings", {}).items():
+        if holding["entries"] <= 0:
+            await db.portfolio_summaries.update_one(
+                {"username": username, f"holdings.{key}.entries": {"$lte": 0}},
+                {"$unset": {f"holdings.{key}": ""}}
+            )
+
+def summary_holdings(summary: Dict[str, Any]) -> List[Dict[str, Any]]:
+    holdings = [holding for holding in summary.get("holdings", {}).values() if holding["entries"] > 0]
+    return sorted(holdings, key=lambda holding: holding["symbol"])
+
+def _holdings_match(stored: List[Dict[str, Any]], actual: List[Dict[str, Any]]) -> bool:
+    if len(stored) != len(actual):
+        return False
+    for left, right in zip(stored, actual):
+        if left["symbol"] != right["symbol"] or left["entries"] != right["entries"]:
+            return False
+        # $inc on floats accumulates rounding error, which is not drift
+        if not math.isclose(left["amount"], right["amount"], rel_tol=1e-9, abs_tol=1e-9):
+            return False
+        if not math.isclose(left["invested"], right["invested"], rel_tol=1e-9, abs_tol=1e-9):
+            return False
+    return True
+
+async def _create_summary(db, username: str, holdings: List[Dict[str, Any]]) -> bool:
+    """
+    Insert a user's first summary
+
+    Returns:
+        False if a concurrent writer created it first
+    """
+    now = datetime.utcnow()
+    try:
+        result = await db.portfolio_summaries.update_one(
+            {"username": username},
+            {
+                "$setOnInsert": {
+                    "holdings": {holding_key(holding["symbol"]): holding for holding in holdings},
+                    "version": 0,
+                    "updated_at": now
+                },
+                "$set": {"reconciled_at": now}
+            },
+            upsert=True
+        )
+    except DuplicateKeyError:
+        return False
+    return result.upserted_id is not None
+
+async def reconcile_user(db, username: str, summary: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """
+    Recompute a user's summary from the raw entries and repair it if it drifted
+
+    The rewrite is guarded by the summary version, so an increment applied
+    while the entries were being totalled is never overwritten; that user is
+    simply checked again on the next pass.
+
+    Args:
+        db: Motor database
+        username: Owner of the portfolio entries
+        summary: Stored summary if already loaded
+
+    Returns:
+        The recomputed holdings
+    """
+    if summary is None:
+        summary = await db.portfolio_summaries.find_one({"username": username})
+    holdings = await get_holdings(db, username)
+    now = datetime.utcnow()
+
+    if summary is None:
+        await _create_summary(db, username, holdings)
+        return holdings
+
+    update: Dict[str, Any] = {"reconciled_at": now}
+    if not _holdings_match(summary_holdings(summary), holdings):
+        logger.warning(f"Repairing drifted portfolio summary of {username}")
+        update["holdings"] = {holding_key(holding["symbol"]): holding for holding in holdings}
+        update["updated_at"] = now
+
+    await db.portfolio_summaries.update_one(
+        {"username": username, "version": summary.get("version", 0)},
+        {"$set": update}
+    )
+    return holdings
+
+async def get_summary_holdings(db, username: str) -> List[Dict[str, Any]]:
+    """
+    Get a user's per-symbol holdings from the materialized summary
+
+    A single point lookup on the unique username index. Users without a
+    summary yet (entries written before summaries existed) get one built
+    from their entries.
+
+    Returns:
+        List of {"symbol", "amount", "invested", "entries"}, as get_holdings
+    """
+    summary = await db.portfolio_summaries.find_one({"username": username}, {"holdings": 1})
+    if summary is None:
+        return await reconcile_user(db, username)
+    return summary_holdings(summary)
+
+async def reconcile_summaries(db, batch_size: int = SUMMARY_RECONCILE_BATCH_SIZE) -> int:
+    """
+    Check the least recently reconciled summaries against the raw entries
+
+    Returns:
+        Number of summaries checked
+    """
+    summaries = await db.portfolio_summaries.find().sort(
+        "reconciled_at", ASCENDING
+    ).limit(batch_size).to_list(length=batch_size)
+    for summary in summaries:
+        await reconcile_user(db, summary["username"], summary)
+    return len(summaries)
+
+async def run_summary_reconciler(db):
+    """Repair summary drift in the background until cancelled"""
+    while True:
+        await asyncio.sleep(SUMMARY_RECONCILE_INTERVAL_SECONDS)
+        try:
+            await reconcile_summaries(db)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error reconciling portfolio summaries: {e}")
@@ -0,0 +1,112 @@
+import os
+import logging
+from typing import Any, Dict
+from fastapi.encoders import jsonable_encoder
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from app.utils.redis_cache import async_get_cached_data, async_set_cached_data_if_newer
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Preferences change rarely and every write replaces the cached copy, so both tiers
+# can hold them far longer than market data
+PREFERENCES_CACHE_TTL_SECONDS = int(os.environ.get("PREFERENCES_CACHE_TTL_SECONDS", "3600"))
+PREFERENCES_L1_TTL_SECONDS = float(os.environ.get("PREFERENCES_L1_TTL_SECONDS", "300"))
+# While Redis is down a write cannot reach other workers' fallback caches,
+# so preferences are not cached there by default
+PREFERENCES_FALLBACK_TTL_SECONDS = float(os.environ.get("PREFERENCES_FALLBACK_TTL_SECONDS", "0"))
+
+def default_preferences(username: str) -> Dict[str, Any]:
+    return {
+        "username": username,
+        "favorite_coins": ["BTC", "ETH", "SOL", "BNB", "ADA"],
+        "dashboard_layout": "default",
+        "theme": "dark",
+        "default_currency": "USD"
+    }
+
+def preferences_cache_key(username: str) -> str:
+    return f"preferences:{username}"
+
+async def get_preferences(db, username: str) -> Dict[str, Any]:
+    """
+    Read-through lookup of a user's preferences
+
+    Served from the in-process cache, then Redis, then MongoDB; users without
+    stored preferences get the defaults written for them.
+
+    Args:
+        db: Motor database
+        username: Owner of the preferences
+
+    Returns:
+        Preferences document without its _id
+    """
+    key = preferences_cache_key(username)
+    cached = await async_get_cached_data(key, l1_ttl_seconds=PREFERENCES_L1_TTL_SECONDS)
+    if cached is not None:
+        return cached
+
+    prefs = await db.user_preferences.find_one({"username": username}, {"_id": 0})
+    if not prefs:
+        # Create default preferences if none exist; $setOnInsert leaves a
+        # document created by a concurrent first read or write untouched
+        defaults = default_preferences(username)
+        defaults.pop("username")
+        defaults["version"] = 0
+        try:
+            await db.user_preferences.update_one(
+                {"username": username},
+                {"$setOnInsert": defaults},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            pass
+        prefs = await db.user_preferences.find_one({"username": username}, {"_id": 0})
+
+    # Datetimes are cached as ISO strings; the response model parses them back.
+    # A write that landed since our read has cached a higher version, which
+    # this older copy must not replace
+    await async_set_cached_data_if_newer(
+        key,
+        jsonable_encoder(prefs),
+        ttl_seconds=PREFERENCES_CACHE_TTL_SECONDS,
+        l1_ttl_seconds=PREFERENCES_L1_TTL_SECONDS,
+        fallback_ttl_seconds=PREFERENCES_FALLBACK_TTL_SECONDS
+    )
+    return prefs
+
+async def update_preferences(db, username: str, preferences: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Store a user's preferences and write them through to the cache
+
+    Every write bumps the document's version and caches the stored document
+    with it. Readers only cache what they loaded if nothing newer is cached,
+    so a read that raced this write cannot bring back the old preferences.
+
+    Args:
+        db: Motor database
+        username: Owner of the preferences
+        preferences: Fields to store
+
+    Returns:
+        Stored preferences document without its _id
+    """
+    fields = {name: value for name, value in preferences.items() if name != "version"}
+    stored = await db.user_preferences.find_one_and_update(
+        {"username": username},
+        {"$set": fields, "$inc": {"version": 1}},
+        projection={"_id": 0},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    await async_set_cached_data_if_newer(
+        preferences_cache_key(username),
+        jsonable_encoder(stored),
+        ttl_seconds=PREFERENCES_CACHE_TTL_SECONDS,
+        l1_ttl_seconds=PREFERENCES_L1_TTL_SECONDS,
+        fallback_ttl_seconds=PREFERENCES_FALLBACK_TTL_SECONDS
+    )
+    return stored
@@ -0,0 +1,94 @@
+import os
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional, Set
+
+from app.services.binance_service import fetch_crypto_data, is_mock_market_data
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+PRICE_FEED_INTERVAL_SECONDS = float(os.environ.get("PRICE_FEED_INTERVAL_SECONDS", "5"))
+PRICE_FEED_LIMIT = int(os.environ.get("PRICE_FEED_LIMIT", "100"))
+
+def normalize_asset_symbol(symbol: str) -> str:
+    """Map "BTCUSDT", "btc" and "BTC" to the same price book entry"""
+    symbol = symbol.strip().upper()
+    if symbol.endswith("USDT") and len(symbol) > 4:
+        symbol = symbol[:-4]
+    return symbol
+
+class PriceBook:
+    """
+    Latest known price per asset, kept in memory and refreshed by the price feed
+
+    Readers never call upstream; they see whatever the last tick delivered.
+    """
+
+    def __init__(self):
+        self._prices: Dict[str, float] = {}
+        self.updated_at: Optional[datetime] = None
+
+    def update(self, tickers: Iterable[Dict[str, Any]]) -> Set[str]:
+        """
+        Apply a batch of tickers
+
+        Args:
+            tickers: Dictionaries with "symbol" and "price"
+
+        Returns:
+            Symbols whose price changed
+        """
+        changed = set()
+        prices = dict(self._prices)
+        for ticker in tickers:
+            symbol = normalize_asset_symbol(ticker["symbol"])
+            price = float(ticker["price"])
+            if prices.get(symbol) != price:
+                prices[symbol] = price
+                changed.add(symbol)
+
+        # Swap the whole dict so readers never see a half-applied batch
+        self._prices = prices
+        self.updated_at = datetime.utcnow()
+        return changed
+
+    def get(self, symbol: str) -> Optional[float]:
+        return self._prices.get(normalize_asset_symbol(symbol))
+
+    def snapshot(self) -> Dict[str, float]:
+        return self._prices
+
+price_book = PriceBook()
+
+# Callbacks invoked with the set of changed symbols after every tick
+price_listeners = []
+
+async def refresh_prices() -> Set[str]:
+    """Fetch the latest tickers once and apply them to the price book"""
+    # Straight from Binance (a cached read could be up to 30s old); the
+    # client is blocking, so it runs in a worker thread
+    tickers = await asyncio.to_thread(fetch_crypto_data, PRICE_FEED_LIMIT)
+    if is_mock_market_data(tickers):
+        # Keep the last live prices rather than valuing portfolios at mock prices
+        logger.debug("Price feed returned mock data, leaving the price book unchanged")
+        return set()
+    changed = price_book.update(tickers)
+    for listener in price_listeners:
+        try:
+            await listener(changed)
+        except Exception as e:
+            logger.error(f"Error in price listener: {e}")
+    return changed
+
+async def run_price_feed():
+    """Keep the price book fresh until cancelled"""
+    while True:
+        try:
+            await refresh_prices()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error refreshing prices: {e}")
+        await asyncio.sleep(PRICE_FEED_INTERVAL_SECONDS)
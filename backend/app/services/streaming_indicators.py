@@ -0,0 +1,355 @@
+import math
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from app.services.indicators import indicator_key, parse_indicator_spec
+
+class RollingSMA:
+    """
+    Simple moving average over the last period values, O(1) per update
+
+    The running sum is rebuilt from the window once every period updates,
+    so rounding error from add/subtract cannot accumulate (amortized O(1)).
+    """
+
+    def __init__(self, period: int):
+        self.period = period
+        self.window: Deque[float] = deque()
+        self.total = 0.0
+        self.since_resync = 0
+
+    def _next_total(self, value: float) -> float:
+        dropped = self.window[0] if len(self.window) == self.period else 0.0
+        return self.total - dropped + value
+
+    def _output(self, count: int, total: float) -> Optional[float]:
+        return total / self.period if count >= self.period else None
+
+    def update(self, value: float) -> Optional[float]:
+        """Add the next value; returns the average, or None while warming up"""
+        self.total = self._next_total(value)
+        self.window.append(value)
+        if len(self.window) > self.period:
+            self.window.popleft()
+        self.since_resync += 1
+        if self.since_resync >= self.period:
+            self.total = math.fsum(self.window)
+            self.since_resync = 0
+        return self.value
+
+    def peek(self, value: float) -> Optional[float]:
+        """Average if value were the next update, without changing state"""
+        return self._output(min(len(self.window) + 1, self.period), self._next_total(value))
+
+    @property
+    def value(self) -> Optional[float]:
+        return self._output(len(self.window), self.total)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"period": self.period, "window": list(self.window), "since_resync": self.since_resync}
+
+    @classmethod
+    def from_dict(cls, state: Dict[str, Any]) -> "RollingSMA":
+        indicator = cls(state["period"])
+        indicator.window = deque(state.get("window", []))
+        indicator.total = math.fsum(indicator.window)
+        indicator.since_resync = state.get("since_resync", 0)
+        return indicator
+
+class RollingStd:
+    """
+    Population standard deviation over the last period values, O(1) per update
+
+    Uses Welford's update while the window fills and its sliding form
+    afterwards, M2' = M2 + (x - x_old) * (x - mean' + x_old - mean), which
+    avoids the cancellation of E[x**2] - E[x]**2 at high price levels. The
+    moments are rebuilt from the window once every period updates.
+    """
+
+    def __init__(self, period: int):
+        self.period = period
+        self.window: Deque[float] = deque()
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.since_resync = 0
+
+    def _next_moments(self, value: float) -> Tuple[float, float]:
+        if len(self.window) < self.period:
+            delta = value - self.mean
+            mean = self.mean + delta / (len(self.window) + 1)
+            return mean, self.m2 + delta * (value - mean)
+        dropped = self.window[0]
+        mean = self.mean + (value - dropped) / self.period
+        return mean, self.m2 + (value - dropped) * (value - mean + dropped - self.mean)
+
+    def _output(self, count: int, m2: float) -> Optional[float]:
+        return math.sqrt(max(m2 / self.period, 0.0)) if count >= self.period else None
+
+    def _resync(self):
+        self.mean = math.fsum(self.window) / len(self.window)
+        self.m2 = math.fsum((value - self.mean) ** 2 for value in self.window)
+        self.since_resync = 0
+
+    def update(self, value: float) -> Optional[float]:
+        """Add the next value; returns the deviation, or None while warming up"""
+        self.mean, self.m2 = self._next_moments(value)
+        self.window.append(value)
+        if len(self.window) > self.period:
+            self.window.popleft()
+        self.since_resync += 1
+        if self.since_resync >= self.period:
+            self._resync()
+        return self.value
+
+    def peek(self, value: float) -> Optional[float]:
+        """Deviation if value were the next update, without changing state"""
+        return self._output(min(len(self.window) + 1, self.period), self._next_moments(value)[1])
+
+    def peek_mean(self, value: float) -> float:
+        return self._next_moments(value)[0]
+
+    @property
+    def value(self) -> Optional[float]:
+        return self._output(len(self.window), self.m2)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"period": self.period, "window": list(self.window), "since_resync": self.since_resync}
+
+    @classmethod
+    def from_dict(cls, state: Dict[str, Any]) -> "RollingStd":
+        indicator = cls(state["period"])
+        indicator.window = deque(state.get("window", []))
+        if indicator.window:
+            indicator._resync()
+        indicator.since_resync = state.get("since_resync", 0)
+        return indicator
+
+class StreamingEMA:
+    """
+    Exponential smoothing y = alpha * x + (1 - alpha) * y, seeded with the
+    SMA of the first period values like indicators.ema
+
+    alpha defaults to 2 / (period + 1); pass 1 / period for Wilder smoothing.
+    """
+
+    def __init__(self, period: int, alpha: Optional[float] = None):
+        self.period = period
+        self.alpha = alpha if alpha is not None else 2.0 / (period + 1)
+        self.count = 0
+        self.seed_total = 0.0
+        self.value: Optional[float] = None
+
+    def _next(self, value: float) -> Tuple[int, float, Optional[float]]:
+        if self.value is not None:
+            return self.count, self.seed_total, self.alpha * value + (1 - self.alpha) * self.value
+        count, seed_total = self.count + 1, self.seed_total + value
+        return count, seed_total, seed_total / self.period if count == self.period else None
+
+    def update(self, value: float) -> Optional[float]:
+        """Add the next value; returns the average, or None while warming up"""
+        self.count, self.seed_total, self.value = self._next(value)
+        return self.value
+
+    def peek(self, value: float) -> Optional[float]:
+        """Average if value were the next update, without changing state"""
+        return self._next(value)[2]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "period": self.period,
+            "alpha": self.alpha,
+            "count": self.count,
+            "seed_total": self.seed_total,
+            "value": self.value,
+        }
+
+    @classmethod
+    def from_dict(cls, state: Dict[str, Any]) -> "StreamingEMA":
+        indicator = cls(state["period"], state.get("alpha"))
+        indicator.count = state.get("count", 0)
+        indicator.seed_total = state.get("seed_total", 0.0)
+        indicator.value = state.get("value")
+        return indicator
+
+def _relative_strength(average_gain: Optional[float], average_loss: Optional[float]) -> Optional[float]:
+    if average_gain is None or average_loss is None:
+        return None
+    if average_loss == 0:
+        # No losses in the window: 100, or 50 for a flat window
+        return 50.0 if average_gain == 0 else 100.0
+    return 100 - 100 / (1 + average_gain / average_loss)
+
+class StreamingRSI:
+    """Wilder's Relative Strength Index over closes, O(1) per update"""
+
+    def __init__(self, period: int = 14):
+        self.period = period
+        self.previous: Optional[float] = None
+        self.gains = StreamingEMA(period, 1.0 / period)
+        self.losses = StreamingEMA(period, 1.0 / period)
+
+    def update(self, close: float) -> Optional[float]:
+        """Add the next close; returns the RSI, or None while warming up"""
+        if self.previous is not None:
+            change = close - self.previous
+            self.gains.update(max(change, 0.0))
+            self.losses.update(max(-change, 0.0))
+        self.previous = close
+        return self.value
+
+    def peek(self, close: float) -> Optional[float]:
+        """RSI if close were the next update, without changing state"""
+        if self.previous is None:
+            return None
+        change = close - self.previous
+        return _relative_strength(self.gains.peek(max(change, 0.0)), self.losses.peek(max(-change, 0.0)))
+
+    @property
+    def value(self) -> Optional[float]:
+        return _relative_strength(self.gains.value, self.losses.value)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "period": self.period,
+            "previous": self.previous,
+            "gains": self.gains.to_dict(),
+            "losses": self.losses.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, state: Dict[str, Any]) -> "StreamingRSI":
+        indicator = cls(state["period"])
+        indicator.previous = state.get("previous")
+        indicator.gains = StreamingEMA.from_dict(state["gains"])
+        indicator.losses = StreamingEMA.from_dict(state["losses"])
+        return indicator
+
+def _macd_lines(line: Optional[float], signal: Optional[float]) -> Optional[Dict[str, Optional[float]]]:
+    if line is None:
+        return None
+    return {"macd": line, "signal": signal, "histogram": line - signal if signal is not None else None}
+
+class StreamingMACD:
+    """MACD line, signal and histogram; the signal EMA starts once the line is defined"""
+
+    def __init__(self, fast: int = 12, slow: int = 26, signal: int = 9):
+        self.fast = StreamingEMA(fast)
+        self.slow = StreamingEMA(slow)
+        self.signal = StreamingEMA(signal)
+
+    def update(self, close: float) -> Optional[Dict[str, Optional[float]]]:
+        """Add the next close; returns the three lines, or None while warming up"""
+        fast, slow = self.fast.update(close), self.slow.update(close)
+        if fast is None or slow is None:
+            return None
+        line = fast - slow
+        return _macd_lines(line, self.signal.update(line))
+
+    def peek(self, close: float) -> Optional[Dict[str, Optional[float]]]:
+        """Lines if close were the next update, without changing state"""
+        fast, slow = self.fast.peek(close), self.slow.peek(close)
+        if fast is None or slow is None:
+            return None
+        line = fast - slow
+        return _macd_lines(line, self.signal.peek(line))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"fast": self.fast.to_dict(), "slow": self.slow.to_dict(), "signal": self.signal.to_dict()}
+
+    @classmethod
+    def from_dict(cls, state: Dict[str, Any]) -> "StreamingMACD":
+        indicator = cls()
+        indicator.fast = StreamingEMA.from_dict(state["fast"])
+        indicator.slow = StreamingEMA.from_dict(state["slow"])
+        indicator.signal = StreamingEMA.from_dict(state["signal"])
+        return indicator
+
+def _bands(mean: float, deviation: Optional[float], width: float) -> Optional[Dict[str, float]]:
+    if deviation is None:
+        return None
+    return {"upper": mean + width * deviation, "middle": mean, "lower": mean - width * deviation}
+
+class StreamingBollinger:
+    """Bollinger Bands from a single rolling window (its mean is the middle band)"""
+
+    def __init__(self, period: int = 20, width: float = 2.0):
+        self.width = width
+        self.deviation = RollingStd(period)
+
+    def update(self, close: float) -> Optional[Dict[str, float]]:
+        """Add the next close; returns the bands, or None while warming up"""
+        deviation = self.deviation.update(close)
+        return _bands(self.deviation.mean, deviation, self.width)
+
+    def peek(self, close: float) -> Optional[Dict[str, float]]:
+        """Bands if close were the next update, without changing state"""
+        return _bands(self.deviation.peek_mean(close), self.deviation.peek(close), self.width)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"width": self.width, "deviation": self.deviation.to_dict()}
+
+    @classmethod
+    def from_dict(cls, state: Dict[str, Any]) -> "StreamingBollinger":
+        indicator = cls(width=state["width"])
+        indicator.deviation = RollingStd.from_dict(state["deviation"])
+        return indicator
+
+# Indicators of parse_indicator_spec that can be updated one close at a time
+STREAMING_INDICATORS = {
+    "sma": RollingSMA,
+    "ema": StreamingEMA,
+    "rsi": StreamingRSI,
+    "macd": StreamingMACD,
+    "bollinger": StreamingBollinger,
+}
+
+def make_streaming_indicator(name: str, params: Tuple[float, ...]):
+    """Streaming counterpart of a parsed indicator"""
+    if name == "bollinger":
+        return StreamingBollinger(int(params[0]), params[1])
+    return STREAMING_INDICATORS[name](*(int(value) for value in params))
+
+class IndicatorSet:
+    """
+    The streaming indicators of a spec such as "sma:20,rsi,macd", fed with
+    candle closes
+
+    update() commits a closed candle; peek() previews the still-open candle
+    at its latest price. Both are O(1) per indicator, and results use the
+    same keys and shapes as indicators.compute_indicators.
+
+    Raises:
+        ValueError: For malformed specs or indicators that cannot stream
+    """
+
+    def __init__(self, spec: str):
+        self.spec = spec
+        self.indicators: Dict[str, Any] = {}
+        for name, params in parse_indicator_spec(spec):
+            if name not in STREAMING_INDICATORS:
+                raise ValueError(f"Indicator {name} is not available for streaming")
+            self.indicators[indicator_key(name, params)] = make_streaming_indicator(name, params)
+
+    def update(self, close: float) -> Dict[str, Any]:
+        return {key: indicator.update(close) for key, indicator in self.indicators.items()}
+
+    def peek(self, close: float) -> Dict[str, Any]:
+        return {key: indicator.peek(close) for key, indicator in self.indicators.items()}
+
+    def extend(self, closes: List[float]) -> Dict[str, Any]:
+        """Commit several closes; returns the values after the last one"""
+        values = {key: None for key in self.indicators}
+        for close in closes:
+            values = self.update(close)
+        return values
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"spec": self.spec, "indicators": {key: indicator.to_dict() for key, indicator in self.indicators.items()}}
+
+    @classmethod
+    def from_dict(cls, state: Dict[str, Any]) -> "IndicatorSet":
+        indicator_set = cls(state["spec"])
+        for key, indicator_state in state["indicators"].items():
+            name = key.split("_", 1)[0]
+            indicator_set.indicators[key] = STREAMING_INDICATORS[name].from_dict(indicator_state)
+        return indicator_set
@@ -0,0 +1,68 @@
+from typing import Any, Dict, List
+import numpy as np
+
+from app.services.price_book import PriceBook, normalize_asset_symbol
+
+def value_holdings(holdings: List[Dict[str, Any]], prices: PriceBook) -> Dict[str, Any]:
+    """
+    Mark a user's holdings to market against the in-memory price book
+
+    All arithmetic happens in one vectorized pass over the holdings. Assets
+    without a known price are valued at cost and flagged with priced=False.
+
+    Args:
+        holdings: Per-symbol holdings with "symbol", "amount" and "invested"
+            (as returned by portfolio_service.get_holdings)
+        prices: Price book to read current prices from
+
+    Returns:
+        Portfolio totals and per-asset value, unrealized PnL and weight
+    """
+    if not holdings:
+        return {
+            "total_value": 0,
+            "total_investment": 0,
+            "profit_loss": 0,
+            "profit_loss_percentage": 0,
+            "assets": []
+        }
+
+    book = prices.snapshot()
+    symbols = [normalize_asset_symbol(holding["symbol"]) for holding in holdings]
+    amounts = np.fromiter((holding["amount"] for holding in holdings), dtype=float, count=len(holdings))
+    invested = np.fromiter((holding["invested"] for holding in holdings), dtype=float, count=len(holdings))
+    current = np.fromiter((book.get(symbol, np.nan) for symbol in symbols), dtype=float, count=len(holdings))
+
+    priced = ~np.isnan(current)
+    values = np.where(priced, amounts * current, invested)
+    pnl = values - invested
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pnl_pct = np.where(invested != 0, pnl / invested * 100, 0.0)
+
+    total_value = float(values.sum())
+    total_investment = float(invested.sum())
+    total_pnl = total_value - total_investment
+    weights = values / total_value if total_value else np.zeros_like(values)
+
+    assets = [
+        {
+            "symbol": holding["symbol"],
+            "amount": float(amounts[i]),
+            "invested": float(invested[i]),
+            "price": float(current[i]) if priced[i] else None,
+            "value": float(values[i]),
+            "profit_loss": float(pnl[i]),
+            "profit_loss_percentage": float(pnl_pct[i]),
+            "weight": float(weights[i]),
+            "priced": bool(priced[i]),
+        }
+        for i, holding in enumerate(holdings)
+    ]
+
+    return {
+        "total_value": total_value,
+        "total_investment": total_investment,
+        "profit_loss": total_pnl,
+        "profit_loss_percentage": total_pnl / total_investment * 100 if total_investment else 0,
+        "assets": assets
+    }
@@ -0,0 +1,142 @@
+import os
+import json
+import zlib
+import logging
+from typing import Any, Callable, Dict, Tuple
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Optional fast serializers and compressors
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:
+    lz4_frame = None
+
+# Envelope layout: MAGIC | version | codec id | compression id | payload
+# Legacy entries are bare JSON text, which can never start with a NUL byte.
+MAGIC = b"\x00CC"
+ENVELOPE_VERSION = 1
+HEADER_SIZE = len(MAGIC) + 3
+
+def _json_dumps(data: Any) -> bytes:
+    return json.dumps(data).encode("utf-8")
+
+def _orjson_dumps(data: Any) -> bytes:
+    return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+def _msgpack_dumps(data: Any) -> bytes:
+    return msgpack.packb(data, use_bin_type=True, default=str)
+
+def _msgpack_loads(payload: bytes) -> Any:
+    return msgpack.unpackb(payload, raw=False, strict_map_key=False)
+
+# name -> (id, dumps, loads); only installed codecs are registered
+CODECS: Dict[str, Tuple[int, Callable[[Any], bytes], Callable[[bytes], Any]]] = {
+    "json": (1, _json_dumps, json.loads),
+}
+if orjson is not None:
+    CODECS["orjson"] = (2, _orjson_dumps, orjson.loads)
+if msgpack is not None:
+    CODECS["msgpack"] = (3, _msgpack_dumps, _msgpack_loads)
+
+# name -> (id, compress, decompress)
+COMPRESSORS: Dict[str, Tuple[int, Callable[[bytes], bytes], Callable[[bytes], bytes]]] = {
+    "none": (0, lambda payload: payload, lambda payload: payload),
+    "zlib": (1, lambda payload: zlib.compress(payload, 6), zlib.decompress),
+}
+if zstandard is not None:
+    _zstd_compressor = zstandard.ZstdCompressor(level=3)
+    _zstd_decompressor = zstandard.ZstdDecompressor()
+    COMPRESSORS["zstd"] = (2, _zstd_compressor.compress, _zstd_decompressor.decompress)
+if lz4_frame is not None:
+    COMPRESSORS["lz4"] = (3, lz4_frame.compress, lz4_frame.decompress)
+
+_CODECS_BY_ID = {codec_id: (name, loads) for name, (codec_id, _, loads) in CODECS.items()}
+_COMPRESSORS_BY_ID = {comp_id: (name, decompress) for name, (comp_id, _, decompress) in COMPRESSORS.items()}
+
+def _configured(env_name: str, preferred: str, fallback: str, registry: dict) -> str:
+    name = os.environ.get(env_name, preferred)
+    if name not in registry:
+        if env_name in os.environ:
+            logger.warning(f"{env_name}={name} is not available, using {fallback}")
+        return fallback
+    return name
+
+CACHE_CODEC = _configured("CACHE_CODEC", "orjson", "json", CODECS)
+CACHE_COMPRESSION = _configured("CACHE_COMPRESSION", "zstd", "none", COMPRESSORS)
+CACHE_COMPRESSION_MIN_BYTES = int(os.environ.get("CACHE_COMPRESSION_MIN_BYTES", "1024"))
+
+def encode(data: Any, codec: str = None, compression: str = None,
+           min_compress_bytes: int = None) -> bytes:
+    """
+    Serialize data into a versioned cache envelope
+
+    Args:
+        data: Data to serialize
+        codec: Codec name, defaults to CACHE_CODEC
+        compression: Compressor name, defaults to CACHE_COMPRESSION
+        min_compress_bytes: Payloads smaller than this are stored uncompressed
+
+    Returns:
+        Envelope bytes
+    """
+    codec = codec or CACHE_CODEC
+    compression = compression or CACHE_COMPRESSION
+    if min_compress_bytes is None:
+        min_compress_bytes = CACHE_COMPRESSION_MIN_BYTES
+
+    codec_id, dumps, _ = CODECS[codec]
+    payload = dumps(data)
+
+    compression_id = 0
+    if compression != "none" and len(payload) >= min_compress_bytes:
+        compression_id, compress, _ = COMPRESSORS[compression]
+        payload = compress(payload)
+
+    return MAGIC + bytes((ENVELOPE_VERSION, codec_id, compression_id)) + payload
+
+def decode(raw: bytes) -> Any:
+    """
+    Deserialize a cache entry
+
+    Accepts both envelopes written by encode() and legacy plain JSON entries.
+
+    Args:
+        raw: Bytes read from the cache
+
+    Returns:
+        Decoded data
+    """
+    if isinstance(raw, str):
+        return json.loads(raw)
+
+    if not raw.startswith(MAGIC):
+        return json.loads(raw)
+
+    version, codec_id, compression_id = raw[len(MAGIC):HEADER_SIZE]
+    if version != ENVELOPE_VERSION:
+        raise ValueError(f"Unsupported cache envelope version: {version}")
+    if codec_id not in _CODECS_BY_ID:
+        raise ValueError(f"Cache entry uses unavailable codec id {codec_id}")
+    if compression_id not in _COMPRESSORS_BY_ID:
+        raise ValueError(f"Cache entry uses unavailable compression id {compression_id}")
+
+    _, loads = _CODECS_BY_ID[codec_id]
+    _, decompress = _COMPRESSORS_BY_ID[compression_id]
+    return loads(decompress(raw[HEADER_SIZE:]))
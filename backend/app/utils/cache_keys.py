@@ -0,0 +1,126 @@
+import hashlib
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
+
+# Interval lengths in seconds, matching the intervals accepted by the chart endpoint
+INTERVAL_SECONDS = {
+    "1m": 60,
+    "5m": 300,
+    "15m": 900,
+    "30m": 1800,
+    "1h": 3600,
+    "2h": 7200,
+    "4h": 14400,
+    "6h": 21600,
+    "8h": 28800,
+    "12h": 43200,
+    "1d": 86400,
+    "3d": 259200,
+    "1w": 604800,
+    "1M": 2592000,
+}
+
+DEFAULT_CHART_INTERVAL = "1d"
+DEFAULT_CHART_LIMIT = 100
+DEFAULT_CHART_LOOKBACK = timedelta(days=30)
+
+# Binance weeks open on Monday 00:00 UTC; the Unix epoch was a Thursday
+WEEK_OFFSET_SECONDS = 4 * 86400
+
+def normalize_symbol(symbol: str) -> str:
+    """Canonical form of a symbol for cache keys"""
+    return symbol.strip().upper()
+
+def _to_utc(value: datetime) -> datetime:
+    # Naive datetimes are local time, as produced by datetime.now() in the endpoints
+    if value.tzinfo is None:
+        value = value.astimezone()
+    return value.astimezone(timezone.utc)
+
+def floor_to_interval(value: datetime, interval: str) -> datetime:
+    """
+    Snap a datetime down to the start of the interval it falls in
+
+    Args:
+        value: Datetime to snap
+        interval: Kline interval (e.g. "1m", "1h", "1d", "1w", "1M")
+
+    Returns:
+        Timezone-aware UTC datetime at the interval boundary
+    """
+    value = _to_utc(value)
+
+    if interval == "1M":
+        return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+    step = INTERVAL_SECONDS.get(interval, INTERVAL_SECONDS[DEFAULT_CHART_INTERVAL])
+    offset = WEEK_OFFSET_SECONDS if interval == "1w" else 0
+    timestamp = int(value.timestamp())
+    aligned = (timestamp - offset) // step * step + offset
+    return datetime.fromtimestamp(aligned, tz=timezone.utc)
+
+def ceil_to_interval(value: datetime, interval: str) -> datetime:
+    """Snap a datetime up to the next interval boundary (unchanged if already on one)"""
+    floored = floor_to_interval(value, interval)
+    if floored == _to_utc(value):
+        return floored
+
+    if interval == "1M":
+        if floored.month == 12:
+            return floored.replace(year=floored.year + 1, month=1)
+        return floored.replace(month=floored.month + 1)
+
+    step = INTERVAL_SECONDS.get(interval, INTERVAL_SECONDS[DEFAULT_CHART_INTERVAL])
+    return floored + timedelta(seconds=step)
+
+def align_time_range(
+    interval: str,
+    start_time: Optional[datetime] = None,
+    end_time: Optional[datetime] = None,
+    now: Optional[datetime] = None
+) -> Tuple[datetime, datetime]:
+    """
+    Apply the chart defaults and snap a time range to interval boundaries
+
+    The start is floored and the end is ceiled, so the range still covers the
+    currently open candle and every request made within the same interval
+    resolves to the same range.
+
+    Returns:
+        (start_time, end_time) as UTC datetimes
+    """
+    now = now or datetime.now(timezone.utc)
+    if not end_time:
+        end_time = now
+    if not start_time:
+        start_time = _to_utc(end_time) - DEFAULT_CHART_LOOKBACK
+
+    return floor_to_interval(start_time, interval), ceil_to_interval(end_time, interval)
+
+def _digest(canonical: str) -> str:
+    return hashlib.sha1(canonical.encode("utf-8")).hexdigest()[:16]
+
+def chart_cache_key(
+    symbol: str,
+    interval: str = DEFAULT_CHART_INTERVAL,
+    limit: int = DEFAULT_CHART_LIMIT,
+    start_time: Optional[datetime] = None,
+    end_time: Optional[datetime] = None
+) -> str:
+    """
+    Canonical cache key for a chart query
+
+    Symbol and interval stay readable so a symbol's charts can be invalidated
+    by prefix; the aligned range and limit are hashed.
+
+    Returns:
+        Key of the form chart:<SYMBOL>:<interval>:<hash>
+    """
+    symbol = normalize_symbol(symbol)
+    start, end = align_time_range(interval, start_time, end_time)
+    canonical = f"{symbol}|{interval}|{int(limit)}|{int(start.timestamp())}|{int(end.timestamp())}"
+    return f"chart:{symbol}:{interval}:{_digest(canonical)}"
+
+def market_cache_key(limit: int = 20) -> str:
+    """Canonical cache key for the top-N market listing"""
+    return f"market:get_crypto_data:{int(limit)}"
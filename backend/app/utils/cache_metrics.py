@@ -0,0 +1,117 @@
+import os
+import random
+import threading
+from collections import Counter as KeyCounter
+from typing import List, Optional, Tuple
+from prometheus_client import Counter, Histogram, REGISTRY
+from prometheus_client.core import GaugeMetricFamily
+
+# Cache metrics are labelled by key prefix (the part before the first ":")
+# so cardinality stays bounded by the number of cached endpoints.
+CACHE_HITS = Counter(
+    "cache_hits_total",
+    "Cache lookups that found a value",
+    ["prefix", "tier"],
+)
+CACHE_MISSES = Counter(
+    "cache_misses_total",
+    "Cache lookups that found nothing",
+    ["prefix"],
+)
+CACHE_ERRORS = Counter(
+    "cache_errors_total",
+    "Cache operations that raised",
+    ["prefix", "operation"],
+)
+CACHE_LATENCY = Histogram(
+    "cache_operation_seconds",
+    "Latency of Redis cache operations",
+    ["prefix", "operation"],
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0),
+)
+CACHE_PAYLOAD_BYTES = Histogram(
+    "cache_payload_bytes",
+    "Size of cached payloads as stored in Redis",
+    ["prefix", "operation"],
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304),
+)
+
+# Top-keys sampler: a fraction of accesses is counted per full key and the
+# heaviest keys are exported as a gauge on every scrape
+CACHE_KEY_SAMPLE_RATE = float(os.environ.get("CACHE_KEY_SAMPLE_RATE", "0.01"))
+CACHE_TOP_KEYS = int(os.environ.get("CACHE_TOP_KEYS", "20"))
+CACHE_KEY_SAMPLE_CAPACITY = 10 * CACHE_TOP_KEYS
+
+_sampled_keys: KeyCounter = KeyCounter()
+_sampled_keys_lock = threading.Lock()
+
+def key_prefix(key) -> str:
+    """Prefix label for a cache key"""
+    if isinstance(key, bytes):
+        key = key.decode("utf-8", "replace")
+    return key.split(":", 1)[0]
+
+def sample_key(key):
+    if random.random() >= CACHE_KEY_SAMPLE_RATE:
+        return
+    if isinstance(key, bytes):
+        key = key.decode("utf-8", "replace")
+
+    with _sampled_keys_lock:
+        _sampled_keys[key] += 1
+        if len(_sampled_keys) > CACHE_KEY_SAMPLE_CAPACITY:
+            # Keep the heaviest half so new hot keys can still enter
+            survivors = _sampled_keys.most_common(CACHE_KEY_SAMPLE_CAPACITY // 2)
+            _sampled_keys.clear()
+            _sampled_keys.update(dict(survivors))
+
+def top_keys(limit: Optional[int] = None) -> List[Tuple[str, int]]:
+    """
+    Most frequently accessed keys among the sampled accesses
+
+    Args:
+        limit: Number of keys to return, defaults to CACHE_TOP_KEYS
+
+    Returns:
+        List of (key, sampled access count)
+    """
+    with _sampled_keys_lock:
+        return _sampled_keys.most_common(limit or CACHE_TOP_KEYS)
+
+def record_l1_hit(key):
+    CACHE_HITS.labels(key_prefix(key), "l1").inc()
+    sample_key(key)
+
+def record_get(key, seconds: float, payload: Optional[bytes], operation: str = "get"):
+    """Record a Redis read of one key: latency, hit/miss and payload size"""
+    prefix = key_prefix(key)
+    CACHE_LATENCY.labels(prefix, operation).observe(seconds)
+    if payload:
+        CACHE_HITS.labels(prefix, "redis").inc()
+        CACHE_PAYLOAD_BYTES.labels(prefix, operation).observe(len(payload))
+    else:
+        CACHE_MISSES.labels(prefix).inc()
+    sample_key(key)
+
+def record_set(key, seconds: float, size: int, operation: str = "set"):
+    prefix = key_prefix(key)
+    CACHE_LATENCY.labels(prefix, operation).observe(seconds)
+    CACHE_PAYLOAD_BYTES.labels(prefix, operation).observe(size)
+
+def record_error(key, operation: str):
+    CACHE_ERRORS.labels(key_prefix(key), operation).inc()
+
+class TopKeysCollector:
+    """Exports the sampled top keys as cache_top_key_samples{key=...}"""
+
+    def collect(self):
+        gauge = GaugeMetricFamily(
+            "cache_top_key_samples",
+            "Sampled access counts of the most frequently accessed cache keys",
+            labels=["key"],
+        )
+        for key, count in top_keys():
+            gauge.add_metric([key], count)
+        yield gauge
+
+REGISTRY.register(TopKeysCollector())
@@ -0,0 +1,17 @@
+import asyncio
+from typing import Any
+
+def put_latest(queue: asyncio.Queue, item: Any):
+    """
+    Queue an item for a consumer that only needs the most recent values
+
+    A full queue belongs to a slow consumer; its oldest pending item is
+    dropped to make room rather than blocking the producer.
+
+    Args:
+        queue: Bounded subscriber queue
+        item: Item to queue
+    """
+    if queue.full():
+        queue.get_nowait()
+    queue.put_nowait(item)
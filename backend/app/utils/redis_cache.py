@@ -1,75 +1,451 @@
 import os
 import json
+import math
+import time
+import uuid
+import random
 import logging
-from typing import Any, Optional, Callable
+import threading
+from typing import Any, Optional, Callable, Dict, List, Tuple
 import redis
+import redis.asyncio as aioredis
 from functools import wraps
 from datetime import datetime, timedelta
 
+from app.utils.memory_cache import TTLCache
+from app.utils.cache_codecs import encode, decode
+from app.utils import cache_metrics
+
 # Set up logging
 logger = logging.getLogger(__name__)
 
 # Redis connection
 REDIS_URL = os.environ.get("REDIS_URL", "redis://localhost:6379/0")
 
+# Keep these short: a cache that hangs is worse than a miss
+REDIS_SOCKET_CONNECT_TIMEOUT_SECONDS = float(os.environ.get("REDIS_SOCKET_CONNECT_TIMEOUT_SECONDS", "0.5"))
+REDIS_SOCKET_TIMEOUT_SECONDS = float(os.environ.get("REDIS_SOCKET_TIMEOUT_SECONDS", "0.5"))
+
+redis_client = redis.from_url(
+    REDIS_URL,
+    socket_connect_timeout=REDIS_SOCKET_CONNECT_TIMEOUT_SECONDS,
+    socket_timeout=REDIS_SOCKET_TIMEOUT_SECONDS
+)
+
 try:
-    redis_client = redis.from_url(REDIS_URL)
     redis_client.ping()  # Test connection
     REDIS_AVAILABLE = True
 except Exception as e:
     logger.warning(f"Redis connection failed: {e}")
-    logger.warning("Caching will be disabled")
+    logger.warning("Falling back to the in-process cache")
     REDIS_AVAILABLE = False
 
-def cache_data(key_prefix: str, ttl_seconds: int = 300):
+# Bounded in-process cache that stands in for Redis while it is unreachable.
+# It is per worker, so entries are not shared until Redis comes back.
+CACHE_FALLBACK_MAX_ITEMS = int(os.environ.get("CACHE_FALLBACK_MAX_ITEMS", "4096"))
+CACHE_HEALTH_CHECK_SECONDS = float(os.environ.get("CACHE_HEALTH_CHECK_SECONDS", "15"))
+
+fallback_cache = TTLCache(max_items=CACHE_FALLBACK_MAX_ITEMS, default_ttl=300)
+
+_health_check_thread: Optional[threading.Thread] = None
+_health_check_lock = threading.Lock()
+
+# Shared pool for the asyncio client; connections are created lazily on first use
+REDIS_MAX_CONNECTIONS = int(os.environ.get("REDIS_MAX_CONNECTIONS", "50"))
+async_redis_pool = aioredis.ConnectionPool.from_url(
+    REDIS_URL,
+    max_connections=REDIS_MAX_CONNECTIONS,
+    socket_connect_timeout=REDIS_SOCKET_CONNECT_TIMEOUT_SECONDS,
+    socket_timeout=REDIS_SOCKET_TIMEOUT_SECONDS
+)
+async_redis_client = aioredis.Redis(connection_pool=async_redis_pool)
+
+# In-process L1 cache in front of Redis (L2). Entries live for at most
+# CACHE_L1_TTL_SECONDS and are dropped early when another worker publishes
+# an invalidation for the key on CACHE_INVALIDATION_CHANNEL.
+CACHE_L1_ENABLED = os.environ.get("CACHE_L1_ENABLED", "true").lower() == "true"
+CACHE_L1_MAX_ITEMS = int(os.environ.get("CACHE_L1_MAX_ITEMS", "1024"))
+CACHE_L1_TTL_SECONDS = float(os.environ.get("CACHE_L1_TTL_SECONDS", "5"))
+CACHE_INVALIDATION_CHANNEL = os.environ.get("CACHE_INVALIDATION_CHANNEL", "cache:invalidate")
+
+# Keys per SCAN page / pipelined UNLINK batch for bulk operations
+CACHE_BATCH_SIZE = int(os.environ.get("CACHE_BATCH_SIZE", "1000"))
+
+local_cache = TTLCache(max_items=CACHE_L1_MAX_ITEMS, default_ttl=CACHE_L1_TTL_SECONDS)
+
+# Identifies this worker so it can ignore its own invalidation messages
+INSTANCE_ID = uuid.uuid4().hex
+
+def _l1_get(key: str) -> Optional[Any]:
+    if not CACHE_L1_ENABLED:
+        return None
+    data = local_cache.get(key)
+    if data is not None:
+        cache_metrics.record_l1_hit(key)
+    return data
+
+def _l1_set(key: str, data: Any, ttl_seconds: float, l1_ttl_seconds: Optional[float] = None):
+    if CACHE_L1_ENABLED:
+        local_cache.set(key, data, min(ttl_seconds, l1_ttl_seconds or CACHE_L1_TTL_SECONDS))
+
+# Instrumented Redis primitives; every read and write of cached payloads
+# goes through these so latency, hit ratio and sizes are recorded per prefix
+def _redis_get(key: str) -> Optional[bytes]:
+    start = time.perf_counter()
+    try:
+        data = redis_client.get(key)
+    except Exception as e:
+        cache_metrics.record_error(key, "get")
+        if isinstance(e, (redis.exceptions.ConnectionError, redis.exceptions.TimeoutError)):
+            _mark_redis_unavailable(e)
+        raise
+    cache_metrics.record_get(key, time.perf_counter() - start, data)
+    return data
+
+async def _async_redis_get(key: str) -> Optional[bytes]:
+    start = time.perf_counter()
+    try:
+        data = await async_redis_client.get(key)
+    except Exception as e:
+        cache_metrics.record_error(key, "get")
+        if isinstance(e, (redis.exceptions.ConnectionError, redis.exceptions.TimeoutError)):
+            _mark_redis_unavailable(e)
+        raise
+    cache_metrics.record_get(key, time.perf_counter() - start, data)
+    return data
+
+def _redis_mget(keys: List[str]) -> List[Optional[bytes]]:
+    start = time.perf_counter()
+    try:
+        values = redis_client.mget(keys)
+    except Exception as e:
+        cache_metrics.record_error(keys[0], "mget")
+        if isinstance(e, (redis.exceptions.ConnectionError, redis.exceptions.TimeoutError)):
+            _mark_redis_unavailable(e)
+        raise
+    elapsed = time.perf_counter() - start
+    for key, data in zip(keys, values):
+        cache_metrics.record_get(key, elapsed / len(keys), data, operation="mget")
+    return values
+
+def _redis_setex(key: str, ttl_seconds: int, payload: bytes):
+    start = time.perf_counter()
+    try:
+        redis_client.setex(key, ttl_seconds, payload)
+    except Exception as e:
+        cache_metrics.record_error(key, "set")
+        if isinstance(e, (redis.exceptions.ConnectionError, redis.exceptions.TimeoutError)):
+            _mark_redis_unavailable(e)
+        raise
+    cache_metrics.record_set(key, time.perf_counter() - start, len(payload))
+
+async def _async_redis_setex(key: str, ttl_seconds: int, payload: bytes):
+    start = time.perf_counter()
+    try:
+        await async_redis_client.setex(key, ttl_seconds, payload)
+    except Exception as e:
+        cache_metrics.record_error(key, "set")
+        if isinstance(e, (redis.exceptions.ConnectionError, redis.exceptions.TimeoutError)):
+            _mark_redis_unavailable(e)
+        raise
+    cache_metrics.record_set(key, time.perf_counter() - start, len(payload))
+
+def _invalidation_message(op: str, target: str) -> str:
+    return json.dumps({"origin": INSTANCE_ID, "op": op, "target": target})
+
+def _publish_invalidation(op: str, target: str):
+    """Tell the other workers to drop a key ("key") or key prefix ("prefix") from L1"""
+    if not CACHE_L1_ENABLED:
+        return
+    try:
+        redis_client.publish(CACHE_INVALIDATION_CHANNEL, _invalidation_message(op, target))
+    except Exception as e:
+        logger.error(f"Error publishing cache invalidation: {e}")
+
+async def _async_publish_invalidation(op: str, target: str):
+    if not CACHE_L1_ENABLED:
+        return
+    try:
+        await async_redis_client.publish(CACHE_INVALIDATION_CHANNEL, _invalidation_message(op, target))
+    except Exception as e:
+        logger.error(f"Error publishing cache invalidation: {e}")
+
+def _handle_invalidation(message: dict):
+    try:
+        payload = json.loads(message["data"])
+    except Exception as e:
+        logger.error(f"Error decoding cache invalidation: {e}")
+        return
+    
+    if payload.get("origin") == INSTANCE_ID:
+        return
+    
+    if payload.get("op") == "prefix":
+        local_cache.delete_prefix(payload["target"])
+    else:
+        local_cache.delete(payload["target"])
+
+def start_invalidation_listener():
+    """
+    Subscribe to the invalidation channel in a background thread
+    
+    Returns:
+        The listener thread, or None if Redis or the L1 cache is disabled
+    """
+    if not (REDIS_AVAILABLE and CACHE_L1_ENABLED):
+        return None
+    
+    try:
+        pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(**{CACHE_INVALIDATION_CHANNEL: _handle_invalidation})
+        return pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+    except Exception as e:
+        logger.error(f"Error starting cache invalidation listener: {e}")
+        return None
+
+invalidation_listener = start_invalidation_listener()
+
+def _health_check_loop():
+    global REDIS_AVAILABLE, invalidation_listener
+    
+    while True:
+        time.sleep(CACHE_HEALTH_CHECK_SECONDS)
+        try:
+            redis_client.ping()
+        except Exception:
+            continue
+        
+        # Entries written during the outage were never shared; drop them so
+        # readers go back to the authoritative Redis copies
+        fallback_cache.clear()
+        local_cache.clear()
+        REDIS_AVAILABLE = True
+        if invalidation_listener is None or not invalidation_listener.is_alive():
+            invalidation_listener = start_invalidation_listener()
+        logger.info("Redis connection restored, shared caching re-enabled")
+        return
+
+def start_health_check():
+    """Start re-checking Redis in the background until it is reachable again"""
+    global _health_check_thread
+    
+    with _health_check_lock:
+        if _health_check_thread is not None and _health_check_thread.is_alive():
+            return
+        _health_check_thread = threading.Thread(
+            target=_health_check_loop,
+            name="redis-health-check",
+            daemon=True
+        )
+        _health_check_thread.start()
+
+def _mark_redis_unavailable(error: Exception):
+    global REDIS_AVAILABLE
+    
+    if REDIS_AVAILABLE:
+        logger.warning(f"Redis connection lost: {error}")
+        logger.warning("Falling back to the in-process cache")
+    REDIS_AVAILABLE = False
+    start_health_check()
+
+if not REDIS_AVAILABLE:
+    start_health_check()
+
+def build_cache_key(key_prefix: str, func: Callable, args: tuple, kwargs: dict) -> str:
+    """
+    Build the cache key used by cache_data
+    
+    Args:
+        key_prefix: Prefix for Redis keys
+        func: Decorated function
+        args: Positional arguments of the call
+        kwargs: Keyword arguments of the call
+        
+    Returns:
+        Cache key
+    """
+    cache_key = f"{key_prefix}:{func.__name__}:"
+    
+    # Add args to key
+    if args:
+        cache_key += ":".join(str(arg) for arg in args)
+    
+    # Add sorted kwargs to key
+    if kwargs:
+        kwargs_str = ":".join(f"{k}={v}" for k, v in sorted(kwargs.items()))
+        cache_key += ":" + kwargs_str
+    
+    return cache_key
+
+# Stampede protection: decorated results are stored as XFetch entries. Each
+# reader may recompute before the logical expiry with a probability that
+# grows as expiry approaches, scaled by how long the last recomputation took.
+# Only the caller holding the per-key Redis lock recomputes; everyone else
+# keeps serving the previous value, which outlives its logical expiry by a
+# stale grace period.
+XFETCH_MARKER = "__xfetch__"
+CACHE_LOCK_TIMEOUT_SECONDS = float(os.environ.get("CACHE_LOCK_TIMEOUT_SECONDS", "10"))
+CACHE_LOCK_POLL_SECONDS = 0.05
+# Sync callers block their thread while waiting, so on a cold miss they only
+# poll this many times before computing the value themselves
+CACHE_LOCK_SYNC_POLLS = int(os.environ.get("CACHE_LOCK_SYNC_POLLS", "2"))
+
+_RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+class Uncached:
+    """
+    Wraps a result that cache_data should return without storing, e.g. mock
+    data served while an upstream is down
+    """
+    __slots__ = ("value",)
+    
+    def __init__(self, value: Any):
+        self.value = value
+
+def _make_entry(value: Any, delta: float, ttl_seconds: int) -> dict:
+    return {XFETCH_MARKER: 1, "value": value, "delta": delta, "expires_at": time.time() + ttl_seconds}
+
+def _read_entry(entry: Any, beta: float) -> Tuple[Optional[Any], bool, float]:
+    """
+    Unpack a cached entry
+
+    Returns:
+        (value, fresh, seconds until logical expiry); value is None on a miss
+    """
+    if entry is None:
+        return None, False, 0
+    
+    if not (isinstance(entry, dict) and entry.get(XFETCH_MARKER)):
+        # Entry written before stampede protection, treat as fresh
+        return entry, True, CACHE_L1_TTL_SECONDS
+    
+    now = time.time()
+    remaining = entry["expires_at"] - now
+    early_by = -entry["delta"] * beta * math.log(1.0 - random.random())
+    return entry["value"], remaining > early_by, remaining
+
+def _lock_key(cache_key: str) -> str:
+    return f"lock:{cache_key}"
+
+def _acquire_recompute_lock(cache_key: str) -> Optional[str]:
+    token = uuid.uuid4().hex
+    try:
+        if redis_client.set(_lock_key(cache_key), token, nx=True, px=int(CACHE_LOCK_TIMEOUT_SECONDS * 1000)):
+            return token
+    except Exception as e:
+        logger.error(f"Error acquiring cache lock: {e}")
+        # Without Redis locking, let this caller recompute
+        return token
+    return None
+
+def _release_recompute_lock(cache_key: str, token: str):
+    try:
+        redis_client.eval(_RELEASE_LOCK_SCRIPT, 1, _lock_key(cache_key), token)
+    except Exception as e:
+        logger.error(f"Error releasing cache lock: {e}")
+
+def _load_entry(cache_key: str) -> Any:
+    try:
+        cached_data = _redis_get(cache_key)
+        return decode(cached_data) if cached_data else None
+    except Exception as e:
+        logger.error(f"Error getting cached data: {e}")
+        return None
+
+def cache_data(key_prefix: str, ttl_seconds: int = 300, beta: float = 1.0,
+               stale_ttl_seconds: Optional[int] = None,
+               key_builder: Optional[Callable[..., str]] = None):
     """
     Decorator to cache function results in Redis
     
+    Protects against cache stampedes with probabilistic early recomputation
+    (XFetch) and a per-key Redis lock: a single caller recomputes while the
+    others are served the previous value. A result wrapped in Uncached is
+    returned unwrapped and not stored.
+    
     Args:
         key_prefix: Prefix for Redis keys
         ttl_seconds: Time-to-live in seconds
+        beta: Early recomputation eagerness, values above 1.0 recompute earlier
+        stale_ttl_seconds: How long a value may be served past its TTL while
+            it is being recomputed, defaults to ttl_seconds
+        key_builder: Builds the full cache key from the call arguments,
+            replacing the key_prefix/argument-string key (see cache_keys)
         
     Returns:
         Decorator function
     """
+    stale_ttl = ttl_seconds if stale_ttl_seconds is None else stale_ttl_seconds
+    
     def decorator(func):
         @wraps(func)
         def wrapper(*args, **kwargs):
-            if not REDIS_AVAILABLE:
-                return func(*args, **kwargs)
-            
             # Create a cache key from function args and kwargs
-            cache_key = f"{key_prefix}:{func.__name__}:"
+            if key_builder is not None:
+                cache_key = key_builder(*args, **kwargs)
+            else:
+                cache_key = build_cache_key(key_prefix, func, args, kwargs)
             
-            # Add args to key
-            if args:
-                cache_key += ":".join(str(arg) for arg in args)
+            if not REDIS_AVAILABLE:
+                result = fallback_cache.get(cache_key)
+                if result is None:
+                    result = func(*args, **kwargs)
+                    if isinstance(result, Uncached):
+                        return result.value
+                    fallback_cache.set(cache_key, result, ttl_seconds)
+                return result
             
-            # Add sorted kwargs to key
-            if kwargs:
-                kwargs_str = ":".join(f"{k}={v}" for k, v in sorted(kwargs.items()))
-                cache_key += ":" + kwargs_str
+            # Try the in-process cache first
+            local_data = _l1_get(cache_key)
+            if local_data is not None:
+                return local_data
             
             # Try to get from cache
-            cached_data = redis_client.get(cache_key)
-            if cached_data:
-                try:
-                    return json.loads(cached_data)
-                except Exception as e:
-                    logger.error(f"Error decoding cached data: {e}")
+            value, fresh, remaining = _read_entry(_load_entry(cache_key), beta)
+            if fresh:
+                _l1_set(cache_key, value, remaining)
+                return value
             
-            # If not in cache, call function
-            result = func(*args, **kwargs)
+            # Missing, expired or picked for early recomputation
+            lock_token = _acquire_recompute_lock(cache_key)
+            if lock_token is None:
+                if value is not None:
+                    return value
+                
+                # Cold miss: give the lock holder a couple of short polls to
+                # fill the key, then compute locally rather than blocking
+                for _ in range(CACHE_LOCK_SYNC_POLLS):
+                    time.sleep(CACHE_LOCK_POLL_SECONDS)
+                    value, _, _ = _read_entry(_load_entry(cache_key), beta)
+                    if value is not None:
+                        return value
             
-            # Store result in cache
             try:
-                redis_client.setex(
-                    cache_key,
-                    ttl_seconds,
-                    json.dumps(result)
-                )
-            except Exception as e:
-                logger.error(f"Error caching data: {e}")
+                start = time.monotonic()
+                result = func(*args, **kwargs)
+                delta = time.monotonic() - start
+                if isinstance(result, Uncached):
+                    return result.value
+                
+                # Store result in cache
+                try:
+                    _redis_setex(
+                        cache_key,
+                        ttl_seconds + stale_ttl,
+                        encode(_make_entry(result, delta, ttl_seconds))
+                    )
+                    _l1_set(cache_key, result, ttl_seconds)
+                    _publish_invalidation("key", cache_key)
+                except Exception as e:
+                    logger.error(f"Error caching data: {e}")
+            finally:
+                if lock_token is not None:
+                    _release_recompute_lock(cache_key, lock_token)
             
             return result
         
@@ -77,6 +453,167 @@ def cache_data(key_prefix: str, ttl_seconds: int = 300):
     
     return decorator
 
+async def async_get_cached_data(key: str, l1_ttl_seconds: Optional[float] = None) -> Optional[Any]:
+    """
+    Get data from Redis cache without blocking the event loop
+    
+    Args:
+        key: Redis key
+        l1_ttl_seconds: How long a Redis hit may be served from the L1 cache,
+            defaults to CACHE_L1_TTL_SECONDS
+        
+    Returns:
+        Cached data or None
+    """
+    if not REDIS_AVAILABLE:
+        return fallback_cache.get(key)
+    
+    local_data = _l1_get(key)
+    if local_data is not None:
+        return local_data
+    
+    try:
+        data = await _async_redis_get(key)
+        if data:
+            decoded = decode(data)
+            _l1_set(key, decoded, l1_ttl_seconds or CACHE_L1_TTL_SECONDS, l1_ttl_seconds)
+            return decoded
+        return None
+    except Exception as e:
+        logger.error(f"Error getting cached data: {e}")
+        return None
+
+async def async_set_cached_data(key: str, data: Any, ttl_seconds: int = 300, l1_ttl_seconds: Optional[float] = None,
+                                fallback_ttl_seconds: Optional[float] = None) -> bool:
+    """
+    Set data in Redis cache without blocking the event loop
+    
+    Args:
+        key: Redis key
+        data: Data to cache
+        ttl_seconds: Time-to-live in seconds
+        l1_ttl_seconds: Time-to-live in the L1 cache, defaults to CACHE_L1_TTL_SECONDS
+        fallback_ttl_seconds: Time-to-live in the fallback cache while Redis is
+            down, defaults to ttl_seconds; 0 skips caching. Other workers
+            cannot invalidate fallback entries, so data that must not go
+            stale should keep this short.
+        
+    Returns:
+        True if successful, False otherwise
+    """
+    if not REDIS_AVAILABLE:
+        fallback_ttl = ttl_seconds if fallback_ttl_seconds is None else fallback_ttl_seconds
+        if fallback_ttl <= 0:
+            return False
+        fallback_cache.set(key, data, fallback_ttl)
+        return True
+    
+    try:
+        await _async_redis_setex(key, ttl_seconds, encode(data))
+        _l1_set(key, data, ttl_seconds, l1_ttl_seconds)
+        await _async_publish_invalidation("key", key)
+        return True
+    except Exception as e:
+        logger.error(f"Error setting cached data: {e}")
+        return False
+
+# Attempts at a compare-and-set before giving up; each retry means another
+# writer got in first, so contention resolves within a few rounds
+CACHE_CAS_ATTEMPTS = 5
+
+async def async_set_cached_data_if_newer(key: str, data: Dict[str, Any], version_field: str = "version",
+                                         ttl_seconds: int = 300, l1_ttl_seconds: Optional[float] = None,
+                                         fallback_ttl_seconds: Optional[float] = None) -> bool:
+    """
+    Set versioned data unless the cache already holds a copy at least as new
+
+    The cached value is compared and replaced under WATCH, so a reader that
+    loaded an old document cannot overwrite the copy a later write stored.
+    Documents without version_field count as version 0.
+    
+    Args:
+        key: Redis key
+        data: Document to cache, carrying its version under version_field
+        version_field: Name of the version field
+        ttl_seconds: Time-to-live in seconds
+        l1_ttl_seconds: Time-to-live in the L1 cache, defaults to CACHE_L1_TTL_SECONDS
+        fallback_ttl_seconds: Time-to-live in the fallback cache while Redis is
+            down, defaults to ttl_seconds; 0 skips caching
+        
+    Returns:
+        True if the data was cached, False if a newer copy was kept or the write failed
+    """
+    version = data.get(version_field, 0)
+    if not REDIS_AVAILABLE:
+        fallback_ttl = ttl_seconds if fallback_ttl_seconds is None else fallback_ttl_seconds
+        if fallback_ttl <= 0:
+            return False
+        current = fallback_cache.get(key)
+        if current is not None and current.get(version_field, 0) >= version:
+            return False
+        fallback_cache.set(key, data, fallback_ttl)
+        return True
+    
+    payload = encode(data)
+    try:
+        for _ in range(CACHE_CAS_ATTEMPTS):
+            try:
+                async with async_redis_client.pipeline(transaction=True) as pipe:
+                    await pipe.watch(key)
+                    current = await pipe.get(key)
+                    if current and decode(current).get(version_field, 0) >= version:
+                        return False
+                    start = time.perf_counter()
+                    pipe.multi()
+                    pipe.setex(key, ttl_seconds, payload)
+                    await pipe.execute()
+                    cache_metrics.record_set(key, time.perf_counter() - start, len(payload))
+                    break
+            except redis.exceptions.WatchError:
+                # Another worker changed the key; compare against its value
+                continue
+        else:
+            logger.warning(f"Gave up caching {key} after {CACHE_CAS_ATTEMPTS} conflicting writes")
+            return False
+        _l1_set(key, data, ttl_seconds, l1_ttl_seconds)
+        await _async_publish_invalidation("key", key)
+        return True
+    except Exception as e:
+        cache_metrics.record_error(key, "set")
+        if isinstance(e, (redis.exceptions.ConnectionError, redis.exceptions.TimeoutError)):
+            _mark_redis_unavailable(e)
+        logger.error(f"Error setting cached data: {e}")
+        return False
+
+async def async_delete_cached_data(key: str) -> bool:
+    """
+    Delete data from Redis cache without blocking the event loop
+    
+    Args:
+        key: Redis key
+        
+    Returns:
+        True if successful, False otherwise
+    """
+    if not REDIS_AVAILABLE:
+        fallback_cache.delete(key)
+        return True
+    
+    local_cache.delete(key)
+    
+    try:
+        await async_redis_client.delete(key)
+        await _async_publish_invalidation("key", key)
+        return True
+    except Exception as e:
+        cache_metrics.record_error(key, "delete")
+        logger.error(f"Error deleting cached data: {e}")
+        return False
+
+async def close_async_redis():
+    """Release the pooled asyncio Redis connections"""
+    await async_redis_pool.disconnect()
+
 def get_cached_data(key: str) -> Optional[Any]:
     """
     Get data from Redis cache
@@ -88,12 +625,18 @@ def get_cached_data(key: str) -> Optional[Any]:
         Cached data or None
     """
     if not REDIS_AVAILABLE:
-        return None
+        return fallback_cache.get(key)
+    
+    local_data = _l1_get(key)
+    if local_data is not None:
+        return local_data
     
     try:
-        data = redis_client.get(key)
+        data = _redis_get(key)
         if data:
-            return json.loads(data)
+            decoded = decode(data)
+            _l1_set(key, decoded, CACHE_L1_TTL_SECONDS)
+            return decoded
         return None
     except Exception as e:
         logger.error(f"Error getting cached data: {e}")
@@ -112,14 +655,17 @@ def set_cached_data(key: str, data: Any, ttl_seconds: int = 300) -> bool:
         True if successful, False otherwise
     """
     if not REDIS_AVAILABLE:
-        return False
+        fallback_cache.set(key, data, ttl_seconds)
+        return True
     
     try:
-        redis_client.setex(
+        _redis_setex(
             key,
             ttl_seconds,
-            json.dumps(data)
+            encode(data)
         )
+        _l1_set(key, data, ttl_seconds)
+        _publish_invalidation("key", key)
         return True
     except Exception as e:
         logger.error(f"Error setting cached data: {e}")
@@ -136,19 +682,113 @@ def delete_cached_data(key: str) -> bool:
         True if successful, False otherwise
     """
     if not REDIS_AVAILABLE:
-        return False
+        fallback_cache.delete(key)
+        return True
+    
+    local_cache.delete(key)
     
     try:
         redis_client.delete(key)
+        _publish_invalidation("key", key)
         return True
     except Exception as e:
+        cache_metrics.record_error(key, "delete")
         logger.error(f"Error deleting cached data: {e}")
         return False
 
+def get_many_cached_data(keys: List[str]) -> Dict[str, Any]:
+    """
+    Get many keys from cache in a single MGET round-trip
+    
+    Args:
+        keys: Redis keys
+        
+    Returns:
+        Dictionary of the keys that were found and their data
+    """
+    if not keys:
+        return {}
+    if not REDIS_AVAILABLE:
+        found = {key: fallback_cache.get(key) for key in keys}
+        return {key: data for key, data in found.items() if data is not None}
+    
+    found = {}
+    missing = []
+    for key in keys:
+        local_data = _l1_get(key)
+        if local_data is not None:
+            found[key] = local_data
+        else:
+            missing.append(key)
+    
+    try:
+        for start in range(0, len(missing), CACHE_BATCH_SIZE):
+            batch = missing[start:start + CACHE_BATCH_SIZE]
+            for key, data in zip(batch, _redis_mget(batch)):
+                if not data:
+                    continue
+                try:
+                    decoded = decode(data)
+                except Exception as e:
+                    logger.error(f"Error decoding cached data for {key}: {e}")
+                    continue
+                _l1_set(key, decoded, CACHE_L1_TTL_SECONDS)
+                found[key] = decoded
+    except Exception as e:
+        logger.error(f"Error getting cached data: {e}")
+    
+    return found
+
+def set_many_cached_data(items: Dict[str, Any], ttl_seconds: int = 300) -> bool:
+    """
+    Set many keys with a TTL in one pipelined round-trip per batch
+    
+    Args:
+        items: Dictionary of Redis keys to data
+        ttl_seconds: Time-to-live in seconds
+        
+    Returns:
+        True if successful, False otherwise
+    """
+    if not REDIS_AVAILABLE:
+        for key, data in items.items():
+            fallback_cache.set(key, data, ttl_seconds)
+        return True
+    if not items:
+        return True
+    
+    try:
+        entries = list(items.items())
+        for start in range(0, len(entries), CACHE_BATCH_SIZE):
+            batch = entries[start:start + CACHE_BATCH_SIZE]
+            payloads = [(key, encode(data)) for key, data in batch]
+            started = time.perf_counter()
+            pipe = redis_client.pipeline(transaction=False)
+            for key, payload in payloads:
+                pipe.setex(key, ttl_seconds, payload)
+                if CACHE_L1_ENABLED:
+                    pipe.publish(CACHE_INVALIDATION_CHANNEL, _invalidation_message("key", key))
+            pipe.execute()
+            elapsed = time.perf_counter() - started
+            for key, payload in payloads:
+                cache_metrics.record_set(key, elapsed / len(payloads), len(payload), operation="mset")
+        
+        for key, data in entries:
+            _l1_set(key, data, ttl_seconds)
+        return True
+    except Exception as e:
+        cache_metrics.record_error(next(iter(items)), "mset")
+        logger.error(f"Error setting cached data: {e}")
+        return False
+
 def clear_cache_by_prefix(prefix: str) -> bool:
     """
     Clear all keys matching a prefix
     
+    Keys are collected one SCAN page at a time and removed with a pipelined
+    UNLINK per page, so the memory is reclaimed in the background by Redis
+    and the number of round-trips grows with pages rather than keys.
+    
     Args:
         prefix: Key prefix
         
@@ -156,12 +796,70 @@ def clear_cache_by_prefix(prefix: str) -> bool:
         True if successful, False otherwise
     """
     if not REDIS_AVAILABLE:
-        return False
+        fallback_cache.delete_prefix(prefix)
+        return True
+    
+    local_cache.delete_prefix(prefix)
     
     try:
-        for key in redis_client.scan_iter(f"{prefix}*"):
-            redis_client.delete(key)
+        batch = []
+        for key in redis_client.scan_iter(match=f"{prefix}*", count=CACHE_BATCH_SIZE):
+            batch.append(key)
+            if len(batch) >= CACHE_BATCH_SIZE:
+                _unlink_batch(batch)
+                batch = []
+        if batch:
+            _unlink_batch(batch)
+        _publish_invalidation("prefix", prefix)
         return True
     except Exception as e:
+        cache_metrics.record_error(prefix, "clear")
         logger.error(f"Error clearing cache: {e}")
         return False
+
+def _unlink_batch(keys: List[Any]):
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.unlink(*keys)
+    pipe.execute()
+
+# Negative caching: short-lived markers for upstream queries that failed or
+# came back empty, so repeated requests skip the provider while it is
+# unhealthy instead of calling it again
+NEGATIVE_CACHE_ERROR_TTL_SECONDS = int(os.environ.get("NEGATIVE_CACHE_ERROR_TTL_SECONDS", "15"))
+NEGATIVE_CACHE_EMPTY_TTL_SECONDS = int(os.environ.get("NEGATIVE_CACHE_EMPTY_TTL_SECONDS", "60"))
+
+def negative_cache_key(provider: str, query_key: str) -> str:
+    return f"negative:{provider}:{query_key}"
+
+def record_upstream_failure(provider: str, query_key: str, reason: str, empty: bool = False) -> bool:
+    """
+    Remember that an upstream query failed or returned no data
+    
+    Args:
+        provider: Upstream provider name (e.g. "binance", "coinapi")
+        query_key: Canonical key of the query within the provider
+        reason: Short description, kept for debugging
+        empty: True for an empty result, which is cached longer than an error
+        
+    Returns:
+        True if successful, False otherwise
+    """
+    ttl_seconds = NEGATIVE_CACHE_EMPTY_TTL_SECONDS if empty else NEGATIVE_CACHE_ERROR_TTL_SECONDS
+    return set_cached_data(
+        negative_cache_key(provider, query_key),
+        {"reason": reason, "empty": empty, "recorded_at": datetime.utcnow().isoformat()},
+        ttl_seconds
+    )
+
+def get_upstream_failure(provider: str, query_key: str) -> Optional[Any]:
+    """
+    Get the negative cache entry for an upstream query
+    
+    Args:
+        provider: Upstream provider name
+        query_key: Canonical key of the query within the provider
+        
+    Returns:
+        The recorded failure, or None if the query may be sent upstream
+    """
+    return get_cached_data(negative_cache_key(provider, query_key))
@@ -1,27 +1,69 @@
 import os
+import asyncio
 import logging
+from contextlib import asynccontextmanager
 from pathlib import Path
 from dotenv import load_dotenv
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
+from prometheus_client import make_asgi_app
 import uvicorn
 
+# Load environment variables before the app modules read their settings
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
 from app.api.api import api_router
+from app.db.database import connect_to_mongo, close_mongo_connection, DATABASE_NAME
+from app.db.indexes import ensure_indexes
+from app.services.price_book import run_price_feed
+from app.services.portfolio_summary import run_summary_reconciler
+from app.services.portfolio_history import run_portfolio_snapshots
+from app.services.portfolio_stream import portfolio_hub
+from app.services.market_history import market_history, MARKET_HISTORY_ENABLED
+from app.utils.redis_cache import close_async_redis
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Load environment variables
-ROOT_DIR = Path(__file__).parent
-load_dotenv(ROOT_DIR / '.env')
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One pooled MongoDB client for the lifetime of the app
+    client = connect_to_mongo()
+    db = client[DATABASE_NAME]
+    try:
+        await ensure_indexes(db)
+    except Exception as e:
+        logger.error(f"Error ensuring MongoDB indexes: {e}")
+    
+    # Keep current prices in memory for portfolio valuation
+    price_feed = asyncio.create_task(run_price_feed())
+    # Repair drift in the materialized portfolio summaries
+    summary_reconciler = asyncio.create_task(run_summary_reconciler(db))
+    # Daily portfolio value history
+    portfolio_snapshots = asyncio.create_task(run_portfolio_snapshots(db))
+    # Reload live valuations when another worker changes a user's holdings
+    holdings_listener = asyncio.create_task(portfolio_hub.run_holdings_listener(db))
+    # Optional tick and candle persistence
+    if MARKET_HISTORY_ENABLED:
+        await market_history.start(db)
+    yield
+    price_feed.cancel()
+    summary_reconciler.cancel()
+    portfolio_snapshots.cancel()
+    holdings_listener.cancel()
+    await market_history.stop()
+    close_mongo_connection()
+    await close_async_redis()
 
 # Create FastAPI app
 app = FastAPI(
     title="Crypto Dashboard API",
     description="API for Cryptocurrency Dashboard",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # Add CORS middleware
@@ -36,6 +78,9 @@ app.add_middleware(
 # Add API router with prefix
 app.include_router(api_router, prefix="/api")
 
+# Prometheus metrics (cache hit ratio, latency, payload sizes, top keys)
+app.mount("/metrics", make_asgi_app())
+
 @app.get("/")
 async def root():
     return {"message": "Welcome to the Crypto Dashboard API"}
@@ -1,10 +1,13 @@
-from fastapi import FastAPI, APIRouter, WebSocket, WebSocketDisconnect, HTTPException, Depends, Query, status
+from fastapi import FastAPI, APIRouter, WebSocket, WebSocketDisconnect, HTTPException, Depends, Query, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from fastapi.security import OAuth2PasswordRequestForm
+from prometheus_client import make_asgi_app
 from motor.motor_asyncio import AsyncIOMotorClient
 from dotenv import load_dotenv
 from pydantic import BaseModel, Field
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Callable, Awaitable, Set, Tuple
+from collections import deque
 import logging
 import os
 import asyncio
@@ -29,6 +32,9 @@ from auth import authenticate_user, create_access_token, get_current_user, creat
 from models import (UserCreate, UserLogin, UserResponse, Token, 
                    Portfolio, PortfolioCreate, PortfolioSummary, 
                    UserPreferences, CryptoCurrency, MarketIndicator, ChartData)
+from app.db.indexes import ensure_indexes
+from app.services.market_history import market_history, MARKET_HISTORY_ENABLED, COLLECTIONS as MARKET_HISTORY_COLLECTIONS
+from app.utils.queues import put_latest
 
 # Load environment variables
 ROOT_DIR = Path(__file__).parent
@@ -104,6 +110,84 @@ class ConnectionManager:
 
 manager = ConnectionManager()
 
+# Shared broadcast producer for the real-time channels
+class BroadcastChannel:
+    """
+    Polls a producer coroutine on a fixed interval and fans every result out
+    to all subscribers (WebSocket and SSE alike), so the upstream call is made
+    once per tick instead of once per connected client.
+
+    Each published event gets a monotonically increasing id and is kept in a
+    small ring buffer, which lets SSE clients resume with Last-Event-ID.
+    """
+
+    def __init__(self, name: str, producer: Callable[[], Awaitable[Any]],
+                 interval_seconds: float, history_size: int = 20, queue_size: int = 10):
+        self.name = name
+        self.producer = producer
+        self.interval_seconds = interval_seconds
+        self.queue_size = queue_size
+        self.history: deque = deque(maxlen=history_size)
+        self.subscribers: Set[asyncio.Queue] = set()
+        self.last_event_id = 0
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        while True:
+            try:
+                self.publish(await self.producer())
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error producing {self.name} update: {e}")
+            await asyncio.sleep(self.interval_seconds)
+
+    def publish(self, data: Any) -> Tuple[int, Any]:
+        """Record an event and push it to every subscriber queue"""
+        self.last_event_id += 1
+        event = (self.last_event_id, data)
+        self.history.append(event)
+        for queue in self.subscribers:
+            put_latest(queue, event)
+        return event
+
+    def subscribe(self, last_event_id: Optional[int] = None) -> asyncio.Queue:
+        """
+        Register a subscriber and prime its queue
+
+        A subscriber resuming from a known id gets every buffered event after
+        it; everyone else (or an id that has fallen out of the buffer) gets
+        only the latest snapshot.
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        if self.history:
+            oldest_id = self.history[0][0]
+            if last_event_id is not None and oldest_id - 1 <= last_event_id < self.last_event_id:
+                backlog = [event for event in self.history if event[0] > last_event_id]
+            elif last_event_id is not None and last_event_id == self.last_event_id:
+                backlog = []
+            else:
+                backlog = [self.history[-1]]
+            for event in backlog[-self.queue_size:]:
+                queue.put_nowait(event)
+
+        self.subscribers.add(queue)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self.subscribers.discard(queue)
+        if not self.subscribers and self._task is not None:
+            # Nobody is listening, stop polling upstream
+            self._task.cancel()
+            self._task = None
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
 # Models
 class CryptoCurrency(BaseModel):
     symbol: str
@@ -412,6 +496,9 @@ async def get_crypto_prices(symbols: List[str] = None):
                     "market_cap": current_price * volume_24h * 0.1,  # Simple approximation
                     "last_updated": datetime.utcnow().isoformat()
                 })
+        
+        # Live prices only; mock data is never persisted
+        market_history.record_ticks(result)
                 
         return result
     except Exception as e:
@@ -482,6 +569,7 @@ async def get_candlestick_data(symbol: str, interval: str):
     try:
         # Get candlestick data from Binance
         candles = binance_client.get_klines(symbol=symbol, interval=interval, limit=100)
+        market_history.record_klines(symbol, interval, candles)
         
         formatted_candles = []
         for candle in candles:
@@ -530,56 +618,89 @@ async def get_news_api(limit: int = 10, category: Optional[str] = None, search:
 async def get_chart_data(symbol: str, interval: str = "1h"):
     return await get_candlestick_data(symbol, interval)
 
-# WebSocket endpoint for real-time updates
-@app.websocket("/ws/crypto-prices")
-async def websocket_crypto_prices(websocket: WebSocket):
+# Real-time channels shared by the WebSocket and SSE endpoints
+prices_channel = BroadcastChannel("crypto_prices", get_crypto_prices, interval_seconds=5)
+indicators_channel = BroadcastChannel("market_indicators", get_market_indicators, interval_seconds=15)
+
+SSE_KEEPALIVE_SECONDS = 15
+
+async def stream_channel_to_websocket(websocket: WebSocket, channel: BroadcastChannel):
+    """Forward every event published on a channel to a WebSocket client"""
     await manager.connect(websocket)
+    queue = channel.subscribe()
     try:
-        # Initial data
-        crypto_data = await get_crypto_prices()
-        await websocket.send_text(json.dumps({
-            "type": "crypto_prices",
-            "data": crypto_data
-        }))
-        
-        # Continuously send updates
         while True:
-            await asyncio.sleep(5)  # Update every 5 seconds
-            crypto_data = await get_crypto_prices()
+            _, data = await queue.get()
             await websocket.send_text(json.dumps({
-                "type": "crypto_prices",
-                "data": crypto_data
+                "type": channel.name,
+                "data": data
             }))
     except WebSocketDisconnect:
-        manager.disconnect(websocket)
+        pass
     except Exception as e:
         logger.error(f"WebSocket error: {e}")
+    finally:
+        channel.unsubscribe(queue)
         manager.disconnect(websocket)
 
+def format_sse_event(event_id: int, event_type: str, data: Any) -> str:
+    """Serialize one event in text/event-stream format"""
+    return f"id: {event_id}\nevent: {event_type}\ndata: {json.dumps(data)}\n\n"
+
+def channel_event_stream(request: Request, channel: BroadcastChannel) -> StreamingResponse:
+    """Build an SSE response fed by a broadcast channel, honouring Last-Event-ID"""
+    last_event_id = None
+    header_value = request.headers.get("last-event-id")
+    if header_value:
+        try:
+            last_event_id = int(header_value)
+        except ValueError:
+            last_event_id = None
+
+    async def event_generator():
+        queue = channel.subscribe(last_event_id)
+        try:
+            yield f"retry: {int(channel.interval_seconds * 1000)}\n\n"
+            while True:
+                if await request.is_disconnected():
+                    break
+                try:
+                    event_id, data = await asyncio.wait_for(queue.get(), timeout=SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    # Comment line keeps idle connections open through proxies
+                    yield ": keep-alive\n\n"
+                    continue
+                yield format_sse_event(event_id, channel.name, data)
+        finally:
+            channel.unsubscribe(queue)
+
+    return StreamingResponse(
+        event_generator(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no",
+        },
+    )
+
+# Server-Sent Events endpoints for clients that cannot use WebSockets
+@api_router.get("/stream/prices")
+async def stream_prices(request: Request):
+    return channel_event_stream(request, prices_channel)
+
+@api_router.get("/stream/market-indicators")
+async def stream_market_indicators(request: Request):
+    return channel_event_stream(request, indicators_channel)
+
+# WebSocket endpoint for real-time updates
+@app.websocket("/ws/crypto-prices")
+async def websocket_crypto_prices(websocket: WebSocket):
+    await stream_channel_to_websocket(websocket, prices_channel)
+
 @app.websocket("/ws/market-indicators")
 async def websocket_market_indicators(websocket: WebSocket):
-    await manager.connect(websocket)
-    try:
-        # Initial data
-        indicators = await get_market_indicators()
-        await websocket.send_text(json.dumps({
-            "type": "market_indicators",
-            "data": indicators
-        }))
-        
-        # Continuously send updates
-        while True:
-            await asyncio.sleep(15)  # Update every 15 seconds
-            indicators = await get_market_indicators()
-            await websocket.send_text(json.dumps({
-                "type": "market_indicators",
-                "data": indicators
-            }))
-    except WebSocketDisconnect:
-        manager.disconnect(websocket)
-    except Exception as e:
-        logger.error(f"WebSocket error: {e}")
-        manager.disconnect(websocket)
+    await stream_channel_to_websocket(websocket, indicators_channel)
 
 # Authentication routes
 @auth_router.post("/register", response_model=UserResponse)
@@ -767,6 +888,24 @@ api_router.include_router(portfolio_router, prefix="/portfolio")
 api_router.include_router(preferences_router, prefix="/preferences")
 app.include_router(api_router)
 
+# Prometheus metrics; this app does not go through the Redis cache, so it
+# exports market history writes and process stats rather than cache metrics
+app.mount("/metrics", make_asgi_app())
+
+@app.on_event("startup")
+async def start_market_history():
+    # Optional tick and candle persistence
+    if MARKET_HISTORY_ENABLED:
+        try:
+            # Only the market time-series; the other collections belong to main.py
+            await ensure_indexes(db, MARKET_HISTORY_COLLECTIONS.values())
+        except Exception as e:
+            logger.error(f"Error ensuring MongoDB indexes: {e}")
+        await market_history.start(db)
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    await prices_channel.stop()
+    await indicators_channel.stop()
+    await market_history.stop()
     client.close()
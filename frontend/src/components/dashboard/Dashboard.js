@@ -23,46 +23,73 @@ const Dashboard = () => {
   const { currentUser, logout } = useAuth();
   const { portfolios } = usePortfolio();
 
-  // Connect to WebSocket for real-time updates
+  // Subscribe to real-time updates
   useEffect(() => {
     // Load initial data
     fetchCryptocurrencies();
     fetchMarketIndicators();
 
-    // WebSocket setup for crypto prices
-    let pricesWs = null;
-    let indicatorsWs = null;
+    // Server-Sent Events for real-time updates, with polling as a fallback
     let reconnectTimeout = null;
 
-    const connectPricesWebSocket = () => {
-      try {
-        // Fall back to polling if WebSocket is not available
-        const interval = setInterval(fetchCryptocurrencies, 5000);
-        return () => clearInterval(interval);
-      } catch (error) {
-        console.error('Error setting up crypto prices WebSocket:', error);
-        // Fallback to polling
-        const interval = setInterval(fetchCryptocurrencies, 5000);
+    const connectEventStream = (path, eventType, onData, fetchFallback, pollInterval) => {
+      if (typeof EventSource === 'undefined') {
+        // Fall back to polling if EventSource is not available
+        const interval = setInterval(fetchFallback, pollInterval);
         return () => clearInterval(interval);
       }
-    };
 
-    const connectIndicatorsWebSocket = () => {
-      try {
-        // Fall back to polling if WebSocket is not available
-        const interval = setInterval(fetchMarketIndicators, 15000);
-        return () => clearInterval(interval);
-      } catch (error) {
-        console.error('Error setting up market indicators WebSocket:', error);
-        // Fallback to polling
-        const interval = setInterval(fetchMarketIndicators, 15000);
-        return () => clearInterval(interval);
-      }
+      let pollingInterval = null;
+      const source = new EventSource(`${API}${path}`);
+      source.addEventListener(eventType, (event) => {
+        if (pollingInterval) {
+          clearInterval(pollingInterval);
+          pollingInterval = null;
+        }
+        try {
+          onData(JSON.parse(event.data));
+        } catch (error) {
+          console.error(`Error parsing ${eventType} event:`, error);
+        }
+      });
+      source.onerror = () => {
+        // EventSource reconnects on its own (resuming via Last-Event-ID);
+        // poll in the meantime so the dashboard does not go stale
+        if (!pollingInterval) {
+          pollingInterval = setInterval(fetchFallback, pollInterval);
+        }
+      };
+
+      return () => {
+        source.close();
+        if (pollingInterval) {
+          clearInterval(pollingInterval);
+        }
+      };
     };
 
-    // Connect to WebSockets
-    const cleanupPrices = connectPricesWebSocket();
-    const cleanupIndicators = connectIndicatorsWebSocket();
+    const connectPricesStream = () => connectEventStream(
+      '/stream/prices',
+      'crypto_prices',
+      (data) => {
+        setCryptocurrencies(data);
+        setIsLoading(false);
+      },
+      fetchCryptocurrencies,
+      5000
+    );
+
+    const connectIndicatorsStream = () => connectEventStream(
+      '/stream/market-indicators',
+      'market_indicators',
+      setMarketIndicators,
+      fetchMarketIndicators,
+      15000
+    );
+
+    // Connect to event streams
+    const cleanupPrices = connectPricesStream();
+    const cleanupIndicators = connectIndicatorsStream();
 
     // Cleanup function
     return () => {
@@ -0,0 +1,55 @@
+import os
+import sys
+import time
+import random
+from datetime import datetime, timedelta
+
+# Make the backend "app" package importable
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from app.utils.cache_codecs import CODECS, COMPRESSORS, encode, decode
+
+def make_candles(count: int = 1000):
+    """Build a chart payload shaped like binance_service.get_chart_data output"""
+    start = datetime(2024, 1, 1)
+    price = 58750.0
+    candles = []
+    for i in range(count):
+        change = random.uniform(-500, 500)
+        candles.append({
+            "timestamp": (start + timedelta(hours=i)).isoformat(),
+            "open": round(price, 2),
+            "high": round(price + abs(change), 2),
+            "low": round(price - abs(change), 2),
+            "close": round(price + change, 2),
+            "volume": round(random.uniform(1e6, 1e7), 2)
+        })
+        price += change
+    return {"symbol": "BTC", "interval": "1h", "candles": candles}
+
+def benchmark(data, codec: str, compression: str, rounds: int = 200):
+    blob = encode(data, codec=codec, compression=compression)
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        encode(data, codec=codec, compression=compression)
+    encode_us = (time.perf_counter() - start) / rounds * 1e6
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        decode(blob)
+    decode_us = (time.perf_counter() - start) / rounds * 1e6
+
+    return len(blob), encode_us, decode_us
+
+def main():
+    random.seed(42)
+    data = make_candles()
+    print(f"{'codec':<10}{'compression':<13}{'bytes':>10}{'encode us':>12}{'decode us':>12}")
+    for codec in CODECS:
+        for compression in COMPRESSORS:
+            size, encode_us, decode_us = benchmark(data, codec, compression)
+            print(f"{codec:<10}{compression:<13}{size:>10}{encode_us:>12.1f}{decode_us:>12.1f}")
+
+if __name__ == "__main__":
+    main()
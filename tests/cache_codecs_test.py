@@ -0,0 +1,27 @@
+import json
+import unittest
+
+from app.utils.cache_codecs import CODECS, COMPRESSORS, MAGIC, encode, decode
+
+SAMPLE = {
+    "symbol": "BTC",
+    "interval": "1h",
+    "candles": [{"timestamp": f"2024-01-01T{i % 24:02d}:00:00", "open": 1.5 * i, "close": 2.0 * i} for i in range(200)]
+}
+
+class CacheCodecsTest(unittest.TestCase):
+    """Tests for the versioned cache envelope"""
+
+    def test_round_trip_every_codec_and_compressor(self):
+        for codec in CODECS:
+            for compression in COMPRESSORS:
+                blob = encode(SAMPLE, codec=codec, compression=compression, min_compress_bytes=0)
+                self.assertTrue(blob.startswith(MAGIC))
+                self.assertEqual(decode(blob), SAMPLE, f"{codec}/{compression}")
+
+    def test_small_payloads_are_not_compressed(self):
+        blob = encode({"a": 1}, codec="json", compression="zlib", min_compress_bytes=1024)
+        self.assertEqual(blob[len(MAGIC) + 2], 0)
+
+    def test_legacy_json_entries_are_readable(self):
+        self.assertEqual(decode(json.dumps(SAMPLE).encode("utf-8")), SAMPLE)
@@ -0,0 +1,36 @@
+import unittest
+from datetime import datetime, timedelta, timezone
+
+from app.utils.cache_keys import align_time_range, chart_cache_key, floor_to_interval, ceil_to_interval
+
+class CacheKeysTest(unittest.TestCase):
+    """Tests for canonical chart and market cache keys"""
+
+    def test_floor_and_ceil_to_interval(self):
+        value = datetime(2024, 3, 14, 10, 37, 12, tzinfo=timezone.utc)
+        self.assertEqual(floor_to_interval(value, "1h"), datetime(2024, 3, 14, 10, tzinfo=timezone.utc))
+        self.assertEqual(ceil_to_interval(value, "15m"), datetime(2024, 3, 14, 10, 45, tzinfo=timezone.utc))
+        self.assertEqual(floor_to_interval(value, "1M"), datetime(2024, 3, 1, tzinfo=timezone.utc))
+        self.assertEqual(ceil_to_interval(value, "1M"), datetime(2024, 4, 1, tzinfo=timezone.utc))
+
+    def test_weeks_start_on_monday(self):
+        value = datetime(2024, 3, 14, 10, tzinfo=timezone.utc)  # Thursday
+        self.assertEqual(floor_to_interval(value, "1w"), datetime(2024, 3, 11, tzinfo=timezone.utc))
+
+    def test_requests_within_one_interval_share_a_key(self):
+        first = datetime(2024, 3, 14, 10, 1, tzinfo=timezone.utc)
+        second = first + timedelta(minutes=42, microseconds=17)
+        self.assertEqual(
+            chart_cache_key("btc", "1h", 100, None, first),
+            chart_cache_key("BTC ", "1h", 100, None, second)
+        )
+        self.assertNotEqual(
+            chart_cache_key("BTC", "1h", 100, None, first),
+            chart_cache_key("BTC", "1h", 100, None, first + timedelta(hours=1))
+        )
+
+    def test_default_range(self):
+        now = datetime(2024, 3, 14, 10, 37, tzinfo=timezone.utc)
+        start, end = align_time_range("1d", now=now)
+        self.assertEqual(start, datetime(2024, 2, 13, tzinfo=timezone.utc))
+        self.assertEqual(end, datetime(2024, 3, 15, tzinfo=timezone.utc))
@@ -0,0 +1,82 @@
+import unittest
+from collections import Counter
+from unittest import mock
+
+from tests.support import BACKEND_AVAILABLE, requires_backend
+
+if BACKEND_AVAILABLE:
+    from prometheus_client import REGISTRY
+    from app.utils import cache_metrics
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+@requires_backend
+class CacheMetricsTest(unittest.TestCase):
+    """Tests for the per-prefix cache counters and the top-keys collector"""
+
+    def setUp(self):
+        patches = [
+            mock.patch.object(cache_metrics, "_sampled_keys", Counter()),
+            mock.patch.object(cache_metrics, "CACHE_KEY_SAMPLE_RATE", 1.0),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_hits_misses_and_latency(self):
+        hits = sample("cache_hits_total", prefix="metricstest", tier="redis")
+        l1_hits = sample("cache_hits_total", prefix="metricstest", tier="l1")
+        misses = sample("cache_misses_total", prefix="metricstest")
+        reads = sample("cache_operation_seconds_count", prefix="metricstest", operation="get")
+        cache_metrics.record_get("metricstest:btc", 0.002, b"payload")
+        cache_metrics.record_get(b"metricstest:eth", 0.001, None)
+        cache_metrics.record_l1_hit("metricstest:btc")
+
+        self.assertEqual(sample("cache_hits_total", prefix="metricstest", tier="redis"), hits + 1)
+        self.assertEqual(sample("cache_hits_total", prefix="metricstest", tier="l1"), l1_hits + 1)
+        self.assertEqual(sample("cache_misses_total", prefix="metricstest"), misses + 1)
+        self.assertEqual(sample("cache_operation_seconds_count", prefix="metricstest", operation="get"), reads + 2)
+
+    def test_errors_and_payload_sizes(self):
+        errors = sample("cache_errors_total", prefix="metricstest", operation="set")
+        size = sample("cache_payload_bytes_sum", prefix="metricstest", operation="set")
+        cache_metrics.record_error("metricstest:btc", "set")
+        cache_metrics.record_set("metricstest:btc", 0.001, 512)
+        self.assertEqual(sample("cache_errors_total", prefix="metricstest", operation="set"), errors + 1)
+        self.assertEqual(sample("cache_payload_bytes_sum", prefix="metricstest", operation="set"), size + 512)
+
+    def test_top_keys_are_exported(self):
+        for _ in range(3):
+            cache_metrics.record_l1_hit("metricstest:btc")
+        cache_metrics.record_l1_hit("metricstest:eth")
+        self.assertEqual(cache_metrics.top_keys(1), [("metricstest:btc", 3)])
+        self.assertEqual(sample("cache_top_key_samples", key="metricstest:btc"), 3)
+        self.assertEqual(sample("cache_top_key_samples", key="metricstest:eth"), 1)
+
+    def test_sampler_stays_bounded(self):
+        with mock.patch.object(cache_metrics, "CACHE_KEY_SAMPLE_CAPACITY", 4):
+            cache_metrics.sample_key("metricstest:hot")
+            cache_metrics.sample_key("metricstest:hot")
+            for i in range(10):
+                cache_metrics.sample_key(f"metricstest:{i}")
+            self.assertLessEqual(len(cache_metrics._sampled_keys), 4)
+            self.assertIn("metricstest:hot", dict(cache_metrics.top_keys()))
+
+@requires_backend
+class MetricsEndpointTest(unittest.TestCase):
+    """Both apps expose the Prometheus registry"""
+
+    def scrape(self, app):
+        from fastapi.testclient import TestClient
+        response = TestClient(app).get("/metrics/")
+        self.assertEqual(response.status_code, 200)
+        return response.text
+
+    def test_main_app(self):
+        from main import app
+        self.assertIn("cache_hits_total", self.scrape(app))
+
+    def test_server_app(self):
+        import server
+        self.assertIn("market_history_documents_total", self.scrape(server.app))
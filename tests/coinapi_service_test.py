@@ -0,0 +1,86 @@
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+from tests.support import BACKEND_AVAILABLE, requires_backend
+
+if BACKEND_AVAILABLE:
+    from app.services import coinapi_service
+    from app.utils import redis_cache
+
+@requires_backend
+class CoinApiHistoryTest(unittest.TestCase):
+    """The OHLCV history request carries the parameters CoinAPI requires"""
+
+    def setUp(self):
+        self.response = mock.Mock(status_code=200)
+        self.response.json.return_value = [{"price_close": float(i)} for i in range(200)]
+        patches = [
+            mock.patch.object(coinapi_service.requests, "get", return_value=self.response),
+            mock.patch.object(coinapi_service, "get_upstream_failure", return_value=None),
+            mock.patch.object(coinapi_service, "record_upstream_failure"),
+        ]
+        self.get = patches[0].start()
+        for patch in patches[1:]:
+            patch.start()
+        for patch in patches:
+            self.addCleanup(patch.stop)
+
+    def query(self):
+        args, kwargs = self.get.call_args
+        url = requests.Request("GET", args[0], params=kwargs["params"]).prepare().url
+        return {name: values[0] for name, values in parse_qs(urlparse(url).query).items()}
+
+    def test_indicators_request_period_and_start(self):
+        result = coinapi_service.get_technical_indicators("BTC", "1h", "sma")
+        self.assertNotIn("error", result)
+        query = self.query()
+        self.assertEqual(query["period_id"], "1HRS")
+        self.assertEqual(query["limit"], "199")
+        time_start = datetime.strptime(query["time_start"], "%Y-%m-%dT%H:%M:%S")
+        self.assertAlmostEqual(
+            (datetime.utcnow() - time_start).total_seconds(), timedelta(hours=199).total_seconds(), delta=60
+        )
+
+    def test_explicit_range_is_sent(self):
+        coinapi_service.get_historical_data("ETH", "1DAY", start_time=datetime(2024, 1, 1), end_time=datetime(2024, 2, 1))
+        query = self.query()
+        self.assertEqual(query["time_start"], "2024-01-01T00:00:00")
+        self.assertEqual(query["time_end"], "2024-02-01T00:00:00")
+
+@requires_backend
+class CoinApiNegativeCacheTest(unittest.TestCase):
+    """An empty history only suppresses requests for the same range"""
+
+    def setUp(self):
+        self.response = mock.Mock(status_code=200)
+        self.response.json.return_value = []
+        patches = [
+            mock.patch.object(coinapi_service.requests, "get", return_value=self.response),
+            mock.patch.object(redis_cache, "REDIS_AVAILABLE", False),
+            mock.patch.object(redis_cache, "fallback_cache", redis_cache.TTLCache(max_items=10, default_ttl=60)),
+        ]
+        self.get = patches[0].start()
+        for patch in patches[1:]:
+            patch.start()
+        for patch in patches:
+            self.addCleanup(patch.stop)
+
+    def history(self, month):
+        return coinapi_service.get_historical_data("BTC", "1DAY", start_time=datetime(2024, month, 1), end_time=datetime(2024, month, 28))
+
+    def test_empty_range_does_not_hide_other_ranges(self):
+        self.assertEqual(self.history(1), [])
+        self.assertEqual(self.history(1), [])
+        self.assertEqual(self.get.call_count, 1)
+        self.history(2)
+        self.assertEqual(self.get.call_count, 2)
+
+    def test_request_errors_hold_for_every_range(self):
+        self.response.status_code = 401
+        self.history(1)
+        self.history(2)
+        self.assertEqual(self.get.call_count, 1)
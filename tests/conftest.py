@@ -0,0 +1,2 @@
+# Importing the shared helpers puts the backend on sys.path before any test module is collected
+import tests.support  # noqa: F401
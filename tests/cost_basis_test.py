@@ -0,0 +1,78 @@
+import unittest
+from datetime import datetime
+
+from app.services.cost_basis import (
+    AVERAGE, FIFO, LIFO, InsufficientQuantityError, PositionBook, apply_transaction, to_epoch
+)
+
+def trade(side, amount, price, day, fee=0.0):
+    return {"side": side, "amount": amount, "price": price, "fee": fee, "timestamp": datetime(2024, 1, day)}
+
+class CostBasisTest(unittest.TestCase):
+    """Tests for the lot-based cost basis engine"""
+
+    def book_after_two_buys(self, method):
+        book = PositionBook(method)
+        apply_transaction(book, trade("buy", 1, 100, 1))
+        apply_transaction(book, trade("buy", 1, 200, 2))
+        return book
+
+    def test_fifo_sells_oldest_lot(self):
+        book = self.book_after_two_buys(FIFO)
+        self.assertAlmostEqual(apply_transaction(book, trade("sell", 1, 300, 3)), 200)
+        self.assertAlmostEqual(book.cost, 200)
+
+    def test_lifo_sells_newest_lot(self):
+        book = self.book_after_two_buys(LIFO)
+        self.assertAlmostEqual(apply_transaction(book, trade("sell", 1, 300, 3)), 100)
+        self.assertAlmostEqual(book.cost, 100)
+
+    def test_average_cost(self):
+        book = self.book_after_two_buys(AVERAGE)
+        self.assertAlmostEqual(apply_transaction(book, trade("sell", 1, 300, 3)), 150)
+        self.assertAlmostEqual(book.average_cost, 150)
+
+    def test_sell_spanning_lots(self):
+        book = self.book_after_two_buys(FIFO)
+        self.assertAlmostEqual(apply_transaction(book, trade("sell", 1.5, 300, 3)), 450 - 200)
+        self.assertEqual(len(book.lots), 1)
+        self.assertAlmostEqual(book.quantity, 0.5)
+        self.assertAlmostEqual(book.unrealized_pnl(300), 150 - 100)
+
+    def test_fees(self):
+        book = PositionBook(FIFO)
+        apply_transaction(book, trade("buy", 2, 100, 1, fee=10))
+        self.assertAlmostEqual(book.average_cost, 105)
+        self.assertAlmostEqual(apply_transaction(book, trade("sell", 2, 110, 2, fee=4)), 220 - 4 - 210)
+
+    def test_transfers_do_not_realize(self):
+        book = self.book_after_two_buys(FIFO)
+        self.assertEqual(apply_transaction(book, trade("transfer_out", 1, 0, 3)), 0)
+        self.assertEqual(book.realized_pnl, 0)
+        self.assertAlmostEqual(book.cost, 200)
+        apply_transaction(book, trade("transfer_in", 1, 50, 4))
+        self.assertAlmostEqual(book.cost, 250)
+
+    def test_oversell_rejected(self):
+        book = self.book_after_two_buys(LIFO)
+        with self.assertRaises(InsufficientQuantityError):
+            apply_transaction(book, trade("sell", 3, 300, 3))
+        self.assertAlmostEqual(book.quantity, 2)
+
+    def test_snapshot_round_trip(self):
+        book = self.book_after_two_buys(LIFO)
+        restored = PositionBook.from_dict(book.to_dict(), book.open_lots())
+        apply_transaction(book, trade("sell", 1, 300, 3))
+        self.assertAlmostEqual(apply_transaction(restored, trade("sell", 1, 300, 3)), book.realized_pnl)
+
+    def test_restore_with_lot_prefix(self):
+        book = PositionBook(FIFO)
+        for day in range(1, 6):
+            apply_transaction(book, trade("buy", 1, 100 * day, day))
+        # Only the two oldest lots are needed to close 1.5
+        restored = PositionBook.from_dict(book.to_dict(), book.open_lots()[:2])
+        self.assertAlmostEqual(apply_transaction(restored, trade("sell", 1.5, 300, 6)), 450 - 200)
+        self.assertEqual(restored.lot_count, 4)
+        self.assertEqual(restored.open_lots(), [
+            {"sequence": 2, "timestamp": to_epoch(datetime(2024, 1, 2)), "quantity": 0.5, "unit_cost": 200}
+        ])
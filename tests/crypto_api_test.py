@@ -0,0 +1,43 @@
+import unittest
+from datetime import datetime, timezone
+
+from tests.support import BACKEND_AVAILABLE, FakeDatabase, api_client, requires_backend, reset_api_overrides
+
+if BACKEND_AVAILABLE:
+    from app.utils.cache_keys import floor_to_interval
+
+@requires_backend
+class CryptoApiTest(unittest.TestCase):
+    """Chart endpoints, served from the mock feed when Binance is unreachable"""
+
+    def setUp(self):
+        self.client = api_client(FakeDatabase())
+
+    def tearDown(self):
+        reset_api_overrides()
+
+    def test_chart(self):
+        response = self.client.get("/api/crypto/chart/BTC", params={"interval": "1h", "limit": 5})
+        self.assertEqual(response.status_code, 200, response.text)
+        self.assertLessEqual(len(response.json()["candles"]), 5)
+
+    def test_indicators(self):
+        response = self.client.get("/api/crypto/indicators/BTC", params={"interval": "1h", "indicators": "sma:3"})
+        self.assertEqual(response.status_code, 200, response.text)
+        body = response.json()
+        self.assertEqual(len(body["indicators"]["sma_3"]), len(body["timestamps"]))
+        self.assertEqual(self.client.get("/api/crypto/indicators/BTC", params={"indicators": "bogus"}).status_code, 400)
+
+    def test_default_indicator_window_is_current(self):
+        for interval in ("1d", "1h", "1m"):
+            params = {} if interval == "1d" else {"interval": interval}
+            before = datetime.now(timezone.utc)
+            response = self.client.get("/api/crypto/indicators/BTC", params=params)
+            after = datetime.now(timezone.utc)
+            self.assertEqual(response.status_code, 200, response.text)
+            body = response.json()
+            self.assertEqual(len(body["timestamps"]), 500)
+            # Ends with the open candle, and is long enough for the MACD signal to warm up
+            last = floor_to_interval(datetime.fromisoformat(body["timestamps"][-1]), interval)
+            self.assertIn(last, (floor_to_interval(before, interval), floor_to_interval(after, interval)))
+            self.assertIsNotNone(body["indicators"]["macd_12_26_9"]["signal"][-1])
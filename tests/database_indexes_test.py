@@ -0,0 +1,87 @@
+import os
+import asyncio
+import unittest
+from datetime import datetime
+from unittest import mock
+
+from tests.support import BACKEND_AVAILABLE, requires_backend
+
+if BACKEND_AVAILABLE:
+    from app.db import indexes
+
+try:
+    from pymongo import MongoClient
+    from motor.motor_asyncio import AsyncIOMotorClient
+    from app.db.indexes import ensure_indexes, is_index_covered
+    MONGO_URL = os.environ.get("MONGO_URL", "mongodb://localhost:27017")
+    MongoClient(MONGO_URL, serverSelectionTimeoutMS=1000).admin.command("ping")
+    MONGO_AVAILABLE = True
+except Exception:
+    MONGO_AVAILABLE = False
+
+TEST_DATABASE = "crypto_dashboard_index_test"
+
+@unittest.skipUnless(MONGO_AVAILABLE, "MongoDB is not reachable")
+class DatabaseIndexesTest(unittest.TestCase):
+    """Checks that the hot user.py queries are served by the startup indexes"""
+
+    @classmethod
+    def setUpClass(cls):
+        async def provision():
+            client = AsyncIOMotorClient(MONGO_URL)
+            await ensure_indexes(client[TEST_DATABASE])
+            # Running twice must be a no-op
+            await ensure_indexes(client[TEST_DATABASE])
+            client.close()
+
+        asyncio.run(provision())
+        cls.client = MongoClient(MONGO_URL)
+        cls.db = cls.client[TEST_DATABASE]
+        cls.db.portfolios.insert_many([
+            {"username": f"user_{i % 50}", "symbol": "BTC", "amount": 1.0,
+             "purchase_price": 100.0, "purchase_date": datetime(2024, 1, 1 + i % 28)}
+            for i in range(500)
+        ])
+        cls.db.user_preferences.insert_one({"username": "user_1", "theme": "dark"})
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.client.drop_database(TEST_DATABASE)
+        cls.client.close()
+
+    def test_portfolio_listing_uses_index(self):
+        explain = self.db.portfolios.find({"username": "user_1"}).explain()
+        self.assertTrue(is_index_covered(explain))
+
+    def test_portfolio_symbol_lookup_uses_index(self):
+        explain = self.db.portfolios.find({"username": "user_1", "symbol": "BTC"}).explain()
+        self.assertTrue(is_index_covered(explain))
+
+    def test_portfolio_history_uses_index(self):
+        explain = self.db.portfolios.find({"username": "user_1"}).sort("purchase_date", -1).explain()
+        self.assertTrue(is_index_covered(explain))
+
+    def test_closing_lot_scan_uses_index(self):
+        explain = self.db.position_lots.find(
+            {"username": "user_1", "symbol": "BTC", "method": "lifo"}
+        ).sort([("timestamp", -1), ("sequence", -1)]).explain()
+        self.assertTrue(is_index_covered(explain))
+
+    def test_preferences_lookup_uses_index(self):
+        explain = self.db.user_preferences.find({"username": "user_1"}).explain()
+        self.assertTrue(is_index_covered(explain))
+
+@requires_backend
+class EnsureIndexesSelectionTest(unittest.TestCase):
+    """Provisioning can be limited to a subset of collections"""
+
+    def test_only_selected_collections_are_provisioned(self):
+        db = mock.MagicMock()
+        db.list_collection_names = mock.AsyncMock(return_value=[])
+        db.create_collection = mock.AsyncMock()
+        db.__getitem__.side_effect = lambda name: mock.MagicMock(create_indexes=mock.AsyncMock(return_value=[name]))
+
+        created = asyncio.run(indexes.ensure_indexes(db, ["market_ticks", "market_candles"]))
+        self.assertEqual(set(created), {"market_ticks", "market_candles"})
+        created_collections = {call.args[0] for call in db.create_collection.call_args_list}
+        self.assertEqual(created_collections, {"market_ticks", "market_candles"})
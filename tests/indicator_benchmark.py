@@ -0,0 +1,72 @@
+import os
+import sys
+import time
+import numpy as np
+
+# Make the backend "app" package importable
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+from app.services.indicators import atr, bollinger, ema, macd, rsi, sma, vwap, wma
+from app.services.streaming_indicators import IndicatorSet
+
+SIZES = (1_000, 10_000, 100_000)
+
+def make_series(count: int):
+    """Random-walk OHLCV arrays around BTC price levels"""
+    rng = np.random.default_rng(42)
+    closes = 58750.0 + np.cumsum(rng.normal(0, 150, count))
+    spread = np.abs(rng.normal(0, 100, count))
+    volumes = rng.uniform(1e6, 1e7, count)
+    return closes + spread, closes - spread, closes, volumes
+
+def naive_sma(prices, window):
+    """The per-point slicing SMA that binance_service used to ship"""
+    if len(prices) < window:
+        return [None] * len(prices)
+    result = [None] * (window - 1)
+    for i in range(len(prices) - window + 1):
+        result.append(sum(prices[i:i+window]) / window)
+    return result
+
+def timed(function, rounds: int = 5) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        function()
+    return (time.perf_counter() - start) / rounds * 1e3
+
+def main():
+    indicators = {
+        "sma_50": lambda h, l, c, v: sma(c, 50),
+        "ema_50": lambda h, l, c, v: ema(c, 50),
+        "wma_50": lambda h, l, c, v: wma(c, 50),
+        "rsi_14": lambda h, l, c, v: rsi(c, 14),
+        "macd": lambda h, l, c, v: macd(c),
+        "bollinger_20": lambda h, l, c, v: bollinger(c, 20),
+        "atr_14": lambda h, l, c, v: atr(h, l, c, 14),
+        "vwap": lambda h, l, c, v: vwap(h, l, c, v),
+    }
+
+    series = {size: make_series(size) for size in SIZES}
+    print(f"{'indicator':<14}" + "".join(f"{size:>12}" for size in SIZES) + f"{'x per 10x n':>14}")
+    for name, function in indicators.items():
+        timings = [timed(lambda: function(*series[size])) for size in SIZES]
+        # Linear scaling shows up as roughly 10x time per 10x candles
+        growth = (timings[-1] / timings[0]) ** (1 / (len(SIZES) - 1))
+        print(f"{name:<14}" + "".join(f"{ms:>10.2f}ms" for ms in timings) + f"{growth:>14.1f}")
+
+    closes = series[SIZES[-1]][2].tolist()
+    for window in (7, 50, 200):
+        legacy = timed(lambda: naive_sma(closes, window), rounds=1)
+        vectorized = timed(lambda: sma(closes, window))
+        print(f"sma_{window} on {len(closes)} candles: legacy {legacy:.1f}ms, vectorized {vectorized:.2f}ms")
+
+    # Per-tick cost of the streaming indicators does not depend on history length
+    spec = "sma:50,ema:50,rsi:14,macd:12:26:9,bollinger:20:2"
+    streaming = IndicatorSet(spec)
+    streaming.extend(closes[:-1000])
+    peek = timed(lambda: [streaming.peek(close) for close in closes[-1000:]]) / 1000 * 1e3
+    update = timed(lambda: streaming.extend(closes[-1000:]), rounds=1) / 1000 * 1e3
+    print(f"streaming {spec}: peek {peek:.1f}us, update {update:.1f}us per candle")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+import unittest
+import numpy as np
+
+from app.services.indicators import (
+    atr, bollinger, compute_indicators, ema, linear_recurrence, macd,
+    parse_indicator_spec, rsi, sma, to_list, vwap, wma
+)
+
+def reference_ema(values, period, alpha=None):
+    """Textbook loop: SMA seed, then y = alpha * x + (1 - alpha) * y"""
+    alpha = alpha or 2 / (period + 1)
+    result = [np.nan] * len(values)
+    result[period - 1] = sum(values[:period]) / period
+    for i in range(period, len(values)):
+        result[i] = alpha * values[i] + (1 - alpha) * result[i - 1]
+    return np.array(result)
+
+def reference_window(values, period, reducer):
+    return np.array([np.nan] * (period - 1) + [reducer(values[i - period + 1:i + 1]) for i in range(period - 1, len(values))])
+
+class IndicatorsTest(unittest.TestCase):
+    """Tests for the vectorized indicator engine against per-point loops"""
+
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        self.closes = 30000 + np.cumsum(rng.normal(0, 80, 3000))
+        spread = np.abs(rng.normal(0, 50, 3000))
+        self.highs = self.closes + spread
+        self.lows = self.closes - spread
+        self.volumes = rng.uniform(1, 100, 3000)
+
+    def assertSeriesClose(self, actual, expected, rtol=1e-9):
+        np.testing.assert_array_equal(np.isnan(actual), np.isnan(expected))
+        np.testing.assert_allclose(actual[~np.isnan(actual)], expected[~np.isnan(expected)], rtol=rtol)
+
+    def test_linear_recurrence_spans_blocks(self):
+        inputs = np.ones(5000)
+        expected = np.empty(5000)
+        state = 2.0
+        for i in range(5000):
+            state = 0.9 * state + inputs[i]
+            expected[i] = state
+        np.testing.assert_allclose(linear_recurrence(inputs, 0.9, 2.0), expected, rtol=1e-12)
+
+    def test_sma(self):
+        self.assertSeriesClose(sma(self.closes, 20), reference_window(self.closes, 20, np.mean))
+
+    def test_wma(self):
+        weights = np.arange(1, 21)
+        expected = reference_window(self.closes, 20, lambda window: (window * weights).sum() / weights.sum())
+        self.assertSeriesClose(wma(self.closes, 20), expected)
+
+    def test_ema(self):
+        self.assertSeriesClose(ema(self.closes, 20), reference_ema(self.closes, 20))
+
+    def test_rsi(self):
+        changes = np.diff(self.closes)
+        gains = reference_ema(np.clip(changes, 0, None), 14, alpha=1 / 14)
+        losses = reference_ema(np.clip(-changes, 0, None), 14, alpha=1 / 14)
+        expected = np.concatenate(([np.nan], 100 - 100 / (1 + gains / losses)))
+        self.assertSeriesClose(rsi(self.closes, 14), expected)
+
+    def test_rsi_without_losses(self):
+        self.assertEqual(rsi(np.arange(1.0, 30.0), 14)[-1], 100.0)
+
+    def test_macd(self):
+        result = macd(self.closes)
+        line = reference_ema(self.closes, 12) - reference_ema(self.closes, 26)
+        self.assertSeriesClose(result["macd"], line)
+        signal = np.full(len(line), np.nan)
+        signal[25:] = reference_ema(line[25:], 9)
+        self.assertSeriesClose(result["signal"], signal)
+
+    def test_bollinger(self):
+        bands = bollinger(self.closes, 20, 2)
+        expected = reference_window(self.closes, 20, np.mean) + 2 * reference_window(self.closes, 20, np.std)
+        self.assertSeriesClose(bands["upper"], expected, rtol=1e-8)
+
+    def test_atr(self):
+        previous = np.concatenate(([self.closes[0]], self.closes[:-1]))
+        ranges = np.maximum.reduce([self.highs - self.lows, np.abs(self.highs - previous), np.abs(self.lows - previous)])
+        ranges[0] = self.highs[0] - self.lows[0]
+        self.assertSeriesClose(atr(self.highs, self.lows, self.closes, 14), reference_ema(ranges, 14, alpha=1 / 14))
+
+    def test_vwap(self):
+        typical = (self.highs + self.lows + self.closes) / 3
+        expected = np.cumsum(typical * self.volumes) / np.cumsum(self.volumes)
+        self.assertSeriesClose(vwap(self.highs, self.lows, self.closes, self.volumes), expected)
+
+    def test_short_series_is_all_warm_up(self):
+        self.assertEqual(to_list(sma([1.0, 2.0], 7)), [None, None])
+        self.assertEqual(to_list(ema([1.0, 2.0], 7)), [None, None])
+
+    def test_parse_indicator_spec(self):
+        self.assertEqual(parse_indicator_spec("sma:50, rsi, bollinger:20:2.5"), [
+            ("sma", (50.0,)), ("rsi", (14,)), ("bollinger", (20.0, 2.5))
+        ])
+        for spec in ("foo", "sma:0", "sma:1.5", "rsi:14:2"):
+            with self.assertRaises(ValueError):
+                parse_indicator_spec(spec)
+
+    def test_compute_indicators(self):
+        candles = [
+            {"open": c, "high": h, "low": l, "close": c, "volume": v}
+            for h, l, c, v in zip(self.highs[:60], self.lows[:60], self.closes[:60], self.volumes[:60])
+        ]
+        result = compute_indicators(candles, "sma:7,macd")
+        self.assertEqual(set(result), {"sma_7", "macd_12_26_9"})
+        self.assertEqual(len(result["sma_7"]), 60)
+        self.assertIsNone(result["sma_7"][0])
+        self.assertEqual(set(result["macd_12_26_9"]), {"macd", "signal", "histogram"})
@@ -0,0 +1,147 @@
+import asyncio
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+
+from tests.support import BACKEND_AVAILABLE, FakeDatabase, requires_backend
+
+if BACKEND_AVAILABLE:
+    from app.services.cost_basis import FIFO, LIFO, InsufficientQuantityError, apply_transaction
+    from app.services import ledger_service
+    from app.services.ledger_service import PositionBusyError, _save_position, get_positions, load_books, record_transaction
+    from app.services.price_book import PriceBook
+
+def trade(side, amount, price, day):
+    return {"symbol": "BTC", "side": side, "amount": amount, "price": price, "fee": 0.0, "timestamp": datetime(2024, 1, day)}
+
+@requires_backend
+class LedgerServiceTest(unittest.TestCase):
+    """Tests for incremental position updates over separately stored lots"""
+
+    def setUp(self):
+        self.db = FakeDatabase()
+        self.db.positions.unique = [("username", "symbol")]
+        self.db.position_locks.unique = [("username", "symbol")]
+
+    def record(self, *trades):
+        async def run():
+            return [await record_transaction(self.db, "alice", dict(trade)) for trade in trades]
+        return asyncio.run(run())
+
+    def lots(self, method):
+        return sorted(
+            (lot["sequence"], lot["quantity"]) for lot in self.db.position_lots.documents if lot["method"] == method
+        )
+
+    def test_lots_are_stored_outside_the_position(self):
+        self.record(*(trade("buy", 1, 100 * day, day) for day in range(1, 4)))
+        position = self.db.positions.documents[0]
+        self.assertNotIn("lots", position["books"][FIFO])
+        self.assertEqual(position["books"][FIFO]["open_lots"], 3)
+        self.assertEqual(self.lots(FIFO), [(1, 1), (2, 1), (3, 1)])
+
+    def test_sell_touches_only_the_lots_it_closes(self):
+        self.record(*(trade("buy", 1, 100 * day, day) for day in range(1, 6)))
+        [sale] = self.record(trade("sell", 1.5, 600, 6))
+        self.assertAlmostEqual(sale["realized_pnl"][FIFO], 900 - 200)
+        self.assertAlmostEqual(sale["realized_pnl"][LIFO], 900 - 700)
+        self.assertEqual(self.lots(FIFO), [(2, 0.5), (3, 1), (4, 1), (5, 1)])
+        self.assertEqual(self.lots(LIFO), [(1, 1), (2, 1), (3, 1), (4, 0.5)])
+        self.assertEqual(self.db.positions.documents[0]["books"][FIFO]["open_lots"], 4)
+
+    def test_closing_everything_removes_the_lots(self):
+        self.record(trade("buy", 1, 100, 1), trade("buy", 1, 200, 2), trade("sell", 2, 300, 3))
+        self.assertEqual(self.db.position_lots.documents, [])
+
+    def test_backdated_trade_replays_into_lots(self):
+        self.record(trade("buy", 1, 100, 2), trade("sell", 1, 300, 3))
+        [backdated] = self.record(trade("buy", 1, 50, 1))
+        self.assertEqual(backdated["realized_pnl"][FIFO], 0)
+        # The sale now closed the backdated lot first
+        self.assertEqual(self.lots(FIFO), [(2, 1)])
+        positions = asyncio.run(get_positions(self.db, "alice", FIFO, PriceBook()))
+        self.assertAlmostEqual(positions["total_realized_pnl"], 250)
+
+    def test_oversell_is_rejected(self):
+        self.record(trade("buy", 1, 100, 1))
+        with self.assertRaises(InsufficientQuantityError):
+            self.record(trade("sell", 2, 100, 2))
+        self.assertEqual(len(self.db.transactions.documents), 1)
+
+    def test_inline_lots_are_migrated(self):
+        self.db.positions.documents.append({
+            "username": "alice", "symbol": "BTC", "version": 1,
+            "books": {FIFO: {"method": FIFO, "lots": [[0, 1, 1.0, 100.0]], "quantity": 1.0, "cost": 100.0,
+                             "realized_pnl": 0.0, "last_timestamp": 0.0, "sequence": 1}},
+        })
+        asyncio.run(self.db.transactions.insert_one(dict(trade("buy", 1, 100, 1), username="alice")))
+        self.record(trade("buy", 1, 200, 2))
+        self.assertNotIn("lots", self.db.positions.documents[0]["books"][FIFO])
+        self.assertEqual(self.lots(FIFO), [(1, 1), (2, 1)])
+
+    def test_concurrent_backdated_trades_are_serialized(self):
+        self.record(trade("buy", 1, 100, 2))
+        transactions = self.db.transactions
+        original_insert, original_delete = transactions.insert_one, transactions.delete_one
+
+        async def insert_one(document):
+            # Yield around the writes so the two requests interleave
+            result = await original_insert(document)
+            await asyncio.sleep(0)
+            return result
+
+        async def delete_one(query):
+            await asyncio.sleep(0)
+            return await original_delete(query)
+
+        transactions.insert_one, transactions.delete_one = insert_one, delete_one
+
+        async def run():
+            # The oversell is inserted first and must not make the valid buy fail
+            return await asyncio.gather(
+                record_transaction(self.db, "alice", trade("sell", 2, 100, 1)),
+                record_transaction(self.db, "alice", trade("buy", 1, 50, 1)),
+                return_exceptions=True
+            )
+
+        oversell, backdated = asyncio.run(run())
+        self.assertIsInstance(oversell, InsufficientQuantityError)
+        self.assertEqual(backdated["side"], "buy")
+        self.assertEqual(len(self.db.transactions.documents), 2)
+        self.assertEqual(self.lots(FIFO), [(1, 1), (2, 1)])
+        self.assertEqual(self.db.position_locks.documents, [])
+
+    def test_lots_are_not_written_by_a_stale_writer(self):
+        self.record(trade("buy", 1, 100, 1))
+        position = self.db.positions.documents[0]
+        books = load_books(position)
+        for book in books.values():
+            apply_transaction(book, trade("buy", 1, 200, 2))
+        self.db.position_lots.calls.clear()
+        # Another writer bumped the version after this one loaded the position
+        saved = asyncio.run(_save_position(self.db, "alice", "BTC", books, {}, position["version"] - 1))
+        self.assertFalse(saved)
+        self.assertEqual(self.db.position_lots.calls, {})
+        self.assertEqual(self.lots(FIFO), [(1, 1)])
+
+    def test_half_written_lots_are_replayed(self):
+        self.record(trade("buy", 1, 100, 1), trade("buy", 1, 200, 2))
+        # A writer stored the totals and died before writing its lots
+        self.db.positions.documents[0]["lots_pending"] = True
+        self.db.position_lots.documents = [lot for lot in self.db.position_lots.documents if lot["sequence"] != 2]
+        self.record(trade("buy", 1, 300, 3))
+        self.assertEqual(self.lots(FIFO), [(1, 1), (2, 1), (3, 1)])
+        self.assertNotIn("lots_pending", self.db.positions.documents[0])
+
+    def test_held_lock_makes_writers_wait(self):
+        lease = {"username": "alice", "symbol": "BTC", "token": "other", "expires_at": datetime.utcnow() + timedelta(minutes=1)}
+        self.db.position_locks.documents.append(dict(lease))
+        with mock.patch.object(ledger_service, "LEDGER_LOCK_WAIT_SECONDS", 0):
+            with self.assertRaises(PositionBusyError):
+                self.record(trade("buy", 1, 100, 1))
+        self.assertEqual(self.db.transactions.documents, [])
+
+        # A lease its holder never released expires
+        self.db.position_locks.documents[0]["expires_at"] = datetime.utcnow() - timedelta(seconds=1)
+        self.record(trade("buy", 1, 100, 1))
+        self.assertEqual(len(self.db.transactions.documents), 1)
@@ -0,0 +1,127 @@
+import os
+import asyncio
+import tempfile
+import unittest
+from datetime import datetime, timezone
+
+from tests.support import BACKEND_AVAILABLE, FakeDatabase, requires_backend
+
+if BACKEND_AVAILABLE:
+    from pymongo.errors import AutoReconnect, BulkWriteError
+    from app.services.market_history import MarketHistoryWriter, pair_symbol
+
+def kline(open_ms, close_ms, close=1.0):
+    return [open_ms, "1", "2", "0.5", str(close), "10", close_ms, "10", 5]
+
+HOUR_MS = 3600 * 1000
+
+@requires_backend
+class MarketHistoryTest(unittest.TestCase):
+    """Tests for batched tick and candle persistence"""
+
+    def writer(self, **kwargs):
+        writer = MarketHistoryWriter(**kwargs)
+        writer.running = True
+        writer._db = FakeDatabase()
+        return writer
+
+    def test_pair_symbol(self):
+        self.assertEqual(pair_symbol("btc"), "BTCUSDT")
+        self.assertEqual(pair_symbol("ETHUSDT"), "ETHUSDT")
+
+    def test_ticks_are_written_in_batches(self):
+        writer = self.writer(batch_size=2)
+        writer.record_ticks([{"symbol": "BTC", "price": 1}, {"symbol": "ETH", "price": 2}, {"symbol": "SOL", "price": 3}])
+        self.assertEqual(asyncio.run(writer.flush()), 3)
+        self.assertEqual([tick["symbol"] for tick in writer._db["market_ticks"].documents], ["BTCUSDT", "ETHUSDT", "SOLUSDT"])
+
+    def test_only_new_closed_candles_are_recorded(self):
+        writer = self.writer()
+        now_ms = int(datetime.now(timezone.utc).timestamp() * 1000)
+        start = now_ms - 3 * HOUR_MS
+        klines = [kline(start + i * HOUR_MS, start + (i + 1) * HOUR_MS - 1) for i in range(4)]
+        writer.record_klines("BTC", "1h", klines)
+        writer.record_klines("BTC", "1h", klines)
+        asyncio.run(writer.flush())
+        # The last kline is still open and the repeat adds nothing
+        self.assertEqual(len(writer._db["market_candles"].documents), 3)
+
+    def test_backfilled_candles_are_recorded(self):
+        writer = self.writer()
+        now_ms = int(datetime.now(timezone.utc).timestamp() * 1000)
+        start = now_ms - 10 * HOUR_MS
+        klines = [kline(start + i * HOUR_MS, start + (i + 1) * HOUR_MS - 1) for i in range(6)]
+        writer.record_klines("BTC", "1h", klines[3:])
+        # An older range requested later, overlapping by one candle
+        writer.record_klines("BTC", "1h", klines[:4])
+        asyncio.run(writer.flush())
+        open_times = sorted(candle["open_time"] for candle in writer._db["market_candles"].documents)
+        self.assertEqual(len(open_times), 6)
+        self.assertEqual(len(set(open_times)), 6)
+
+    def test_stored_candles_are_not_rewritten(self):
+        writer = self.writer()
+        now_ms = int(datetime.now(timezone.utc).timestamp() * 1000)
+        start = now_ms - 5 * HOUR_MS
+        klines = [kline(start + i * HOUR_MS, start + (i + 1) * HOUR_MS - 1) for i in range(3)]
+        writer.record_klines("BTC", "1h", klines[:2])
+        asyncio.run(writer.flush())
+        # A restarted writer no longer remembers what it queued
+        restarted = self.writer()
+        restarted._db = writer._db
+        restarted.record_klines("BTC", "1h", klines)
+        self.assertEqual(asyncio.run(restarted.flush()), 1)
+        self.assertEqual(len(writer._db["market_candles"].documents), 3)
+
+    def test_overflow_is_shed_without_spill_path(self):
+        writer = self.writer(max_buffer=2)
+        writer.record_ticks([{"symbol": "BTC", "price": i} for i in range(5)])
+        self.assertEqual(asyncio.run(writer.flush()), 2)
+
+    def fail_insert(self, writer, error):
+        collection = writer._db["market_ticks"]
+        original = collection.insert_many
+
+        async def insert_many(documents, ordered=True):
+            # Fail once, writing what the error reports as inserted
+            collection.insert_many = original
+            failed = {write_error["index"] for write_error in error.details["writeErrors"]}
+            await original([document for i, document in enumerate(documents) if i not in failed])
+            raise error
+
+        collection.insert_many = insert_many
+
+    def test_unreachable_database_keeps_batch(self):
+        writer = self.writer()
+        writer._db["market_ticks"].failure = AutoReconnect("MongoDB is down")
+        writer.record_ticks([{"symbol": "BTC", "price": 1}])
+        self.assertEqual(asyncio.run(writer.flush()), 0)
+        writer._db["market_ticks"].failure = None
+        self.assertEqual(asyncio.run(writer.flush()), 1)
+
+    def test_partial_failure_retries_only_transient_errors(self):
+        writer = self.writer()
+        writer.record_ticks([{"symbol": "BTC", "price": i} for i in range(4)])
+        self.fail_insert(writer, BulkWriteError({
+            "nInserted": 2,
+            "writeErrors": [
+                {"index": 1, "code": 189, "errmsg": "primary stepped down"},
+                {"index": 3, "code": 121, "errmsg": "document failed validation"},
+            ],
+        }))
+        self.assertEqual(asyncio.run(writer.flush()), 2)
+        # Only the document that hit the failover is written again
+        self.assertEqual(asyncio.run(writer.flush()), 1)
+        self.assertEqual(asyncio.run(writer.flush()), 0)
+        prices = sorted(tick["price"] for tick in writer._db["market_ticks"].documents)
+        self.assertEqual(prices, [0, 1, 2])
+
+    def test_overflow_spills_and_replays(self):
+        with tempfile.TemporaryDirectory() as directory:
+            writer = self.writer(max_buffer=2, spill_path=os.path.join(directory, "spill.ndjson"))
+            writer.record_ticks([{"symbol": "BTC", "price": i} for i in range(5)])
+            asyncio.run(writer.flush())
+            self.assertEqual(asyncio.run(writer.replay_spill()), 3)
+            prices = sorted(tick["price"] for tick in writer._db["market_ticks"].documents)
+            self.assertEqual(prices, [0, 1, 2, 3, 4])
+            self.assertFalse(os.listdir(directory))
@@ -0,0 +1,38 @@
+import time
+import unittest
+
+from app.utils.memory_cache import TTLCache
+
+class TTLCacheTest(unittest.TestCase):
+    """Tests for the in-process TTL/LRU cache"""
+
+    def test_get_and_set(self):
+        cache = TTLCache(max_items=10, default_ttl=60)
+        cache.set("market:btc", {"price": 1.0})
+        self.assertEqual(cache.get("market:btc"), {"price": 1.0})
+        self.assertIsNone(cache.get("market:eth"))
+
+    def test_entries_expire(self):
+        cache = TTLCache(max_items=10, default_ttl=60)
+        cache.set("market:btc", 1, ttl_seconds=0.01)
+        time.sleep(0.02)
+        self.assertIsNone(cache.get("market:btc"))
+        self.assertEqual(len(cache), 0)
+
+    def test_least_recently_used_is_evicted(self):
+        cache = TTLCache(max_items=2, default_ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("c"), 3)
+
+    def test_delete_prefix(self):
+        cache = TTLCache(max_items=10, default_ttl=60)
+        cache.set("chart:btc:1h", 1)
+        cache.set("chart:eth:1h", 2)
+        cache.set("market:btc", 3)
+        self.assertEqual(cache.delete_prefix("chart:"), 2)
+        self.assertEqual(cache.get("market:btc"), 3)
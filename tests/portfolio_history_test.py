@@ -0,0 +1,42 @@
+import unittest
+from datetime import datetime
+
+from tests.support import BACKEND_AVAILABLE, requires_backend
+
+if BACKEND_AVAILABLE:
+    from app.services.price_book import PriceBook
+    from app.services.portfolio_history import changed_symbols, needs_snapshot, snapshot_bucket, snapshot_document
+
+def summary(version, snapshot_version, *symbols):
+    return {
+        "version": version,
+        "snapshot_version": snapshot_version,
+        "holdings": {symbol: {"symbol": symbol, "amount": 1.0, "invested": 10.0, "entries": 1} for symbol in symbols},
+    }
+
+@requires_backend
+class PortfolioHistoryTest(unittest.TestCase):
+    """Tests for incremental portfolio value snapshots"""
+
+    def test_daily_bucket(self):
+        self.assertEqual(snapshot_bucket(datetime(2024, 5, 3, 17, 45), 86400), datetime(2024, 5, 3))
+        self.assertEqual(snapshot_bucket(datetime(2024, 5, 3, 17, 45), 3600), datetime(2024, 5, 3, 17))
+
+    def test_changed_symbols(self):
+        previous = {"BTC": 100.0, "ETH": 10.0, "ADA": 1.0}
+        current = {"BTC": 100.0, "ETH": 11.0, "SOL": 5.0}
+        self.assertEqual(changed_symbols(previous, current), {"ETH", "SOL", "ADA"})
+
+    def test_only_changed_users_are_snapshotted(self):
+        self.assertTrue(needs_snapshot(summary(3, 2, "BTC"), set()))
+        self.assertTrue(needs_snapshot(summary(3, 3, "BTCUSDT"), {"BTC"}))
+        self.assertFalse(needs_snapshot(summary(3, 3, "BTC"), {"ETH"}))
+
+    def test_snapshot_document(self):
+        prices = PriceBook()
+        prices.update([{"symbol": "BTCUSDT", "price": 30.0}])
+        holdings = [{"symbol": "BTC", "amount": 2.0, "invested": 40.0, "entries": 1}]
+        point = snapshot_document("alice", datetime(2024, 5, 3), holdings, prices)
+        self.assertEqual(point["value"], 60.0)
+        self.assertEqual(point["profit_loss"], 20.0)
+        self.assertEqual(point["composition"], {"BTC": 2.0})
@@ -0,0 +1,80 @@
+import asyncio
+import unittest
+
+from tests.support import BACKEND_AVAILABLE, FakeDatabase, requires_backend
+
+if BACKEND_AVAILABLE:
+    from app.services.portfolio_service import InvalidLine, PortfolioImporter, import_csv_lines, import_ndjson_lines, iter_lines
+
+async def lines_of(text):
+    for line in text.split("\n"):
+        yield line
+
+async def chunks_of(*chunks):
+    for chunk in chunks:
+        yield chunk
+
+async def collect(lines):
+    return [line.reason if isinstance(line, InvalidLine) else line async for line in lines]
+
+@requires_backend
+class PortfolioImportTest(unittest.TestCase):
+    """Tests for streaming portfolio imports"""
+
+    def test_csv_import_reports_bad_rows(self):
+        db = FakeDatabase()
+        importer = PortfolioImporter(db, "alice", batch_size=2)
+        body = "symbol,amount,purchase_price,purchase_date\n" \
+               "BTC,0.5,40000,2024-01-01T00:00:00\n" \
+               "ETH,-1,2000,\n" \
+               "SOL,10,100,\n" \
+               "ADA,abc,1,\n"
+
+        async def run():
+            await import_csv_lines(importer, lines_of(body))
+            await importer.flush()
+
+        asyncio.run(run())
+        report = importer.report()
+        self.assertEqual(report["inserted"], 2)
+        self.assertEqual(report["failed"], 2)
+        self.assertEqual([error["row"] for error in report["errors"]], [2, 4])
+        self.assertEqual(db.portfolios.calls["insert_many"], 1)
+        self.assertTrue(all(doc["username"] == "alice" for doc in db.portfolios.documents))
+
+    def test_ndjson_import(self):
+        db = FakeDatabase()
+        importer = PortfolioImporter(db, "bob")
+        body = '{"symbol": "BTC", "amount": 1, "purchase_price": 1}\nnot json\n[1, 2]\n'
+
+        async def run():
+            await import_ndjson_lines(importer, lines_of(body))
+            await importer.flush()
+
+        asyncio.run(run())
+        report = importer.report()
+        self.assertEqual(report["inserted"], 1)
+        self.assertEqual(report["failed"], 2)
+
+    def test_lines_split_across_chunks(self):
+        lines = asyncio.run(collect(iter_lines(chunks_of(b"\xef\xbb\xbfa,b\r\n1,", b"2\n3,4"))))
+        self.assertEqual(lines, ["a,b", "1,2", "3,4"])
+
+    def test_overlong_and_undecodable_lines_are_reported(self):
+        body = chunks_of(b"ok\n", b"x" * 6, b"x" * 6 + b"\nb\xffd\nend")
+        lines = asyncio.run(collect(iter_lines(body, max_line_bytes=8)))
+        self.assertEqual(lines, ["ok", "line is longer than 8 bytes", "invalid UTF-8 at byte 1", "end"])
+
+    def test_unreadable_lines_fail_their_row(self):
+        db = FakeDatabase()
+        importer = PortfolioImporter(db, "carol")
+        body = chunks_of(b"symbol,amount,purchase_price\n", b"BTC,1,1\n", b"\xff,1,1\n", b"ETH,2,2\n")
+
+        async def run():
+            await import_csv_lines(importer, iter_lines(body))
+            await importer.flush()
+
+        asyncio.run(run())
+        report = importer.report()
+        self.assertEqual(report["inserted"], 2)
+        self.assertEqual(report["errors"], [{"row": 2, "error": "invalid UTF-8 at byte 0"}])
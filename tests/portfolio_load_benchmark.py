@@ -0,0 +1,47 @@
+import os
+import sys
+import time
+import statistics
+import requests
+from concurrent.futures import ThreadPoolExecutor
+
+# Local app server started with: uvicorn main:app --port 8001 (from backend/)
+BASE_URL = os.environ.get("BENCHMARK_BASE_URL", "http://localhost:8001")
+API_URL = f"{BASE_URL}/api"
+
+def login():
+    response = requests.post(
+        f"{API_URL}/auth/login",
+        data={"username": "user@example.com", "password": "password"}
+    )
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+def timed_request(path, headers):
+    start = time.perf_counter()
+    response = requests.get(f"{API_URL}{path}", headers=headers)
+    elapsed = time.perf_counter() - start
+    return response.status_code, elapsed
+
+def run(path, headers, concurrency):
+    """Fire `concurrency` simultaneous requests and report wall time vs per-request latency"""
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda _: timed_request(path, headers), range(concurrency)))
+    wall = time.perf_counter() - start
+
+    latencies = [elapsed for _, elapsed in results]
+    errors = sum(1 for status_code, _ in results if status_code >= 400)
+    # If handlers blocked the event loop, wall time approaches the sum of latencies
+    print(f"{path:<28} n={concurrency:<4} wall={wall * 1000:8.1f}ms "
+          f"median={statistics.median(latencies) * 1000:8.1f}ms "
+          f"sum={sum(latencies) * 1000:9.1f}ms errors={errors}")
+
+def main():
+    concurrency = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    headers = login()
+    for path in ("/user/portfolio", "/user/portfolio/summary", "/user/preferences"):
+        run(path, headers, concurrency)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+import unittest
+from datetime import datetime
+
+from tests.support import BACKEND_AVAILABLE, requires_backend
+
+if BACKEND_AVAILABLE:
+    from bson import ObjectId
+    from app.services.portfolio_service import encode_cursor, decode_cursor, keyset_filter
+
+@requires_backend
+class PortfolioPaginationTest(unittest.TestCase):
+    """Tests for keyset pagination of portfolio listings"""
+
+    def test_cursor_round_trip(self):
+        entry = {"_id": ObjectId(), "purchase_date": datetime(2024, 3, 1, 12, 30)}
+        self.assertEqual(decode_cursor(encode_cursor(entry)), (entry["purchase_date"], entry["_id"]))
+
+    def test_cursor_without_purchase_date(self):
+        entry = {"_id": ObjectId(), "purchase_date": None}
+        self.assertEqual(decode_cursor(encode_cursor(entry)), (None, entry["_id"]))
+
+    def test_invalid_cursor(self):
+        with self.assertRaises(ValueError):
+            decode_cursor("not-a-cursor")
+
+    def test_first_page_filter(self):
+        self.assertEqual(keyset_filter("alice", None), {"username": "alice"})
+
+    def test_filter_after_dated_entry(self):
+        entry = {"_id": ObjectId(), "purchase_date": datetime(2024, 3, 1)}
+        query = keyset_filter("alice", encode_cursor(entry))
+        self.assertEqual(query["username"], "alice")
+        self.assertEqual(query["$or"], [
+            {"purchase_date": {"$lt": entry["purchase_date"]}},
+            {"purchase_date": entry["purchase_date"], "_id": {"$lt": entry["_id"]}},
+            {"purchase_date": None},
+        ])
+
+    def test_filter_after_undated_entry(self):
+        entry = {"_id": ObjectId(), "purchase_date": None}
+        query = keyset_filter("alice", encode_cursor(entry))
+        self.assertEqual(query, {"username": "alice", "purchase_date": None, "_id": {"$lt": entry["_id"]}})
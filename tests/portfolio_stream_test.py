@@ -0,0 +1,68 @@
+import asyncio
+import unittest
+from unittest import mock
+
+from tests.support import BACKEND_AVAILABLE, requires_backend
+
+try:
+    import fakeredis
+except ImportError:
+    fakeredis = None
+
+if BACKEND_AVAILABLE:
+    from app.services import portfolio_stream
+    from app.services.portfolio_stream import PortfolioValuationHub
+    from app.utils import redis_cache
+
+@requires_backend
+@unittest.skipIf(fakeredis is None, "fakeredis is not installed")
+class HoldingsBroadcastTest(unittest.TestCase):
+    """Holdings changes in one worker reach connections held by another"""
+
+    def setUp(self):
+        self.holdings = {"alice": [{"symbol": "BTC", "amount": 1.0, "invested": 100.0}]}
+
+        async def get_summary_holdings(db, username):
+            return list(self.holdings.get(username, []))
+
+        patches = [
+            mock.patch.object(portfolio_stream, "get_summary_holdings", get_summary_holdings),
+            mock.patch.object(portfolio_stream, "HOLDINGS_LISTENER_RETRY_SECONDS", 0.01),
+            mock.patch.object(redis_cache, "REDIS_AVAILABLE", True),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_change_is_reloaded_by_other_worker(self):
+        async def run():
+            with mock.patch.object(redis_cache, "async_redis_client", fakeredis.FakeAsyncRedis()):
+                writer, reader = PortfolioValuationHub(), PortfolioValuationHub()
+                queue = await reader.subscribe("alice", db=None)
+                self.assertEqual(queue.get_nowait()["assets"][0]["amount"], 1.0)
+
+                listener = asyncio.create_task(reader.run_holdings_listener(db=None))
+                try:
+                    # Let the listener subscribe before publishing
+                    await asyncio.sleep(0.1)
+                    self.holdings["alice"] = [{"symbol": "BTC", "amount": 3.0, "invested": 300.0}]
+                    await writer.refresh_holdings("alice", db=None)
+                    valuation = await asyncio.wait_for(queue.get(), timeout=2)
+                finally:
+                    listener.cancel()
+                    await asyncio.gather(listener, return_exceptions=True)
+                return valuation
+
+        valuation = asyncio.run(run())
+        self.assertEqual(valuation["assets"][0]["amount"], 3.0)
+
+    def test_own_messages_are_ignored(self):
+        async def run():
+            hub = PortfolioValuationHub()
+            queue = await hub.subscribe("alice", db=None)
+            queue.get_nowait()
+            message = {"data": f'{{"origin": "{hub.instance_id}", "username": "alice"}}'}
+            await hub.handle_holdings_message(message, db=None)
+            return queue.empty()
+
+        self.assertTrue(asyncio.run(run()))
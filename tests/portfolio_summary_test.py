@@ -0,0 +1,73 @@
+import asyncio
+import unittest
+
+from tests.support import BACKEND_AVAILABLE, FakeDatabase, requires_backend
+
+if BACKEND_AVAILABLE:
+    from pymongo.errors import DuplicateKeyError
+    from app.services.portfolio_service import entry_delta
+    from app.services.portfolio_summary import apply_holdings_delta, holding_key, summary_holdings, _holdings_match
+
+@requires_backend
+class PortfolioSummaryTest(unittest.TestCase):
+    """Tests for the materialized portfolio summary"""
+
+    def test_entry_delta(self):
+        entries = [
+            {"symbol": "BTC", "amount": 1.0, "purchase_price": 100.0},
+            {"symbol": "BTC", "amount": 2.0, "purchase_price": 50.0},
+            {"symbol": "ETH", "amount": 3.0, "purchase_price": 10.0},
+        ]
+        delta = entry_delta(entries)
+        self.assertEqual(delta["BTC"], {"amount": 3.0, "invested": 200.0, "entries": 2})
+        self.assertEqual(delta["ETH"], {"amount": 3.0, "invested": 30.0, "entries": 1})
+
+        entry_delta(entries[:1], sign=-1, delta=delta)
+        self.assertEqual(delta["BTC"], {"amount": 2.0, "invested": 100.0, "entries": 1})
+
+    def test_holding_key_escapes_field_names(self):
+        self.assertEqual(holding_key("BTC"), "BTC")
+        self.assertNotIn(".", holding_key("BTC.X"))
+        self.assertFalse(holding_key("$BTC").startswith("$"))
+
+    def test_holdings_list_drops_closed_symbols(self):
+        summary = {"holdings": {
+            "ETH": {"symbol": "ETH", "amount": 1.0, "invested": 10.0, "entries": 1},
+            "BTC": {"symbol": "BTC", "amount": 0.0, "invested": 0.0, "entries": 0},
+            "ADA": {"symbol": "ADA", "amount": 5.0, "invested": 2.0, "entries": 2},
+        }}
+        self.assertEqual([holding["symbol"] for holding in summary_holdings(summary)], ["ADA", "ETH"])
+
+    def test_rounding_is_not_drift(self):
+        actual = [{"symbol": "BTC", "amount": 0.3, "invested": 30.0, "entries": 3}]
+        stored = [{"symbol": "BTC", "amount": 0.1 + 0.1 + 0.1, "invested": 30.0, "entries": 3}]
+        self.assertTrue(_holdings_match(stored, actual))
+
+        stored[0]["entries"] = 2
+        self.assertFalse(_holdings_match(stored, actual))
+
+    def concurrent_first_write(self, race):
+        """Apply a delta while another writer creates the summary right after our $inc missed"""
+        db = FakeDatabase()
+        summaries = db.portfolio_summaries
+        summaries.unique = [("username",)]
+        original_update = summaries.update_one
+        other = {"username": "alice", "version": 0, "holdings": {"ETH": {"symbol": "ETH", "amount": 1.0, "invested": 10.0, "entries": 1}}}
+
+        async def update_one(query, update, upsert=False):
+            summaries.update_one = original_update
+            await summaries.insert_one(dict(other))
+            if race == "duplicate":
+                raise DuplicateKeyError("E11000 duplicate key error")
+            return await original_update(query, update, upsert=upsert)
+
+        summaries.update_one = update_one
+        delta = entry_delta([{"symbol": "BTC", "amount": 2.0, "purchase_price": 5.0}])
+        asyncio.run(apply_holdings_delta(db, "alice", delta))
+        return summary_holdings(summaries.documents[0])
+
+    def test_delta_applies_when_summary_created_concurrently(self):
+        for race in ("matched", "duplicate"):
+            holdings = self.concurrent_first_write(race)
+            self.assertEqual([holding["symbol"] for holding in holdings], ["BTC", "ETH"], race)
+            self.assertEqual(holdings[0]["amount"], 2.0)
@@ -0,0 +1,98 @@
+import asyncio
+import unittest
+from unittest import mock
+
+from tests.support import BACKEND_AVAILABLE, FakeDatabase, requires_backend
+
+try:
+    import fakeredis
+except ImportError:
+    fakeredis = None
+
+if BACKEND_AVAILABLE:
+    from pymongo.errors import DuplicateKeyError
+    from app.services.preferences_service import get_preferences, update_preferences, preferences_cache_key
+    from app.utils import redis_cache
+
+@requires_backend
+@unittest.skipIf(fakeredis is None, "fakeredis is not installed")
+class PreferencesCacheTest(unittest.TestCase):
+    """Tests for the preferences read-through cache"""
+
+    def setUp(self):
+        self.db = FakeDatabase()
+        self.db.user_preferences.unique = [("username",)]
+        self.username = "prefs-cache-test"
+        patches = [
+            mock.patch.object(redis_cache, "async_redis_client", fakeredis.FakeAsyncRedis()),
+            mock.patch.object(redis_cache, "REDIS_AVAILABLE", True),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        # FakeAsyncRedis connections are bound to the loop that first used them
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+        redis_cache.local_cache.delete(preferences_cache_key(self.username))
+        redis_cache.fallback_cache.delete(preferences_cache_key(self.username))
+
+    def run_async(self, coroutine):
+        return self.loop.run_until_complete(coroutine)
+
+    def test_reads_are_served_from_cache(self):
+        first = self.run_async(get_preferences(self.db, self.username))
+        second = self.run_async(get_preferences(self.db, self.username))
+        self.assertEqual(first, second)
+        self.assertEqual(first["theme"], "dark")
+        self.assertEqual(len(self.db.user_preferences.documents), 1)
+        # One miss, plus the re-read after creating the defaults
+        self.assertEqual(self.db.user_preferences.calls["find_one"], 2)
+
+    def test_update_writes_through(self):
+        self.run_async(get_preferences(self.db, self.username))
+        self.run_async(update_preferences(self.db, self.username, {"username": self.username, "theme": "light"}))
+        prefs = self.run_async(get_preferences(self.db, self.username))
+        self.assertEqual(prefs["theme"], "light")
+        self.assertEqual(prefs["version"], 1)
+        # The updated document is served from the cache
+        self.assertEqual(self.db.user_preferences.calls["find_one"], 2)
+
+    def test_stale_read_does_not_overwrite_update(self):
+        self.run_async(update_preferences(self.db, self.username, {"username": self.username, "theme": "dark"}))
+        redis_cache.local_cache.delete(preferences_cache_key(self.username))
+        self.run_async(redis_cache.async_redis_client.delete(preferences_cache_key(self.username)))
+        original_find_one = self.db.user_preferences.find_one
+
+        async def find_one(query=None, projection=None, sort=None):
+            # The reader loads the old document, then a write lands before it caches it
+            self.db.user_preferences.find_one = original_find_one
+            stale = await original_find_one(query, projection, sort)
+            await update_preferences(self.db, self.username, {"username": self.username, "theme": "light"})
+            return stale
+
+        self.db.user_preferences.find_one = find_one
+        self.assertEqual(self.run_async(get_preferences(self.db, self.username))["theme"], "dark")
+        redis_cache.local_cache.delete(preferences_cache_key(self.username))
+        prefs = self.run_async(get_preferences(self.db, self.username))
+        self.assertEqual(prefs["theme"], "light")
+        self.assertEqual(prefs["version"], 2)
+
+    def test_concurrent_first_read_keeps_the_stored_document(self):
+        original_update = self.db.user_preferences.update_one
+
+        async def update_one(query, update, upsert=False):
+            # A concurrent write stores preferences between our miss and our upsert
+            self.db.user_preferences.update_one = original_update
+            await self.db.user_preferences.insert_one({"username": self.username, "theme": "light"})
+            raise DuplicateKeyError("E11000 duplicate key error")
+
+        self.db.user_preferences.update_one = update_one
+        prefs = self.run_async(get_preferences(self.db, self.username))
+        self.assertEqual(prefs["theme"], "light")
+
+    def test_fallback_mode_does_not_cache(self):
+        with mock.patch.object(redis_cache, "REDIS_AVAILABLE", False):
+            self.run_async(get_preferences(self.db, self.username))
+            self.run_async(get_preferences(self.db, self.username))
+        self.assertIsNone(redis_cache.fallback_cache.get(preferences_cache_key(self.username)))
+        self.assertEqual(self.db.user_preferences.calls["find_one"], 3)
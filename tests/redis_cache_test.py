@@ -0,0 +1,323 @@
+import asyncio
+import time
+import unittest
+from unittest import mock
+
+from tests.support import BACKEND_AVAILABLE, requires_backend
+
+try:
+    import fakeredis
+except ImportError:
+    fakeredis = None
+
+try:
+    # fakeredis runs the lock release script through lupa
+    import lupa
+except ImportError:
+    lupa = None
+
+if BACKEND_AVAILABLE:
+    from app.utils import redis_cache
+
+@requires_backend
+@unittest.skipIf(fakeredis is None, "fakeredis is not installed")
+class CacheDataLockTest(unittest.TestCase):
+    """Tests for the sync cache_data decorator against an in-memory Redis"""
+
+    def setUp(self):
+        self.redis = fakeredis.FakeRedis()
+        patches = [
+            mock.patch.object(redis_cache, "redis_client", self.redis),
+            mock.patch.object(redis_cache, "REDIS_AVAILABLE", True),
+            mock.patch.object(redis_cache, "CACHE_L1_ENABLED", False),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_cold_miss_computes_after_short_wait(self):
+        calls = []
+
+        @redis_cache.cache_data("lock-test", ttl_seconds=60)
+        def compute():
+            calls.append(1)
+            return {"value": 1}
+
+        # Another worker holds the recompute lock and never fills the key
+        cache_key = redis_cache.build_cache_key("lock-test", compute.__wrapped__, (), {})
+        self.redis.set(redis_cache._lock_key(cache_key), "other", px=10000)
+
+        start = time.monotonic()
+        self.assertEqual(compute(), {"value": 1})
+        elapsed = time.monotonic() - start
+        self.assertEqual(len(calls), 1)
+        self.assertLess(elapsed, 1.0)
+        # The foreign lock is left alone
+        self.assertEqual(self.redis.get(redis_cache._lock_key(cache_key)), b"other")
+
+    def store_entry(self, cache_key, value, expires_in, delta=0.1):
+        entry = redis_cache._make_entry(value, delta, 60)
+        entry["expires_at"] = time.time() + expires_in
+        self.redis.setex(cache_key, 120, redis_cache.encode(entry))
+
+    def test_fresh_entry_is_served(self):
+        @redis_cache.cache_data("xfetch-test", ttl_seconds=60)
+        def compute():
+            raise AssertionError("should not recompute")
+
+        cache_key = redis_cache.build_cache_key("xfetch-test", compute.__wrapped__, (), {})
+        self.store_entry(cache_key, "cached", expires_in=60)
+        self.assertEqual(compute(), "cached")
+
+    @unittest.skipIf(lupa is None, "lupa is not installed")
+    def test_entry_near_expiry_is_recomputed_early(self):
+        @redis_cache.cache_data("xfetch-test", ttl_seconds=60)
+        def compute():
+            return "recomputed"
+
+        cache_key = redis_cache.build_cache_key("xfetch-test", compute.__wrapped__, (), {})
+        # Still valid for 5s, but the last recompute took 10s
+        self.store_entry(cache_key, "cached", expires_in=5, delta=10)
+        with mock.patch.object(redis_cache.random, "random", return_value=0.5):
+            self.assertEqual(compute(), "recomputed")
+        self.assertEqual(redis_cache._read_entry(redis_cache._load_entry(cache_key), 1.0)[0], "recomputed")
+        # The recompute lock is released once the value is stored
+        self.assertIsNone(self.redis.get(redis_cache._lock_key(cache_key)))
+
+    def test_stale_value_is_served_while_locked(self):
+        calls = []
+
+        @redis_cache.cache_data("xfetch-test", ttl_seconds=60)
+        def compute():
+            calls.append(1)
+            return "recomputed"
+
+        cache_key = redis_cache.build_cache_key("xfetch-test", compute.__wrapped__, (), {})
+        self.store_entry(cache_key, "stale", expires_in=-1)
+        self.redis.set(redis_cache._lock_key(cache_key), "other", px=10000)
+        self.assertEqual(compute(), "stale")
+        self.assertEqual(calls, [])
+
+    @unittest.skipIf(lupa is None, "lupa is not installed")
+    def test_lock_is_released_when_compute_fails(self):
+        @redis_cache.cache_data("xfetch-test", ttl_seconds=60)
+        def compute():
+            raise ValueError("upstream failed")
+
+        cache_key = redis_cache.build_cache_key("xfetch-test", compute.__wrapped__, (), {})
+        with self.assertRaises(ValueError):
+            compute()
+        self.assertIsNone(self.redis.get(redis_cache._lock_key(cache_key)))
+
+    def test_uncached_results_are_not_stored(self):
+        calls = []
+
+        @redis_cache.cache_data("uncached-test", ttl_seconds=60)
+        def compute():
+            calls.append(1)
+            return redis_cache.Uncached({"mock": True})
+
+        self.assertEqual(compute(), {"mock": True})
+        self.assertEqual(compute(), {"mock": True})
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(self.redis.keys("uncached-test:*"), [])
+
+    def test_uncached_results_skip_fallback_cache(self):
+        calls = []
+
+        @redis_cache.cache_data("uncached-fallback-test", ttl_seconds=60)
+        def compute():
+            calls.append(1)
+            return redis_cache.Uncached([1])
+
+        with mock.patch.object(redis_cache, "REDIS_AVAILABLE", False):
+            self.assertEqual(compute(), [1])
+            self.assertEqual(compute(), [1])
+        self.assertEqual(len(calls), 2)
+
+@requires_backend
+@unittest.skipIf(fakeredis is None, "fakeredis is not installed")
+class L1InvalidationTest(unittest.TestCase):
+    """Writes on one worker drop the key from every other worker's L1 cache"""
+
+    def setUp(self):
+        self.redis = fakeredis.FakeRedis()
+        # Two workers, each with its own L1 cache and instance id
+        self.caches = {"a": redis_cache.TTLCache(max_items=10, default_ttl=60),
+                       "b": redis_cache.TTLCache(max_items=10, default_ttl=60)}
+        patches = [
+            mock.patch.object(redis_cache, "redis_client", self.redis),
+            mock.patch.object(redis_cache, "REDIS_AVAILABLE", True),
+            mock.patch.object(redis_cache, "CACHE_L1_ENABLED", True),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+        self.pubsub.subscribe(redis_cache.CACHE_INVALIDATION_CHANNEL)
+        self.addCleanup(self.pubsub.close)
+
+    def as_worker(self, name):
+        return mock.patch.multiple(redis_cache, local_cache=self.caches[name], INSTANCE_ID=name)
+
+    def next_message(self):
+        # The subscribe confirmation is read (and skipped) first
+        deadline = time.monotonic() + 1
+        while time.monotonic() < deadline:
+            message = self.pubsub.get_message(timeout=0.1)
+            if message is not None:
+                return message
+        self.fail("No invalidation message was published")
+
+    def test_set_drops_other_workers_entry(self):
+        self.caches["b"].set("market:btc", {"price": 1.0})
+        with self.as_worker("a"):
+            redis_cache.set_cached_data("market:btc", {"price": 2.0})
+        message = self.next_message()
+
+        with self.as_worker("b"):
+            redis_cache._handle_invalidation(message)
+            self.assertIsNone(self.caches["b"].get("market:btc"))
+            # The next read goes to Redis and sees the new value
+            self.assertEqual(redis_cache.get_cached_data("market:btc"), {"price": 2.0})
+
+    def test_own_message_is_ignored(self):
+        with self.as_worker("a"):
+            redis_cache.set_cached_data("market:btc", {"price": 2.0})
+            redis_cache._handle_invalidation(self.next_message())
+        self.assertEqual(self.caches["a"].get("market:btc"), {"price": 2.0})
+
+    def test_prefix_clear_drops_other_workers_entries(self):
+        self.caches["b"].set("chart:btc:1h", 1)
+        self.caches["b"].set("market:btc", 2)
+        with self.as_worker("a"):
+            redis_cache.clear_cache_by_prefix("chart:")
+        with self.as_worker("b"):
+            redis_cache._handle_invalidation(self.next_message())
+        self.assertIsNone(self.caches["b"].get("chart:btc:1h"))
+        self.assertEqual(self.caches["b"].get("market:btc"), 2)
+
+@requires_backend
+@unittest.skipIf(fakeredis is None, "fakeredis is not installed")
+class BatchOperationsTest(unittest.TestCase):
+    """Tests for MGET reads, pipelined writes and prefix clears"""
+
+    def setUp(self):
+        self.redis = fakeredis.FakeRedis()
+        patches = [
+            mock.patch.object(redis_cache, "redis_client", self.redis),
+            mock.patch.object(redis_cache, "REDIS_AVAILABLE", True),
+            mock.patch.object(redis_cache, "CACHE_L1_ENABLED", False),
+            mock.patch.object(redis_cache, "CACHE_BATCH_SIZE", 2),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_round_trip_with_partial_misses(self):
+        items = {f"market:{symbol}": {"symbol": symbol} for symbol in ("btc", "eth", "sol")}
+        self.assertTrue(redis_cache.set_many_cached_data(items, ttl_seconds=60))
+        found = redis_cache.get_many_cached_data(["market:btc", "market:xrp", "market:sol", "market:ada"])
+        self.assertEqual(found, {"market:btc": {"symbol": "btc"}, "market:sol": {"symbol": "sol"}})
+        self.assertGreater(self.redis.ttl("market:eth"), 0)
+
+    def test_prefix_clear_spans_scan_pages(self):
+        for i in range(7):
+            self.redis.set(f"chart:btc:{i}", b"x")
+        self.redis.set("market:btc", b"x")
+        self.assertTrue(redis_cache.clear_cache_by_prefix("chart:"))
+        self.assertEqual(self.redis.keys("chart:*"), [])
+        self.assertEqual(self.redis.keys("market:*"), [b"market:btc"])
+
+    def test_mget_connection_error_switches_to_fallback(self):
+        with mock.patch.object(self.redis, "mget", side_effect=redis_cache.redis.exceptions.ConnectionError("down")), \
+                mock.patch.object(redis_cache, "start_health_check") as start_health_check:
+            self.assertEqual(redis_cache.get_many_cached_data(["market:btc"]), {})
+            self.assertFalse(redis_cache.REDIS_AVAILABLE)
+            start_health_check.assert_called_once()
+
+@requires_backend
+@unittest.skipIf(fakeredis is None, "fakeredis is not installed")
+class FallbackCacheTest(unittest.TestCase):
+    """Tests for serving from the in-process cache while Redis is down"""
+
+    def setUp(self):
+        self.redis = fakeredis.FakeRedis()
+        patches = [
+            mock.patch.object(redis_cache, "redis_client", self.redis),
+            mock.patch.object(redis_cache, "REDIS_AVAILABLE", True),
+            mock.patch.object(redis_cache, "CACHE_L1_ENABLED", False),
+            mock.patch.object(redis_cache, "CACHE_HEALTH_CHECK_SECONDS", 0),
+            mock.patch.object(redis_cache, "start_health_check"),
+            mock.patch.object(redis_cache, "start_invalidation_listener", return_value=None),
+            mock.patch.object(redis_cache, "invalidation_listener", None),
+            mock.patch.object(redis_cache, "fallback_cache", redis_cache.TTLCache(max_items=10, default_ttl=60)),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_connection_error_switches_to_fallback(self):
+        with mock.patch.object(self.redis, "get", side_effect=redis_cache.redis.exceptions.ConnectionError("down")):
+            self.assertIsNone(redis_cache.get_cached_data("market:btc"))
+        self.assertFalse(redis_cache.REDIS_AVAILABLE)
+        redis_cache.start_health_check.assert_called_once()
+
+        # Writes and reads now stay in process
+        self.assertTrue(redis_cache.set_cached_data("market:btc", {"price": 1.0}))
+        self.assertEqual(redis_cache.get_cached_data("market:btc"), {"price": 1.0})
+        self.assertIsNone(self.redis.get("market:btc"))
+
+    def test_recovery_clears_fallback(self):
+        redis_cache.REDIS_AVAILABLE = False
+        redis_cache.set_cached_data("market:btc", {"price": 1.0})
+        self.redis.set("market:btc", redis_cache.encode({"price": 2.0}))
+
+        redis_cache._health_check_loop()
+        self.assertTrue(redis_cache.REDIS_AVAILABLE)
+        self.assertIsNone(redis_cache.fallback_cache.get("market:btc"))
+        self.assertEqual(redis_cache.get_cached_data("market:btc"), {"price": 2.0})
+
+@requires_backend
+@unittest.skipIf(fakeredis is None, "fakeredis is not installed")
+class AsyncCacheTest(unittest.TestCase):
+    """Tests for the pooled asyncio client behind the L1 cache"""
+
+    def setUp(self):
+        self.redis = fakeredis.FakeAsyncRedis()
+        self.l1 = redis_cache.TTLCache(max_items=2, default_ttl=60)
+        patches = [
+            mock.patch.object(redis_cache, "async_redis_client", self.redis),
+            mock.patch.object(redis_cache, "REDIS_AVAILABLE", True),
+            mock.patch.object(redis_cache, "CACHE_L1_ENABLED", True),
+            mock.patch.object(redis_cache, "local_cache", self.l1),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        # FakeAsyncRedis connections are bound to the loop that first used them
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+
+    def run_async(self, coroutine):
+        return self.loop.run_until_complete(coroutine)
+
+    def test_round_trip(self):
+        self.assertTrue(self.run_async(redis_cache.async_set_cached_data("prefs:alice", {"theme": "dark"}, 60)))
+        self.assertIn(self.run_async(self.redis.ttl("prefs:alice")), (59, 60))
+        self.l1.clear()
+        self.assertEqual(self.run_async(redis_cache.async_get_cached_data("prefs:alice")), {"theme": "dark"})
+
+    def test_redis_hit_is_served_from_l1_until_its_ttl(self):
+        self.run_async(self.redis.set("prefs:alice", redis_cache.encode({"theme": "dark"})))
+        self.run_async(redis_cache.async_get_cached_data("prefs:alice", l1_ttl_seconds=0.05))
+        self.run_async(self.redis.delete("prefs:alice"))
+        self.assertEqual(self.run_async(redis_cache.async_get_cached_data("prefs:alice")), {"theme": "dark"})
+        time.sleep(0.06)
+        self.assertIsNone(self.run_async(redis_cache.async_get_cached_data("prefs:alice")))
+
+    def test_l1_is_bounded(self):
+        for name in ("alice", "bob", "carol"):
+            self.run_async(redis_cache.async_set_cached_data(f"prefs:{name}", {"name": name}, 60))
+        self.assertEqual(len(self.l1), 2)
+        self.assertIsNone(self.l1.get("prefs:alice"))
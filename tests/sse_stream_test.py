@@ -0,0 +1,86 @@
+import asyncio
+import unittest
+from unittest import mock
+
+from tests.support import BACKEND_AVAILABLE, requires_backend
+
+if BACKEND_AVAILABLE:
+    from fastapi.testclient import TestClient
+    from starlette.requests import Request
+    import server
+
+async def idle_producer():
+    # Events are published by the tests, never by the polling task
+    await asyncio.Event().wait()
+
+def parse_events(body):
+    """(id, data) of every event in a text/event-stream body"""
+    events = []
+    for block in body.split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines() if ": " in line and not line.startswith(":"))
+        if "id" in fields:
+            events.append((int(fields["id"]), fields["data"]))
+    return events
+
+@requires_backend
+class SseStreamTest(unittest.TestCase):
+    """Server-Sent Events endpoints backed by a broadcast channel"""
+
+    def setUp(self):
+        self.channel = server.BroadcastChannel("crypto_prices", idle_producer, interval_seconds=5)
+        checks = iter([False] * 4)
+
+        async def is_disconnected(request):
+            # The client stays connected for a few events, then leaves
+            return next(checks, True)
+
+        patches = [
+            mock.patch.object(server, "prices_channel", self.channel),
+            mock.patch.object(server, "SSE_KEEPALIVE_SECONDS", 0.01),
+            mock.patch.object(Request, "is_disconnected", is_disconnected),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.client = TestClient(server.app)
+
+    def stream(self, headers=None):
+        response = self.client.get("/api/stream/prices", headers=headers or {})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.headers["content-type"].startswith("text/event-stream"))
+        return response.text
+
+    def test_retry_line_comes_first(self):
+        self.assertTrue(self.stream().startswith("retry: 5000\n\n"))
+
+    def test_new_client_gets_latest_snapshot(self):
+        for price in (1, 2, 3):
+            self.channel.publish({"price": price})
+        self.assertEqual(parse_events(self.stream()), [(3, '{"price": 3}')])
+
+    def test_last_event_id_resumes(self):
+        for price in (1, 2, 3):
+            self.channel.publish({"price": price})
+        events = parse_events(self.stream({"Last-Event-ID": "1"}))
+        self.assertEqual([event_id for event_id, _ in events], [2, 3])
+
+    def test_up_to_date_client_gets_nothing_buffered(self):
+        self.channel.publish({"price": 1})
+        self.assertEqual(parse_events(self.stream({"Last-Event-ID": "1"})), [])
+
+@requires_backend
+class BroadcastChannelTest(unittest.TestCase):
+    """Fan-out to subscriber queues"""
+
+    def test_slow_consumer_keeps_latest_events(self):
+        async def run():
+            channel = server.BroadcastChannel("crypto_prices", idle_producer, interval_seconds=5, queue_size=2)
+            queue = channel.subscribe()
+            for price in (1, 2, 3):
+                channel.publish({"price": price})
+            events = [queue.get_nowait() for _ in range(queue.qsize())]
+            channel.unsubscribe(queue)
+            return events
+
+        events = asyncio.run(run())
+        self.assertEqual([event_id for event_id, _ in events], [2, 3])
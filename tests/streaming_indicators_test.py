@@ -0,0 +1,182 @@
+import asyncio
+import json
+import unittest
+from unittest import mock
+from datetime import datetime, timedelta, timezone
+import numpy as np
+
+from app.services.indicators import compute_indicators
+from app.services.streaming_indicators import IndicatorSet, RollingStd
+
+from tests.support import BACKEND_AVAILABLE, requires_backend
+
+if BACKEND_AVAILABLE:
+    from app.services import indicator_stream
+    from app.services.indicator_stream import IndicatorStream, LiveIndicatorHub
+    from app.utils.cache_keys import floor_to_interval
+
+SPEC = "sma:20,ema:20,rsi:14,macd:12:26:9,bollinger:20:2"
+
+def flatten(values):
+    """Scalar and multi-line indicator values as one list, None for warm-up"""
+    if isinstance(values, dict):
+        return [value for line in sorted(values) for value in flatten(values[line])]
+    return values if isinstance(values, list) else [values]
+
+class StreamingIndicatorsTest(unittest.TestCase):
+    """Tests for the O(1) streaming indicators against the vectorized engine"""
+
+    def setUp(self):
+        rng = np.random.default_rng(11)
+        self.closes = (60000 + np.cumsum(rng.normal(0, 120, 1500))).tolist()
+        candles = [{"high": c, "low": c, "close": c, "volume": 1.0} for c in self.closes]
+        self.expected = compute_indicators(candles, SPEC)
+
+    def assertMatches(self, streamed, index):
+        for key, series in self.expected.items():
+            if isinstance(series, dict):
+                expected = flatten({line: values[index] for line, values in series.items()})
+                actual = flatten(streamed[key]) if streamed[key] is not None else [None] * len(expected)
+            else:
+                expected, actual = [series[index]], [streamed[key]]
+            for left, right in zip(actual, expected):
+                if right is None:
+                    self.assertIsNone(left, key)
+                else:
+                    self.assertAlmostEqual(left, right, delta=abs(right) * 1e-9 + 1e-9, msg=key)
+
+    def test_updates_match_vectorized_series(self):
+        indicators = IndicatorSet(SPEC)
+        for index, close in enumerate(self.closes):
+            self.assertMatches(indicators.update(close), index)
+
+    def test_peek_previews_without_changing_state(self):
+        indicators = IndicatorSet(SPEC)
+        indicators.extend(self.closes[:-1])
+        before = json.dumps(indicators.to_dict())
+        preview = indicators.peek(self.closes[-1])
+        self.assertEqual(json.dumps(indicators.to_dict()), before)
+        committed = indicators.update(self.closes[-1])
+        # Equal up to the rounding of the periodic window resync
+        for key in preview:
+            for left, right in zip(flatten(preview[key]), flatten(committed[key])):
+                self.assertAlmostEqual(left, right, delta=abs(right) * 1e-9, msg=key)
+
+    def test_snapshot_round_trip(self):
+        indicators = IndicatorSet(SPEC)
+        indicators.extend(self.closes[:700])
+        restored = IndicatorSet.from_dict(json.loads(json.dumps(indicators.to_dict())))
+        for index in range(700, len(self.closes)):
+            self.assertMatches(restored.update(self.closes[index]), index)
+
+    def test_rolling_std_survives_high_price_levels(self):
+        deviation = RollingStd(3)
+        for value in (1e9 + 1, 1e9 + 2, 1e9 + 3) * 50:
+            result = deviation.update(value)
+        self.assertAlmostEqual(result, np.std([1, 2, 3]), places=6)
+
+    def test_unsupported_indicators_are_rejected(self):
+        for spec in ("vwap", "atr:14", "sma:0"):
+            with self.assertRaises(ValueError):
+                IndicatorSet(spec)
+
+@requires_backend
+class IndicatorStreamTest(unittest.TestCase):
+    """Tests for candle rollover in the live indicator stream"""
+
+    def setUp(self):
+        self.start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        self.stream = IndicatorStream("BTC", "1h", "sma:2")
+        candles = [{"timestamp": (self.start + timedelta(hours=i)).isoformat(), "close": close} for i, close in enumerate((10.0, 20.0, 30.0))]
+        # The third candle is still open
+        self.stream.seed(candles, self.start + timedelta(hours=2, minutes=5))
+
+    def test_seed_previews_open_candle(self):
+        self.assertEqual(self.stream.latest["indicators"], {"sma_2": 25.0})
+
+    def test_ticks_preview_then_commit_on_rollover(self):
+        now = self.start + timedelta(hours=2, minutes=30)
+        self.assertEqual(self.stream.tick(40.0, now)["indicators"], {"sma_2": 30.0})
+        # The open candle closes at 40; the next one opens at 50
+        now = self.start + timedelta(hours=3, minutes=1)
+        self.assertFalse(self.stream.needs_seed(now))
+        self.assertEqual(self.stream.tick(50.0, now)["indicators"], {"sma_2": 45.0})
+
+    def test_gap_needs_seed(self):
+        self.assertTrue(self.stream.needs_seed(self.start + timedelta(hours=4, minutes=1)))
+
+@requires_backend
+class LiveIndicatorHubTest(unittest.TestCase):
+    """Tests for reseeding streams off the price listener path"""
+
+    def setUp(self):
+        self.hub = LiveIndicatorHub()
+        self.key = ("BTC", "1h", "sma:2")
+        patch = mock.patch.object(indicator_stream.price_book, "get", return_value=10.0)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def candles(self, hours):
+        # The last one is the open candle
+        start = floor_to_interval(datetime.now(timezone.utc), "1h") - timedelta(hours=hours - 1)
+        return {"candles": [{"timestamp": (start + timedelta(hours=i)).isoformat(), "close": 10.0} for i in range(hours)]}
+
+    def test_reseed_does_not_block_the_listener(self):
+        async def run():
+            release = asyncio.Event()
+
+            async def slow_seed(stream):
+                await release.wait()
+                stream.seed(self.candles(2)["candles"])
+                return True
+
+            with mock.patch.object(indicator_stream, "get_chart_data", lambda *args: self.candles(2)):
+                _, queue = await self.hub.subscribe("BTC", "1h", "sma:2")
+            queue.get_nowait()
+            # The stream missed a candle, so the next tick asks for a reseed
+            self.hub.streams[self.key].open_time -= timedelta(hours=2)
+
+            with mock.patch.object(self.hub, "_seed", slow_seed):
+                await asyncio.wait_for(self.hub.on_prices_changed({"BTC"}), timeout=1)
+                self.assertIn(self.key, self.hub.reseeding)
+                # Ticks are skipped until the reseed lands
+                await self.hub.on_prices_changed({"BTC"})
+                self.assertTrue(queue.empty())
+                release.set()
+                await self.hub.reseeding[self.key]
+            self.assertEqual(self.hub.reseeding, {})
+            return queue.get_nowait()
+
+        self.assertEqual(asyncio.run(run())["symbol"], "BTC")
+
+    def test_unsubscribe_during_reseed(self):
+        async def seed(stream):
+            if stream.open_time is None:
+                stream.seed([], datetime.now(timezone.utc) - timedelta(hours=3))
+            else:
+                # The last subscriber leaves while the candles are being fetched
+                self.hub.unsubscribe(self.key, queue)
+            return True
+
+        async def run():
+            nonlocal queue
+            with mock.patch.object(self.hub, "_seed", seed):
+                _, queue = await self.hub.subscribe("BTC", "1h", "sma:2")
+                await self.hub.on_prices_changed({"BTC"})
+                await self.hub.reseeding[self.key]
+
+        queue = None
+        asyncio.run(run())
+        self.assertEqual(self.hub.streams, {})
+        self.assertTrue(queue.empty())
+
+    def test_mock_candles_are_not_streamed(self):
+        async def run():
+            chart = dict(self.candles(3), mock=True)
+            with mock.patch.object(indicator_stream, "get_chart_data", lambda *args: chart):
+                _, queue = await self.hub.subscribe("BTC", "1h", "sma:2")
+            return queue
+
+        queue = asyncio.run(run())
+        self.assertTrue(queue.empty())
+        self.assertIsNone(self.hub.streams[self.key].open_time)
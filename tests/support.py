@@ -0,0 +1,418 @@
+"""
+Shared test helpers: backend import path, the backend skip guard, an
+in-memory stand-in for the Motor database and a TestClient factory
+"""
+import os
+import sys
+import copy
+import importlib
+import unittest
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend")
+
+# Make the backend "app" package and main module importable
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+def _importable(module: str) -> bool:
+    try:
+        importlib.import_module(module)
+    except ImportError:
+        return False
+    return True
+
+# main imports every router and service, so this covers all backend dependencies
+BACKEND_AVAILABLE = _importable("main")
+requires_backend = unittest.skipUnless(BACKEND_AVAILABLE, "backend dependencies are not installed")
+
+def get_path(document: Dict[str, Any], path: str) -> Any:
+    value: Any = document
+    for part in path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return None
+        value = value[part]
+    return value
+
+def _has_path(document: Dict[str, Any], path: str) -> bool:
+    value: Any = document
+    for part in path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return False
+        value = value[part]
+    return True
+
+def _set_path(document: Dict[str, Any], path: str, value: Any):
+    *parents, last = path.split(".")
+    for part in parents:
+        document = document.setdefault(part, {})
+    document[last] = value
+
+def _unset_path(document: Dict[str, Any], path: str):
+    *parents, last = path.split(".")
+    for part in parents:
+        document = document.get(part)
+        if not isinstance(document, dict):
+            return
+    document.pop(last, None)
+
+def _compare(value: Any, operator: str, operand: Any) -> bool:
+    if operator == "$in":
+        return value in operand
+    if operator == "$nin":
+        return value not in operand
+    if operator == "$ne":
+        return value != operand
+    if operator == "$eq":
+        return value == operand
+    if value is None:
+        return False
+    if operator == "$gt":
+        return value > operand
+    if operator == "$gte":
+        return value >= operand
+    if operator == "$lt":
+        return value < operand
+    if operator == "$lte":
+        return value <= operand
+    raise NotImplementedError(f"Query operator {operator} is not supported by the fake")
+
+def matches(document: Dict[str, Any], query: Optional[Dict[str, Any]]) -> bool:
+    """Whether a document satisfies a MongoDB filter (equality and comparison operators)"""
+    for key, condition in (query or {}).items():
+        if key == "$or":
+            if not any(matches(document, clause) for clause in condition):
+                return False
+            continue
+        if key == "$and":
+            if not all(matches(document, clause) for clause in condition):
+                return False
+            continue
+        value = get_path(document, key)
+        if isinstance(condition, dict) and condition and all(name.startswith("$") for name in condition):
+            for operator, operand in condition.items():
+                if operator == "$exists":
+                    if _has_path(document, key) != bool(operand):
+                        return False
+                elif not _compare(value, operator, operand):
+                    return False
+        elif value != condition and not (isinstance(value, list) and condition in value):
+            return False
+    return True
+
+def project(document: Dict[str, Any], projection: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    document = copy.deepcopy(document)
+    if not projection:
+        return document
+    included = [key for key, flag in projection.items() if flag and key != "_id"]
+    if included:
+        result: Dict[str, Any] = {}
+        for key in included:
+            if _has_path(document, key):
+                _set_path(result, key, get_path(document, key))
+        if projection.get("_id", 1) and "_id" in document:
+            result["_id"] = document["_id"]
+        return result
+    for key, flag in projection.items():
+        if not flag:
+            _unset_path(document, key)
+    return document
+
+def apply_update(document: Dict[str, Any], update: Dict[str, Any], inserting: bool = False):
+    """Apply update operators to a document in place"""
+    for operator, fields in update.items():
+        for path, value in fields.items():
+            if operator == "$set":
+                _set_path(document, path, copy.deepcopy(value))
+            elif operator == "$setOnInsert":
+                if inserting:
+                    _set_path(document, path, copy.deepcopy(value))
+            elif operator == "$inc":
+                _set_path(document, path, (get_path(document, path) or 0) + value)
+            elif operator == "$unset":
+                _unset_path(document, path)
+            elif operator == "$max":
+                current = get_path(document, path)
+                if current is None or value > current:
+                    _set_path(document, path, value)
+            else:
+                raise NotImplementedError(f"Update operator {operator} is not supported by the fake")
+
+def _sort_key(value: Any):
+    # None sorts first, as in MongoDB
+    return (value is not None, value)
+
+class FakeCursor:
+    def __init__(self, documents: List[Dict[str, Any]]):
+        self.documents = documents
+
+    def sort(self, key, direction: int = 1):
+        keys = key if isinstance(key, list) else [(key, direction)]
+        for field, order in reversed(keys):
+            self.documents.sort(key=lambda document: _sort_key(get_path(document, field)), reverse=order < 0)
+        return self
+
+    def skip(self, count: int):
+        self.documents = self.documents[count:]
+        return self
+
+    def limit(self, count: int):
+        if count:
+            self.documents = self.documents[:count]
+        return self
+
+    async def to_list(self, length: Optional[int] = None):
+        return self.documents if length is None else self.documents[:length]
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for document in self.documents:
+            yield document
+
+def _group_value(document: Dict[str, Any], expression: Any) -> Any:
+    if isinstance(expression, str) and expression.startswith("$"):
+        return get_path(document, expression[1:])
+    if isinstance(expression, dict) and "$multiply" in expression:
+        result = 1
+        for operand in expression["$multiply"]:
+            result *= _group_value(document, operand) or 0
+        return result
+    return expression
+
+def aggregate(documents: List[Dict[str, Any]], pipeline: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Evaluate the $match/$group/$project/$sort/$limit stages the services use"""
+    documents = [copy.deepcopy(document) for document in documents]
+    for stage in pipeline:
+        (name, spec), = stage.items()
+        if name == "$match":
+            documents = [document for document in documents if matches(document, spec)]
+        elif name == "$group":
+            groups: Dict[Any, Dict[str, Any]] = {}
+            for document in documents:
+                group_id = _group_value(document, spec["_id"])
+                key = repr(group_id)
+                group = groups.setdefault(key, {"_id": group_id})
+                for field, accumulator in spec.items():
+                    if field == "_id":
+                        continue
+                    (operator, expression), = accumulator.items()
+                    value = _group_value(document, expression)
+                    if operator == "$sum":
+                        group[field] = group.get(field, 0) + (value or 0)
+                    elif operator == "$max":
+                        group[field] = value if field not in group else max(group[field], value)
+                    elif operator == "$min":
+                        group[field] = value if field not in group else min(group[field], value)
+                    else:
+                        raise NotImplementedError(f"Accumulator {operator} is not supported by the fake")
+            documents = list(groups.values())
+        elif name == "$project":
+            projected = []
+            for document in documents:
+                result = {} if spec.get("_id", 1) == 0 else {"_id": document.get("_id")}
+                for field, value in spec.items():
+                    if field == "_id":
+                        continue
+                    result[field] = _group_value(document, value) if isinstance(value, str) else document.get(field)
+                projected.append(result)
+            documents = projected
+        elif name == "$sort":
+            documents = FakeCursor(documents).sort(list(spec.items())).documents
+        elif name == "$limit":
+            documents = documents[:spec]
+        else:
+            raise NotImplementedError(f"Stage {name} is not supported by the fake")
+    return documents
+
+class FakeCollection:
+    """
+    In-memory collection implementing the Motor calls used by the services
+
+    unique lists field tuples enforced like unique indexes; while failure
+    is set, every call raises it. calls counts the calls per method.
+    """
+
+    def __init__(self, name: str = "collection"):
+        self.name = name
+        self.documents: List[Dict[str, Any]] = []
+        self.unique: List[tuple] = []
+        self.failure: Optional[Exception] = None
+        self.calls: Dict[str, int] = {}
+
+    def _called(self, method: str):
+        self.calls[method] = self.calls.get(method, 0) + 1
+        if self.failure is not None:
+            raise self.failure
+
+    def _check_unique(self, document: Dict[str, Any], ignore: Optional[Dict[str, Any]] = None):
+        from pymongo.errors import DuplicateKeyError
+        for fields in self.unique:
+            key = tuple(get_path(document, field) for field in fields)
+            for other in self.documents:
+                if other is not ignore and tuple(get_path(other, field) for field in fields) == key:
+                    raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.name} index: {fields}")
+
+    def _insert(self, document: Dict[str, Any]) -> Any:
+        from bson import ObjectId
+        document.setdefault("_id", ObjectId())
+        stored = copy.deepcopy(document)
+        self._check_unique(stored)
+        self.documents.append(stored)
+        return document["_id"]
+
+    def _find(self, query: Optional[Dict[str, Any]], sort=None) -> List[Dict[str, Any]]:
+        found = [document for document in self.documents if matches(document, query)]
+        if sort:
+            found = FakeCursor(found).sort(sort).documents
+        return found
+
+    def _upsert_document(self, query: Dict[str, Any], update: Dict[str, Any]) -> Dict[str, Any]:
+        document: Dict[str, Any] = {}
+        for key, value in query.items():
+            if not key.startswith("$") and not (isinstance(value, dict) and any(name.startswith("$") for name in value)):
+                _set_path(document, key, copy.deepcopy(value))
+        apply_update(document, update, inserting=True)
+        return document
+
+    def _update(self, document: Dict[str, Any], update: Dict[str, Any]):
+        updated = copy.deepcopy(document)
+        apply_update(updated, update)
+        self._check_unique(updated, ignore=document)
+        document.clear()
+        document.update(updated)
+
+    async def insert_one(self, document: Dict[str, Any]):
+        self._called("insert_one")
+        return SimpleNamespace(inserted_id=self._insert(document))
+
+    async def insert_many(self, documents: List[Dict[str, Any]], ordered: bool = True):
+        self._called("insert_many")
+        return SimpleNamespace(inserted_ids=[self._insert(document) for document in documents])
+
+    async def find_one(self, query: Optional[Dict[str, Any]] = None, projection: Optional[Dict[str, Any]] = None, sort=None):
+        self._called("find_one")
+        found = self._find(query, sort)
+        return project(found[0], projection) if found else None
+
+    def find(self, query: Optional[Dict[str, Any]] = None, projection: Optional[Dict[str, Any]] = None):
+        self._called("find")
+        return FakeCursor([project(document, projection) for document in self._find(query)])
+
+    async def count_documents(self, query: Dict[str, Any]) -> int:
+        return len(self._find(query))
+
+    async def update_one(self, query: Dict[str, Any], update: Dict[str, Any], upsert: bool = False):
+        self._called("update_one")
+        found = self._find(query)
+        if found:
+            self._update(found[0], update)
+            return SimpleNamespace(matched_count=1, modified_count=1, upserted_id=None)
+        if upsert:
+            return SimpleNamespace(matched_count=0, modified_count=0, upserted_id=self._insert(self._upsert_document(query, update)))
+        return SimpleNamespace(matched_count=0, modified_count=0, upserted_id=None)
+
+    async def update_many(self, query: Dict[str, Any], update: Dict[str, Any], upsert: bool = False):
+        self._called("update_many")
+        found = self._find(query)
+        for document in found:
+            self._update(document, update)
+        return SimpleNamespace(matched_count=len(found), modified_count=len(found), upserted_id=None)
+
+    async def find_one_and_update(self, query, update, projection=None, sort=None, upsert=False, return_document=False):
+        self._called("find_one_and_update")
+        found = self._find(query, sort)
+        if not found:
+            if not upsert:
+                return None
+            document = self._upsert_document(query, update)
+            self._insert(document)
+            return project(document, projection) if return_document else None
+        before = copy.deepcopy(found[0])
+        self._update(found[0], update)
+        return project(found[0] if return_document else before, projection)
+
+    async def find_one_and_delete(self, query, projection=None, sort=None):
+        self._called("find_one_and_delete")
+        found = self._find(query, sort)
+        if not found:
+            return None
+        self.documents.remove(found[0])
+        return project(found[0], projection)
+
+    async def delete_one(self, query: Dict[str, Any]):
+        self._called("delete_one")
+        found = self._find(query)
+        if found:
+            self.documents.remove(found[0])
+        return SimpleNamespace(deleted_count=len(found[:1]))
+
+    async def delete_many(self, query: Dict[str, Any]):
+        self._called("delete_many")
+        found = self._find(query)
+        for document in found:
+            self.documents.remove(document)
+        return SimpleNamespace(deleted_count=len(found))
+
+    async def bulk_write(self, requests, ordered: bool = True):
+        self._called("bulk_write")
+        for request in requests:
+            kind = type(request).__name__
+            if kind == "InsertOne":
+                await self.insert_one(request._doc)
+            elif kind == "UpdateOne":
+                await self.update_one(request._filter, request._doc, upsert=request._upsert)
+            elif kind == "DeleteOne":
+                await self.delete_one(request._filter)
+            elif kind == "DeleteMany":
+                await self.delete_many(request._filter)
+            else:
+                raise NotImplementedError(f"Bulk request {kind} is not supported by the fake")
+
+    def aggregate(self, pipeline: List[Dict[str, Any]]):
+        self._called("aggregate")
+        return FakeCursor(aggregate(self.documents, pipeline))
+
+class FakeDatabase:
+    """Motor-style database: collections by attribute or item, created on first use"""
+
+    def __init__(self):
+        self.collections: Dict[str, FakeCollection] = {}
+
+    def __getitem__(self, name: str) -> FakeCollection:
+        if name not in self.collections:
+            self.collections[name] = FakeCollection(name)
+        return self.collections[name]
+
+    def __getattr__(self, name: str) -> FakeCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+def api_client(db: FakeDatabase, username: str = "testuser"):
+    """
+    TestClient for the FastAPI app with MongoDB replaced by db and every
+    request authenticated as username
+
+    The lifespan is not run, so no background tasks or real connections start.
+    """
+    from fastapi.testclient import TestClient
+    from main import app
+    from app.core.auth import get_current_user
+    from app.db.database import get_db
+
+    async def fake_db():
+        return db
+
+    async def fake_user():
+        return {"id": f"{username}-id", "email": f"{username}@example.com", "username": username}
+
+    app.dependency_overrides[get_db] = fake_db
+    app.dependency_overrides[get_current_user] = fake_user
+    return TestClient(app, raise_server_exceptions=False)
+
+def reset_api_overrides():
+    from main import app
+    app.dependency_overrides.clear()
@@ -0,0 +1,169 @@
+import asyncio
+import unittest
+from unittest import mock
+
+from tests.support import BACKEND_AVAILABLE, FakeDatabase, api_client, requires_backend, reset_api_overrides
+
+if BACKEND_AVAILABLE:
+    from pymongo.errors import DuplicateKeyError
+    from app.services import portfolio_history
+    from app.services.price_book import PriceBook, price_book
+
+CSV_ENTRIES = "symbol,amount,purchase_price,purchase_date\n" \
+              "BTC,0.5,40000,2024-01-01T00:00:00\n" \
+              "ETH,2,2000,2024-02-01T00:00:00\n"
+
+@requires_backend
+class UserApiTest(unittest.TestCase):
+    """One request per user endpoint against an in-memory database"""
+
+    def setUp(self):
+        self.db = FakeDatabase()
+        self.db.portfolio_summaries.unique = [("username",)]
+        self.db.user_preferences.unique = [("username",)]
+        self.client = api_client(self.db)
+        price_book.update([{"symbol": "BTC", "price": 50000.0}, {"symbol": "ETH", "price": 2500.0}])
+
+    def tearDown(self):
+        reset_api_overrides()
+
+    def add_entry(self, symbol, amount, purchase_price):
+        response = self.client.post("/api/user/portfolio", json={
+            "symbol": symbol, "amount": amount, "purchase_price": purchase_price
+        })
+        self.assertEqual(response.status_code, 201, response.text)
+        return response.json()
+
+    def import_csv(self, body):
+        response = self.client.post("/api/user/portfolio/import", content=body, headers={"Content-Type": "text/csv"})
+        self.assertEqual(response.status_code, 200, response.text)
+        return response.json()
+
+    def test_add_entry(self):
+        entry = self.add_entry("BTC", 0.5, 40000)
+        self.assertEqual(entry["symbol"], "BTC")
+        self.assertEqual(self.client.get("/api/user/portfolio").json()[0]["id"], entry["id"])
+        self.assertEqual(self.client.get("/api/user/portfolio/valuation").json()["total_value"], 25000.0)
+        self.assertEqual(self.client.post("/api/user/portfolio", json={"symbol": "BTC", "amount": -1, "purchase_price": 1}).status_code, 422)
+
+    def test_add_entry_when_summary_is_created_concurrently(self):
+        self.add_entry("BTC", 1, 100)
+        summaries = self.db.portfolio_summaries
+        other_writer = summaries.documents.pop()
+        original_update = summaries.update_one
+
+        async def update_one(query, update, upsert=False):
+            # Another request creates the summary between our missed $inc and our upsert
+            summaries.update_one = original_update
+            await summaries.insert_one(other_writer)
+            raise DuplicateKeyError("E11000 duplicate key error")
+
+        summaries.update_one = update_one
+        self.add_entry("ETH", 2, 2000)
+        assets = self.client.get("/api/user/portfolio/valuation").json()["assets"]
+        self.assertEqual({asset["symbol"]: asset["amount"] for asset in assets}, {"BTC": 1.0, "ETH": 2.0})
+
+    def test_import(self):
+        report = self.import_csv(CSV_ENTRIES + "SOL,oops,1,\n")
+        self.assertEqual((report["inserted"], report["failed"]), (2, 1))
+
+    def test_import_reports_undecodable_rows(self):
+        report = self.import_csv(CSV_ENTRIES.encode() + b"\xff\xfe,1,1,\n")
+        self.assertEqual((report["inserted"], report["failed"]), (2, 1))
+        self.assertEqual(report["errors"][0]["row"], 3)
+
+    def test_portfolio_listing_pages(self):
+        self.import_csv(CSV_ENTRIES)
+        response = self.client.get("/api/user/portfolio", params={"limit": 1})
+        self.assertEqual(response.status_code, 200, response.text)
+        self.assertEqual([entry["symbol"] for entry in response.json()], ["ETH"])
+
+        response = self.client.get("/api/user/portfolio", params={"cursor": response.headers["X-Next-Cursor"]})
+        self.assertEqual([entry["symbol"] for entry in response.json()], ["BTC"])
+        self.assertNotIn("X-Next-Cursor", response.headers)
+
+    def test_delete(self):
+        self.import_csv(CSV_ENTRIES)
+        entry_id = self.client.get("/api/user/portfolio").json()[0]["id"]
+        self.assertEqual(self.client.delete(f"/api/user/portfolio/{entry_id}").status_code, 204)
+        self.assertEqual(self.client.delete(f"/api/user/portfolio/{entry_id}").status_code, 404)
+        self.assertEqual([entry["symbol"] for entry in self.client.get("/api/user/portfolio").json()], ["BTC"])
+
+    def test_valuation(self):
+        self.import_csv(CSV_ENTRIES)
+        response = self.client.get("/api/user/portfolio/valuation")
+        self.assertEqual(response.status_code, 200, response.text)
+        self.assertEqual(response.json()["total_value"], 30000.0)
+
+    def test_summary(self):
+        self.import_csv(CSV_ENTRIES)
+        response = self.client.get("/api/user/portfolio/summary")
+        self.assertEqual(response.status_code, 200, response.text)
+        summary = response.json()
+        self.assertEqual(summary["total_value"], 30000.0)
+        self.assertEqual(summary["profit_loss"], 6000.0)
+        self.assertEqual(summary["assets_count"], 2)
+
+    def test_preferences(self):
+        response = self.client.get("/api/user/preferences")
+        self.assertEqual(response.status_code, 200, response.text)
+        self.assertEqual(response.json()["username"], "testuser")
+
+        preferences = dict(response.json(), theme="light", favorite_coins=["BTC"])
+        response = self.client.put("/api/user/preferences", json=preferences)
+        self.assertEqual(response.status_code, 200, response.text)
+        self.assertEqual(self.client.get("/api/user/preferences").json()["theme"], "light")
+
+        other_user = dict(preferences, username="mallory")
+        self.assertEqual(self.client.put("/api/user/preferences", json=other_user).status_code, 403)
+
+    def test_history(self):
+        self.add_entry("BTC", 0.5, 40000)
+
+        async def two_workers():
+            # Every worker runs the snapshot loop; only one point may be written
+            return await asyncio.gather(portfolio_history.snapshot_portfolios(self.db), portfolio_history.snapshot_portfolios(self.db))
+
+        with mock.patch.object(portfolio_history, "_last_snapshot_prices", {}):
+            self.assertEqual(sorted(asyncio.run(two_workers())), [0, 1])
+        response = self.client.get("/api/user/portfolio/history")
+        self.assertEqual(response.status_code, 200, response.text)
+        points = response.json()
+        self.assertEqual(len(points), 1)
+        self.assertEqual(points[0]["value"], 25000.0)
+        self.assertEqual(points[0]["composition"], {"BTC": 0.5})
+
+    def test_history_without_live_prices(self):
+        self.add_entry("BTC", 0.5, 40000)
+        patches = [
+            # A mock feed never updates the price book
+            mock.patch.object(portfolio_history, "price_book", PriceBook()),
+            mock.patch.object(portfolio_history, "PORTFOLIO_SNAPSHOT_PRICE_WAIT_SECONDS", 0),
+            mock.patch.object(portfolio_history, "_last_snapshot_prices", {}),
+            # Stop the loop once the first run is done
+            mock.patch.object(portfolio_history.asyncio, "sleep", side_effect=asyncio.CancelledError),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        with self.assertRaises(asyncio.CancelledError):
+            asyncio.run(portfolio_history.run_portfolio_snapshots(self.db))
+        points = self.client.get("/api/user/portfolio/history").json()
+        # Valued at cost
+        self.assertEqual([point["value"] for point in points], [20000.0])
+
+    def test_transactions_and_positions(self):
+        response = self.client.post("/api/user/transactions", json={
+            "symbol": "BTC", "side": "buy", "amount": 1, "price": 30000
+        })
+        self.assertEqual(response.status_code, 201, response.text)
+        response = self.client.post("/api/user/transactions", json={
+            "symbol": "BTC", "side": "sell", "amount": 5, "price": 30000
+        })
+        self.assertEqual(response.status_code, 400, response.text)
+
+        self.assertEqual(len(self.client.get("/api/user/transactions").json()), 1)
+        response = self.client.get("/api/user/positions", params={"method": "fifo"})
+        self.assertEqual(response.status_code, 200, response.text)
+        self.assertEqual(response.json()["total_unrealized_pnl"], 20000.0)
+        self.assertEqual(self.client.get("/api/user/positions", params={"method": "hifo"}).status_code, 400)
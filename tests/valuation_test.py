@@ -0,0 +1,66 @@
+import asyncio
+import unittest
+from unittest import mock
+
+from tests.support import BACKEND_AVAILABLE, requires_backend
+
+if BACKEND_AVAILABLE:
+    from app.services import price_book as price_book_module
+    from app.services import binance_service
+    from app.utils.cache_codecs import decode, encode
+    from app.services.price_book import PriceBook
+    from app.services.valuation import value_holdings
+
+@requires_backend
+class ValuationTest(unittest.TestCase):
+    """Tests for mark-to-market portfolio valuation"""
+
+    def setUp(self):
+        self.prices = PriceBook()
+        self.prices.update([
+            {"symbol": "BTC", "price": 60000.0},
+            {"symbol": "ETHUSDT", "price": 3000.0},
+        ])
+
+    def test_price_book_reports_changed_symbols(self):
+        changed = self.prices.update([{"symbol": "BTC", "price": 60000.0}, {"symbol": "ETH", "price": 3100.0}])
+        self.assertEqual(changed, {"ETH"})
+
+    def test_values_and_weights(self):
+        holdings = [
+            {"symbol": "BTC", "amount": 0.5, "invested": 25000.0},
+            {"symbol": "ETHUSDT", "amount": 10.0, "invested": 20000.0},
+        ]
+        result = value_holdings(holdings, self.prices)
+        self.assertAlmostEqual(result["total_value"], 60000.0)
+        self.assertAlmostEqual(result["total_investment"], 45000.0)
+        self.assertAlmostEqual(result["profit_loss"], 15000.0)
+        self.assertAlmostEqual(sum(asset["weight"] for asset in result["assets"]), 1.0)
+        self.assertAlmostEqual(result["assets"][0]["profit_loss"], 5000.0)
+
+    def test_unpriced_assets_are_valued_at_cost(self):
+        result = value_holdings([{"symbol": "XYZ", "amount": 2.0, "invested": 10.0}], self.prices)
+        self.assertFalse(result["assets"][0]["priced"])
+        self.assertAlmostEqual(result["total_value"], 10.0)
+        self.assertAlmostEqual(result["profit_loss"], 0.0)
+
+    def test_mock_feed_leaves_price_book_unchanged(self):
+        with mock.patch.object(price_book_module, "price_book", self.prices), \
+                mock.patch.object(binance_service, "binance_client", None):
+            self.assertEqual(asyncio.run(price_book_module.refresh_prices()), set())
+        self.assertEqual(self.prices.get("BTC"), 60000.0)
+
+    def test_live_feed_updates_price_book(self):
+        tickers = [{"symbol": "BTC", "price": 61000.0}]
+        with mock.patch.object(price_book_module, "price_book", self.prices), \
+                mock.patch.object(price_book_module, "fetch_crypto_data", lambda limit: tickers):
+            self.assertEqual(asyncio.run(price_book_module.refresh_prices()), {"BTC"})
+        self.assertEqual(self.prices.get("BTC"), 61000.0)
+
+    def test_mock_flag_survives_copies(self):
+        with mock.patch.object(binance_service, "binance_client", None):
+            tickers = binance_service.fetch_crypto_data(3)
+        self.assertTrue(binance_service.is_mock_market_data(decode(encode(tickers))))
+        tickers[0]["price"] = 0.0
+        self.assertNotEqual(binance_service.MOCK_CRYPTOCURRENCIES[0]["price"], 0.0)
+        self.assertFalse(binance_service.is_mock_market_data([{"symbol": "BTC", "price": 61000.0}]))